@@ -0,0 +1,113 @@
+"""
+Обращения к Bot API: учёт вызовов и пропуск пустых правок
+
+Каждый запрос к Telegram проходит через ApiCallCounter и учитывается по
+имени метода, так что объём вызовов виден в /metrics вебхука. Правка
+сообщения, у которого текст и разметка уже такие же, не отправляется:
+Telegram всё равно ответит "message is not modified". Если сравнение
+не сработало (например, текст пришёл с иначе экранированным HTML),
+эта ошибка тоже считается пропуском, а не сбоем хендлера.
+"""
+import logging
+import threading
+from collections import Counter
+from typing import Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+from aiohttp import FormData
+
+from bot.keyboards.inline import keyboards
+
+logger = logging.getLogger(__name__)
+
+NOT_MODIFIED = "message is not modified"
+
+class ApiCallMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.edits_skipped = 0
+        self.not_modified = 0
+        self.prepared_markups = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': sum(self.calls.values()),
+                'by_method': dict(self.calls),
+                'errors': dict(self.errors),
+                'edits_skipped': self.edits_skipped,
+                'not_modified': self.not_modified,
+                'prepared_markups': self.prepared_markups
+            }
+
+api_metrics = ApiCallMetrics()
+
+class ApiCallCounter(BaseRequestMiddleware):
+    """Считает запросы к Bot API по методам"""
+
+    async def __call__(self, make_request, bot, method):
+        name = method.__api_method__
+        with api_metrics._lock:
+            api_metrics.calls[name] += 1
+        try:
+            return await make_request(bot, method)
+        except TelegramAPIError:
+            with api_metrics._lock:
+                api_metrics.errors[name] += 1
+            raise
+
+class PreparedMarkupSession(AiohttpSession):
+    """Подставляет в запрос готовый JSON клавиатур из реестра"""
+
+    def build_form_data(self, bot, method) -> FormData:
+        prepared = keyboards.prepared_json(getattr(method, "reply_markup", None))
+        if prepared is None:
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files = {}
+        for key, value in method.model_dump(warnings=False, exclude={"reply_markup"}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field("reply_markup", prepared)
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        with api_metrics._lock:
+            api_metrics.prepared_markups += 1
+        return form
+
+def create_session() -> AiohttpSession:
+    session = PreparedMarkupSession()
+    session.middleware(ApiCallCounter())
+    return session
+
+def is_unchanged(message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> bool:
+    """Текст и разметка сообщения уже совпадают с новыми"""
+    return (
+        message.html_text == text
+        and keyboards.dumps(message.reply_markup) == keyboards.dumps(reply_markup)
+    )
+
+async def edit_screen(message: Message, text: str,
+                      reply_markup: Optional[InlineKeyboardMarkup] = None) -> bool:
+    """Правит сообщение, если что-то изменилось; возвращает True, если запрос ушёл"""
+    if is_unchanged(message, text, reply_markup):
+        with api_metrics._lock:
+            api_metrics.edits_skipped += 1
+        return False
+    try:
+        await message.edit_text(text, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if NOT_MODIFIED not in e.message:
+            raise
+        with api_metrics._lock:
+            api_metrics.not_modified += 1
+        logger.debug(f"Сообщение {message.message_id} не изменилось")
+    return True
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import os
+import sys
+
+from aiogram import Bot, Dispatcher
+from aiogram.enums import ParseMode
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database.database import get_async_session_factory
+from bot.middlewares.database import DatabaseMiddleware
+from bot.outbox import OutboxSender
+from bot.api import create_session
+from bot.handlers import start, listings, messages, profile, search
+
+logger = logging.getLogger(__name__)
+
+def create_bot() -> Bot:
+    # Сессия считает вызовы Bot API и отправляет готовый JSON статических клавиатур
+    return Bot(token=Config.BOT_TOKEN, parse_mode=ParseMode.HTML, session=create_session())
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    
+    # Сессия БД открывается на уровне апдейта и доступна всем хендлерам
+    dp.update.outer_middleware(DatabaseMiddleware(get_async_session_factory()))
+    
+    dp.include_routers(
+        start.router,
+        listings.router,
+        messages.router,
+        profile.router,
+        search.router
+    )
+    return dp
+
+async def run_polling() -> None:
+    bot = create_bot()
+    dp = create_dispatcher()
+    outbox = OutboxSender(bot, get_async_session_factory())
+    outbox.start()
+    try:
+        # Каждый апдейт обрабатывается отдельной задачей, поэтому поток /start
+        # не выстраивается в очередь за одним медленным хендлером
+        await dp.start_polling(bot, handle_as_tasks=True)
+    finally:
+        await outbox.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if Config.WEBHOOK_URL:
+        from bot.webhook import run_webhook
+        run_webhook(create_bot(), create_dispatcher())
+    else:
+        asyncio.run(run_polling())
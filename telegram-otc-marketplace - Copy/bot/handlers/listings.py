@@ -1,14 +1,15 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.my_listings import get_page, FIRST_PAGE_CALLBACK, CALLBACK_PREFIX
+from bot.api import edit_screen
 
 router = Router()
 
-@router.callback_query(F.data == "my_listings")
-async def my_listings(callback: CallbackQuery):
-    await callback.message.edit_text(
-        "📋 <b>Мои объявления</b>\n\n"
-        "Функция в разработке...",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
-        ])
-    )
\ No newline at end of file
+@router.callback_query(F.data == FIRST_PAGE_CALLBACK)
+@router.callback_query(F.data.startswith(CALLBACK_PREFIX + ":"))
+async def my_listings(callback: CallbackQuery, session: AsyncSession):
+    text, markup = await get_page(session, callback.from_user.id, callback.data)
+    await edit_screen(callback.message, text, markup)
+    await callback.answer()
\ No newline at end of file
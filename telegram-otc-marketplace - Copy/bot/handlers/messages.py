@@ -1,14 +1,49 @@
+import html
+
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Message, Listing
+from bot.keyboards.inline import get_messages_keyboard
+from bot.api import edit_screen
 
 router = Router()
 
+# Последних сообщений в ответе; общий текст укладывается в лимит Telegram
+MESSAGES_SHOWN = 5
+MESSAGES_TEXT_LIMIT = 3800
+MESSAGE_PREVIEW_LIMIT = 600
+
 @router.callback_query(F.data == "messages")
-async def messages(callback: CallbackQuery):
-    await callback.message.edit_text(
-        "💬 <b>Сообщения</b>\n\n"
-        "У вас пока нет сообщений.",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
-        ])
-    )
\ No newline at end of file
+async def messages(callback: CallbackQuery, session: AsyncSession):
+    # Сообщения читаются из таблицы messages: outbox — только очередь доставки
+    rows = (await session.execute(
+        select(Message.message, Message.created_at, Listing.title)
+        .outerjoin(Listing, Listing.id == Message.listing_id)
+        .where(Message.recipient_id == callback.from_user.id)
+        .order_by(Message.id.desc())
+        .limit(MESSAGES_SHOWN)
+    )).all()
+    
+    shown = []
+    length = 0
+    for row in rows:
+        created = row.created_at.strftime('%d.%m.%Y %H:%M') if row.created_at else ''
+        body = row.message if len(row.message) <= MESSAGE_PREVIEW_LIMIT else row.message[:MESSAGE_PREVIEW_LIMIT - 1] + '…'
+        text = (
+            f"📦 <b>{html.escape(row.title or 'Объявление удалено')}</b> · {created}\n"
+            f"{html.escape(body)}"
+        )
+        if shown and length + len(text) > MESSAGES_TEXT_LIMIT:
+            break
+        shown.append(text)
+        length += len(text)
+    
+    if shown:
+        text = "💬 <b>Последние сообщения</b>\n\n" + "\n\n➖➖➖\n\n".join(shown)
+    else:
+        text = "💬 <b>Сообщения</b>\n\nУ вас пока нет сообщений."
+    
+    await edit_screen(callback.message, text, get_messages_keyboard())
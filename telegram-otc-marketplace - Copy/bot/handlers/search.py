@@ -0,0 +1,23 @@
+from aiogram import Router, Bot
+from aiogram.types import InlineQuery
+
+from config import Config
+from database.database import get_async_session_factory
+from bot.inline_search import inline_results
+
+router = Router()
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery, bot: Bot):
+    # bot.me() кэшируется aiogram после первого вызова
+    me = await bot.me()
+    # Запрос к БД общий для одинаковых запросов и открывает свою сессию
+    results, next_offset = await inline_results(
+        get_async_session_factory(), inline_query.query, inline_query.offset, me.username
+    )
+    await inline_query.answer(
+        results,
+        cache_time=Config.INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset
+    )
@@ -1,32 +1,41 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
-from sqlalchemy.orm import Session
+from aiogram.filters import Command, CommandObject
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import get_db
+from database.database import insert_for
 from database.models import User
-from bot.keyboards.inline import get_main_menu_keyboard, get_web_app_keyboard
+from bot.keyboards.inline import keyboards, get_main_menu_keyboard
+from bot.api import edit_screen
+from bot.inline_search import parse_deep_link, listing_message
 
 router = Router()
 
 @router.message(Command("start"))
-async def start_command(message: Message):
-    db = next(get_db())
-    
-    # Проверяем, есть ли пользователь в БД
-    user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
-    
-    if not user:
-        # Создаем нового пользователя
-        user = User(
+async def start_command(message: Message, session: AsyncSession, command: CommandObject):
+    # Создаем пользователя одним INSERT ... ON CONFLICT DO NOTHING:
+    # rowcount == 1 означает, что пользователь новый
+    insert = insert_for(session.bind.dialect.name)
+    result = await session.execute(
+        insert(User).values(
             telegram_id=message.from_user.id,
             username=message.from_user.username,
             first_name=message.from_user.first_name,
             last_name=message.from_user.last_name
-        )
-        db.add(user)
-        db.commit()
-        
+        ).on_conflict_do_nothing(index_elements=[User.telegram_id])
+    )
+    await session.commit()
+    
+    # Переход по ссылке из инлайн-поиска: t.me/<бот>?start=listing_<id>
+    listing_id = parse_deep_link(command.args)
+    if listing_id is not None:
+        listing = await listing_message(session, listing_id)
+        if listing is not None:
+            text, markup = listing
+            await message.answer(text, reply_markup=markup)
+            return
+    
+    if result.rowcount:
         welcome_text = (
             "🎉 <b>Добро пожаловать в OTC Marketplace!</b>\n\n"
             "Здесь вы можете:\n"
@@ -37,11 +46,10 @@ async def start_command(message: Message):
         )
     else:
         welcome_text = (
-            f"👋 С возвращением, <b>{user.first_name}!</b>\n\n"
+            f"👋 С возвращением, <b>{message.from_user.first_name}!</b>\n\n"
             "Что будем делать сегодня?"
         )
     
-    db.close()
     await message.answer(
         welcome_text,
         reply_markup=get_main_menu_keyboard()
@@ -49,17 +57,10 @@ async def start_command(message: Message):
 
 @router.callback_query(F.data == "open_marketplace")
 async def open_marketplace(callback: CallbackQuery):
-    await callback.message.edit_text(
-        "🌐 <b>Веб-интерфейс торговой площадки</b>\n\n"
-        "Нажмите кнопку ниже, чтобы открыть полный интерфейс торговой площадки:",
-        reply_markup=get_web_app_keyboard()
-    )
+    screen = keyboards.screen("web_app")
+    await edit_screen(callback.message, screen.text, screen.markup)
 
 @router.callback_query(F.data == "back_to_menu")
 async def back_to_menu(callback: CallbackQuery):
-    await callback.message.edit_text(
-        "🏠 <b>Главное меню</b>\n\n"
-        "Выберите действие:",
-        reply_markup=get_main_menu_keyboard()
-    )
-    )
\ No newline at end of file
+    screen = keyboards.screen("main_menu")
+    await edit_screen(callback.message, screen.text, screen.markup)
\ No newline at end of file
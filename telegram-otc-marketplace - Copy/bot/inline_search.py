@@ -0,0 +1,220 @@
+"""
+Поиск объявлений в инлайн-режиме (@bot запрос)
+
+Поиск идёт через тот же database/search.py, что и /api/listings:
+FTS5/tsvector с сортировкой по релевантности, иначе ILIKE. Пустой запрос
+показывает новые активные объявления по (created_at, id).
+Результаты листаются через next_offset: для поиска это смещение (выдача
+ограничена INLINE_MAX_RESULTS), для ленты — позиция последней строки.
+
+Готовые результаты кэшируются по нормализованному запросу и смещению с
+коротким TTL — просмотры в них не показываются, поэтому сброс по каждой
+записи не нужен. Одинаковые запросы, пришедшие одновременно, ждут один
+общий запрос к БД; он открывает собственную сессию, поэтому отмена
+хендлера, который его начал, не ломает остальных ожидающих. Telegram
+дополнительно кэширует ответ на cache_time.
+"""
+import asyncio
+import html
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from aiogram.types import (
+    InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle,
+    InputTextMessageContent, WebAppInfo
+)
+from sqlalchemy import select
+
+from config import Config
+from bot.my_listings import format_price
+from database.models import Category, Listing
+from database.search import apply_search, search_terms, fulltext_available
+from database.pagination import after_created_cursor
+
+EPOCH = datetime(1970, 1, 1)
+DEEP_LINK_PREFIX = "listing_"
+TITLE_LIMIT = 100
+# Более короткие слова не покрыты префиксным индексом FTS5 (prefix='2 3'):
+# запрос из одной буквы, набранной первой, ушёл бы в полный перебор
+MIN_TERM_LENGTH = 2
+DESCRIPTION_LIMIT = 300
+
+def deep_link(bot_username, listing_id):
+    """Ссылка t.me, которая открывает объявление в чате с ботом"""
+    return f"https://t.me/{bot_username}?start={DEEP_LINK_PREFIX}{listing_id}"
+
+def parse_deep_link(args):
+    """id объявления из параметра /start или None"""
+    if not args or not args.startswith(DEEP_LINK_PREFIX):
+        return None
+    try:
+        return int(args[len(DEEP_LINK_PREFIX):])
+    except ValueError:
+        return None
+
+def _encode_position(row):
+    micros = (row.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros:x}.{row.id:x}"
+
+def _decode_position(offset):
+    try:
+        micros, listing_id = offset.split('.')
+        created_at = EPOCH + timedelta(microseconds=int(micros, 16))
+        return {'c': created_at.isoformat(), 'i': int(listing_id, 16)}
+    except (ValueError, OverflowError):
+        return None
+
+def _truncate(value, limit):
+    value = value or ''
+    return value if len(value) <= limit else value[:limit - 1] + '…'
+
+def listing_text(row):
+    """Текст сообщения с объявлением"""
+    text = (
+        f"<b>{html.escape(_truncate(row.title, TITLE_LIMIT))}</b>\n"
+        f"💰 {format_price(row.price)}"
+    )
+    if row.description:
+        text += f"\n\n{html.escape(_truncate(row.description, DESCRIPTION_LIMIT))}"
+    return text
+
+def build_result(row, bot_username):
+    return InlineQueryResultArticle(
+        id=str(row.id),
+        title=_truncate(row.title, TITLE_LIMIT),
+        description=f"💰 {format_price(row.price)} · {row.category or ''}",
+        input_message_content=InputTextMessageContent(message_text=listing_text(row), parse_mode="HTML"),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="🔍 Открыть объявление", url=deep_link(bot_username, row.id))]
+        ])
+    )
+
+def select_listings():
+    """Колонки карточки объявления с названием категории"""
+    return select(
+        Listing.id, Listing.title, Listing.description, Listing.price,
+        Category.name.label('category'), Listing.created_at
+    ).select_from(Listing).outerjoin(Category, Listing.category_id == Category.id)
+
+async def search_listings(session, terms, offset, page_size=Config.INLINE_PAGE_SIZE):
+    """Строки страницы и next_offset ("" — страниц больше нет)"""
+    query = select_listings().where(Listing.is_active == True)
+
+    if terms:
+        # Проверка индекса синхронная и кэшируется по url — один раз на процесс
+        engine = session.bind.sync_engine
+        await session.run_sync(lambda sync_session: fulltext_available(sync_session.get_bind()))
+        query = apply_search(query, Listing, ' '.join(terms), engine)
+        try:
+            start = max(int(offset or 0), 0)
+        except ValueError:
+            start = 0
+        limit = min(page_size, Config.INLINE_MAX_RESULTS - start)
+        if limit <= 0:
+            return [], ""
+        rows = (await session.execute(query.offset(start).limit(limit + 1))).all()
+        has_next = len(rows) > limit and start + limit < Config.INLINE_MAX_RESULTS
+        return rows[:limit], str(start + limit) if has_next else ""
+
+    query = query.order_by(Listing.created_at.desc(), Listing.id.desc())
+    position = _decode_position(offset) if offset else None
+    if position is not None:
+        query = query.where(after_created_cursor(Listing, position))
+    rows = (await session.execute(query.limit(page_size + 1))).all()
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return rows, _encode_position(rows[-1]) if has_next else ""
+
+class InlineSearchCache:
+    def __init__(self, maxsize=Config.INLINE_CACHE_SIZE, ttl=Config.INLINE_CACHE_TTL,
+                 latency_window=1000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (запрос, offset) -> (время сохранения, результаты, next_offset)
+        self._items = OrderedDict()
+        # Запросы к БД в процессе: повторные запросы ждут их, а не идут в БД
+        self._pending = {}
+        self._latencies = deque(maxlen=latency_window)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key, load):
+        item = self._items.get(key)
+        if item is not None and time.monotonic() - item[0] < self.ttl:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1], item[2]
+
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._load(key, load))
+        self._pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key, load):
+        # Результат сохраняется задачей, а не вызвавшим её хендлером: его
+        # отмена не мешает ни ожидающим, ни кэшу
+        try:
+            results, next_offset = await load()
+        finally:
+            self._pending.pop(key, None)
+
+        self._items[key] = (time.monotonic(), results, next_offset)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return results, next_offset
+
+    def observe(self, seconds):
+        self._latencies.append(seconds)
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 3)
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._items),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': round((self.hits + self.coalesced) / total, 4) if total else 0.0,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)}
+        }
+
+inline_cache = InlineSearchCache()
+
+async def inline_results(session_factory, query, offset, bot_username):
+    """Результаты и next_offset для инлайн-запроса"""
+    started = time.perf_counter()
+    terms = [term for term in search_terms(query) if len(term) >= MIN_TERM_LENGTH]
+
+    async def load():
+        async with session_factory() as session:
+            rows, next_offset = await search_listings(session, terms, offset)
+        return [build_result(row, bot_username) for row in rows], next_offset
+
+    try:
+        return await inline_cache.get((' '.join(terms), offset), load)
+    finally:
+        inline_cache.observe(time.perf_counter() - started)
+
+async def listing_message(session, listing_id):
+    """Текст и клавиатура объявления для перехода по ссылке из инлайн-результата"""
+    row = (await session.execute(
+        select_listings().where(Listing.id == listing_id, Listing.is_active == True)
+    )).first()
+    if row is None:
+        return None
+    return listing_text(row), InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🌐 Открыть торговую площадку", web_app=WebAppInfo(url=Config.WEB_APP_URL))],
+        [InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_menu")]
+    ])
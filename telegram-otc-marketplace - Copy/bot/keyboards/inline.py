@@ -1,26 +1,118 @@
+"""
+Статические клавиатуры и экраны бота
+
+Клавиатуры и тексты, которые не зависят от пользователя, собираются
+один раз при импорте и переиспользуются во всех хендлерах. Объекты
+aiogram неизменяемы (frozen), поэтому их можно раздавать без копий.
+Рядом хранится готовый JSON разметки: сессия бота подставляет его в
+запрос вместо повторной сериализации, а edit_screen сравнивает с ним
+текущую разметку сообщения.
+"""
+from typing import NamedTuple, Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from config import Config
 
+class Screen(NamedTuple):
+    text: str
+    markup: InlineKeyboardMarkup
+
+class KeyboardRegistry:
+    def __init__(self):
+        self._markups = {}
+        self._screens = {}
+        # id(разметки) -> JSON; зарегистрированные объекты живут до конца процесса
+        self._json = {}
+
+    def register(self, name, rows) -> InlineKeyboardMarkup:
+        """Собирает клавиатуру один раз и сохраняет её JSON"""
+        markup = InlineKeyboardMarkup(inline_keyboard=rows)
+        self._markups[name] = markup
+        self._json[id(markup)] = markup.model_dump_json(exclude_none=True)
+        return markup
+
+    def register_screen(self, name, text, keyboard) -> Screen:
+        """Экран — неизменный текст вместе с зарегистрированной клавиатурой"""
+        screen = Screen(text, self._markups[keyboard])
+        self._screens[name] = screen
+        return screen
+
+    def get(self, name) -> InlineKeyboardMarkup:
+        return self._markups[name]
+
+    def screen(self, name) -> Screen:
+        return self._screens[name]
+
+    def prepared_json(self, markup) -> Optional[str]:
+        """Готовый JSON, если разметка из реестра"""
+        return self._json.get(id(markup))
+
+    def dumps(self, markup) -> Optional[str]:
+        if markup is None:
+            return None
+        prepared = self._json.get(id(markup))
+        return prepared if prepared is not None else markup.model_dump_json(exclude_none=True)
+
+keyboards = KeyboardRegistry()
+
+keyboards.register("main_menu", [
+    [InlineKeyboardButton(text="🌐 Открыть торговую площадку", callback_data="open_marketplace")],
+    [InlineKeyboardButton(text="📋 Мои объявления", callback_data="my_listings")],
+    [InlineKeyboardButton(text="💬 Сообщения", callback_data="messages")],
+    [InlineKeyboardButton(text="👤 Профиль", callback_data="profile")]
+])
+
+keyboards.register("web_app", [
+    [InlineKeyboardButton(
+        text="🌐 Открыть веб-интерфейс",
+        web_app=WebAppInfo(url=Config.WEB_APP_URL)
+    )],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
+])
+
+keyboards.register("messages", [
+    [InlineKeyboardButton(
+        text="🌐 Открыть дашборд",
+        web_app=WebAppInfo(url=Config.WEB_APP_URL.rstrip('/') + '/dashboard')
+    )],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
+])
+
+keyboards.register("listings", [
+    [InlineKeyboardButton(text="➕ Создать объявление", callback_data="create_listing")],
+    [InlineKeyboardButton(text="👀 Просмотреть все", callback_data="view_all_listings")],
+    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
+])
+
+keyboards.register("back", [
+    [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
+])
+
+keyboards.register_screen(
+    "main_menu",
+    "🏠 <b>Главное меню</b>\n\n"
+    "Выберите действие:",
+    "main_menu"
+)
+
+keyboards.register_screen(
+    "web_app",
+    "🌐 <b>Веб-интерфейс торговой площадки</b>\n\n"
+    "Нажмите кнопку ниже, чтобы открыть полный интерфейс торговой площадки:",
+    "web_app"
+)
+
 def get_main_menu_keyboard():
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🌐 Открыть торговую площадку", callback_data="open_marketplace")],
-        [InlineKeyboardButton(text="📋 Мои объявления", callback_data="my_listings")],
-        [InlineKeyboardButton(text="💬 Сообщения", callback_data="messages")],
-        [InlineKeyboardButton(text="👤 Профиль", callback_data="profile")]
-    ])
+    return keyboards.get("main_menu")
 
 def get_web_app_keyboard():
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(
-            text="🌐 Открыть веб-интерфейс",
-            web_app=WebAppInfo(url=Config.WEB_APP_URL)
-        )],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
-    ])
+    return keyboards.get("web_app")
+
+def get_messages_keyboard():
+    return keyboards.get("messages")
 
 def get_listings_keyboard():
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="➕ Создать объявление", callback_data="create_listing")],
-        [InlineKeyboardButton(text="👀 Просмотреть все", callback_data="view_all_listings")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
-    ])
\ No newline at end of file
+    return keyboards.get("listings")
+
+def get_back_keyboard():
+    return keyboards.get("back")
@@ -2,11 +2,14 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
-from app.database import engine, create_tables
+from app.database import engine, create_tables, get_pool_metrics
 from app.routers import auth, listings, categories, users
 from app.routers.admin import users as admin_users, listings as admin_listings, categories as admin_categories
+from app.utils.rollups import run_rollups_periodically
+from app.utils.responses import FastJSONResponse
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -17,14 +20,17 @@ async def lifespan(app: FastAPI):
     # Создание таблиц при запуске
     create_tables()
     logger.info("Таблицы базы данных созданы")
+    rollups_task = asyncio.create_task(run_rollups_periodically())
     yield
+    rollups_task.cancel()
     logger.info("Приложение завершает работу")
 
 app = FastAPI(
     title="Доска объявлений API",
     description="API для доски объявлений с административной панелью",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Настройка CORS
@@ -67,7 +73,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2025-06-16T06:48:41Z"}
+    return {
+        "status": "healthy",
+        "timestamp": "2025-06-16T06:48:41Z",
+        "db_pool": get_pool_metrics(engine)
+    }
 
 if __name__ == "__main__":
     import uvicorn
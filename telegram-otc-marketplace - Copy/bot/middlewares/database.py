@@ -0,0 +1,20 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+class DatabaseMiddleware(BaseMiddleware):
+    """Открывает асинхронную сессию БД на каждый апдейт и передаёт её в хендлер как session"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_factory() as session:
+            data["session"] = session
+            return await handler(event, data)
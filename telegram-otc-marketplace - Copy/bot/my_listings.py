@@ -0,0 +1,244 @@
+"""
+Раздел "Мои объявления" в боте
+
+Объявления продавца (owner_id) листаются страницами по индексу
+(owner_id, created_at, id): следующая страница выбирается условием
+"строго после последней строки", без OFFSET, поэтому у продавца с
+тысячами объявлений любая страница стоит одного короткого прохода по
+индексу. Позиция целиком помещается в callback_data кнопки "Дальше".
+
+Готовые страницы (текст и клавиатура) кэшируются на пользователя и
+сбрасываются, когда меняются его объявления — в том числе из веб-воркеров
+и админ API через pub/sub. TTL — страховка для запуска без Redis, когда
+сообщения из других процессов до бота не доходят.
+"""
+import html
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
+from sqlalchemy import select, and_, or_
+
+from config import Config
+from database.models import Listing
+from utils.pubsub import pubsub, LISTING_INVALIDATION_CHANNEL, SELLER_LISTINGS_CHANNEL
+
+# callback_data страниц: ml:<номер страницы>:<created_at в мкс>:<id>, в base36
+CALLBACK_PREFIX = "ml"
+FIRST_PAGE_CALLBACK = "my_listings"
+EPOCH = datetime(1970, 1, 1)
+TITLE_LIMIT = 60
+
+ACTIVE_LABEL = '🟢 Активно'
+INACTIVE_LABEL = '⏸ Снято'
+
+def format_price(kopecks):
+    """Цена хранится в копейках: 1 500 ₽ или 1 500,50 ₽"""
+    rubles, rest = divmod(kopecks, 100)
+    text = f"{rubles:,}".replace(',', ' ')
+    return f"{text},{rest:02d} ₽" if rest else f"{text} ₽"
+
+def _base36(number):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    result = ''
+    while True:
+        number, rest = divmod(number, 36)
+        result = digits[rest] + result
+        if not number:
+            return result
+
+def encode_page_callback(page, created_at, listing_id):
+    """callback_data следующей страницы — не длиннее 64 байт"""
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{CALLBACK_PREFIX}:{_base36(page)}:{_base36(micros)}:{_base36(listing_id)}"
+
+def decode_page_callback(data):
+    """(страница, created_at, id) или None для некорректного значения"""
+    try:
+        prefix, page, micros, listing_id = data.split(':')
+        if prefix != CALLBACK_PREFIX:
+            return None
+        return (
+            int(page, 36),
+            EPOCH + timedelta(microseconds=int(micros, 36)),
+            int(listing_id, 36)
+        )
+    except (ValueError, OverflowError):
+        return None
+
+async def fetch_page(session, seller_id, after=None, page_size=Config.MY_LISTINGS_PAGE_SIZE):
+    """Строки страницы и признак, что за ней есть ещё объявления"""
+    query = (
+        select(
+            Listing.id, Listing.title, Listing.price, Listing.is_active, Listing.created_at
+        )
+        .where(Listing.owner_id == seller_id)
+        .order_by(Listing.created_at.desc(), Listing.id.desc())
+        .limit(page_size + 1)
+    )
+    if after is not None:
+        created_at, listing_id = after
+        query = query.where(or_(
+            Listing.created_at < created_at,
+            and_(Listing.created_at == created_at, Listing.id < listing_id)
+        ))
+    rows = (await session.execute(query)).all()
+    return rows[:page_size], len(rows) > page_size
+
+def _format_card(number, row):
+    title = row.title if len(row.title) <= TITLE_LIMIT else row.title[:TITLE_LIMIT - 1] + '…'
+    status = ACTIVE_LABEL if row.is_active else INACTIVE_LABEL
+    created = row.created_at.strftime('%d.%m.%Y') if row.created_at else ''
+    return (
+        f"<b>{number}. {html.escape(title)}</b>\n"
+        f"💰 {format_price(row.price)} · {status} · 📅 {created}"
+    )
+
+def render_page(rows, page, has_more):
+    """Текст и клавиатура страницы"""
+    if not rows:
+        text = "📋 <b>Мои объявления</b>\n\n" + (
+            "У вас пока нет объявлений. Создайте первое в веб-интерфейсе."
+            if page == 1 else "Больше объявлений нет."
+        )
+    else:
+        first_number = (page - 1) * Config.MY_LISTINGS_PAGE_SIZE + 1
+        cards = [_format_card(first_number + i, row) for i, row in enumerate(rows)]
+        text = f"📋 <b>Мои объявления</b> · стр. {page}\n\n" + "\n\n".join(cards)
+
+    navigation = []
+    if page > 1:
+        navigation.append(InlineKeyboardButton(text="⏮ В начало", callback_data=FIRST_PAGE_CALLBACK))
+    if has_more:
+        last = rows[-1]
+        navigation.append(InlineKeyboardButton(
+            text="Дальше ▶️",
+            callback_data=encode_page_callback(page + 1, last.created_at, last.id)
+        ))
+
+    keyboard = [navigation] if navigation else []
+    keyboard.append([InlineKeyboardButton(
+        text="🌐 Управлять в веб-интерфейсе",
+        web_app=WebAppInfo(url=Config.WEB_APP_URL.rstrip('/') + '/dashboard')
+    )])
+    keyboard.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")])
+    return text, InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+class MyListingsPageCache:
+    def __init__(self, maxsize=Config.MY_LISTINGS_CACHE_SIZE, ttl=Config.MY_LISTINGS_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (seller_id, callback_data) -> (время сохранения, текст, клавиатура, id объявлений)
+        self._items = OrderedDict()
+        self._by_seller = defaultdict(set)
+        # Объявления на закэшированных страницах — чтобы найти продавца по id
+        self._listing_sellers = {}
+        # Поколения продавцов растут при инвалидации их страниц: страницу,
+        # прочитанную до неё, не сохраняем. Общее поколение растёт, только когда
+        # изменилось объявление, продавец которого неизвестен
+        self._generations = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, seller_id):
+        with self._lock:
+            return self._generation, self._generations.get(seller_id, 0)
+
+    def get(self, seller_id, callback_data):
+        key = (seller_id, callback_data)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and time.monotonic() - item[0] < self.ttl:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1], item[2]
+            self.misses += 1
+            return None
+
+    def put(self, seller_id, callback_data, listing_ids, text, markup, generation):
+        key = (seller_id, callback_data)
+        with self._lock:
+            if generation != (self._generation, self._generations.get(seller_id, 0)):
+                return
+            self._items[key] = (time.monotonic(), text, markup, listing_ids)
+            self._items.move_to_end(key)
+            self._by_seller[seller_id].add(key)
+            for listing_id in listing_ids:
+                self._listing_sellers[listing_id] = seller_id
+            while len(self._items) > self.maxsize:
+                evicted_key, item = self._items.popitem(last=False)
+                self._forget(evicted_key, item)
+
+    def _forget(self, key, item):
+        keys = self._by_seller.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_seller[key[0]]
+        for listing_id in item[3]:
+            self._listing_sellers.pop(listing_id, None)
+
+    def _evict_seller(self, *seller_ids):
+        with self._lock:
+            for seller_id in seller_ids:
+                self._generations[seller_id] = self._generations.get(seller_id, 0) + 1
+                for key in list(self._by_seller.get(seller_id, ())):
+                    self._forget(key, self._items.pop(key))
+
+    def _evict_listings(self, *listing_ids):
+        with self._lock:
+            seller_ids = {
+                self._listing_sellers[listing_id]
+                for listing_id in listing_ids if listing_id in self._listing_sellers
+            }
+            # Объявление может быть на странице, которая сейчас читается из БД
+            if any(listing_id not in self._listing_sellers for listing_id in listing_ids):
+                self._generation += 1
+        # Изменение одного объявления сдвигает все страницы продавца
+        self._evict_seller(*seller_ids)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'sellers': len(self._by_seller),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+my_listings_pages = MyListingsPageCache()
+
+async def get_page(session, seller_id, callback_data):
+    """Текст и клавиатура страницы "Мои объявления" — из кэша или из БД"""
+    cached = my_listings_pages.get(seller_id, callback_data)
+    if cached is not None:
+        return cached
+
+    page, after = 1, None
+    if callback_data != FIRST_PAGE_CALLBACK:
+        position = decode_page_callback(callback_data)
+        if position is not None:
+            page, created_at, listing_id = position
+            after = (created_at, listing_id)
+
+    generation = my_listings_pages.generation(seller_id)
+    rows, has_more = await fetch_page(session, seller_id, after)
+    text, markup = render_page(rows, page, has_more)
+    my_listings_pages.put(seller_id, callback_data, [row.id for row in rows], text, markup, generation)
+    return text, markup
+
+# Создание и удаление объявлений продавцом, правки из админ API
+pubsub.subscribe(
+    SELLER_LISTINGS_CHANNEL,
+    lambda message: my_listings_pages._evict_seller(message['seller_id'])
+)
+pubsub.subscribe(
+    LISTING_INVALIDATION_CHANNEL,
+    lambda message: my_listings_pages._evict_listings(*message.get('listing_ids', [message.get('listing_id')]))
+)
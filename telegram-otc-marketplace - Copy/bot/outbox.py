@@ -0,0 +1,478 @@
+"""
+Очередь исходящих сообщений бота (transactional outbox)
+
+Уведомления пишутся в таблицу outbox той же транзакцией, что и само
+событие, после чего отправщик будится через pub/sub. Без сигнала (другой
+хост, нет Redis) таблица проверяется раз в OUTBOX_POLL_INTERVAL секунд.
+
+Темп задают корзины токенов: общая на бота (OUTBOX_RATE_LIMIT в секунду)
+и по одной на чат (OUTBOX_CHAT_RATE_LIMIT). Сообщения разных чатов уходят
+параллельно, внутри чата — по порядку. Строки, которые не успеют уйти за
+OUTBOX_BATCH_WINDOW секунд, откладываются в БД до своего времени, поэтому
+поток сообщений в один чат не задерживает остальные. На 429 чат
+замолкает на retry_after без траты попытки. Пока строка ждёт повтора
+(429 или сбой), остальные строки её чата откладываются вместе с ней,
+чтобы не обогнать её. Неотправленная правка
+сообщения вытесняется более новой правкой того же сообщения.
+
+Перед отправкой пачка забирается одним UPDATE ... WHERE status = pending:
+строки получают статус sending, метку отправщика и срок OUTBOX_LEASE,
+поэтому несколько процессов бота не отправят одну строку дважды. Строка,
+перед которой в том же чате есть чужая неотправленная, возвращается в
+очередь. Строки упавшего отправщика забираются снова после срока.
+
+Outbox — очередь доставки, а не хранилище сообщений: строки sent, failed
+и skipped старше OUTBOX_RETENTION_DAYS удаляются раз в
+OUTBOX_PURGE_INTERVAL секунд.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy import select, update, delete, func, bindparam, exists, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import Config
+from database.models import OutboxMessage, OutboxStatus
+from bot.keyboards.inline import keyboards
+from bot.api import NOT_MODIFIED
+from utils.pubsub import pubsub, OUTBOX_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Сколько корзин чатов держать в памяти; полные корзины сверх лимита выбрасываются
+CHAT_BUCKETS_LIMIT = 10000
+THROUGHPUT_WINDOW = 60  # секунды
+
+def markup_json(reply_markup: Optional[InlineKeyboardMarkup]) -> Optional[str]:
+    return keyboards.dumps(reply_markup)
+
+async def enqueue_message(session: AsyncSession, chat_id: int, text: str,
+                          reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+    """Ставит сообщение в очередь; после commit вызовите publish_outbox_wakeup()"""
+    session.add(OutboxMessage(chat_id=chat_id, text=text, reply_markup=markup_json(reply_markup)))
+
+async def enqueue_edit(session: AsyncSession, chat_id: int, message_id: int, text: str,
+                       reply_markup: Optional[InlineKeyboardMarkup] = None) -> None:
+    """Ставит правку сообщения в очередь, вытесняя ещё не отправленные правки того же сообщения"""
+    await session.execute(
+        update(OutboxMessage)
+        .where(
+            OutboxMessage.chat_id == chat_id,
+            OutboxMessage.edit_message_id == message_id,
+            OutboxMessage.status == OutboxStatus.PENDING
+        )
+        .values(status=OutboxStatus.SKIPPED)
+        .execution_options(synchronize_session=False)
+    )
+    session.add(OutboxMessage(
+        chat_id=chat_id,
+        edit_message_id=message_id,
+        text=text,
+        reply_markup=markup_json(reply_markup)
+    ))
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float, count: int = 1) -> float:
+        """Через сколько секунд будет доступно count токенов"""
+        self._refill(now)
+        paused = max(self.updated - now, 0.0)
+        return paused + max(count - self.tokens, 0.0) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Ответ 429: токенов нет, пополнение начнётся через seconds"""
+        self.tokens = 0.0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class OutboxMetrics:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self.deferred = 0
+        self.skipped = 0
+        self.purged = 0
+        self.backlog = 0
+        self._sent_at = deque()
+
+    def observe_sent(self, now: float) -> None:
+        self.sent += 1
+        self._sent_at.append(now)
+
+    def as_dict(self) -> dict:
+        threshold = time.monotonic() - THROUGHPUT_WINDOW
+        while self._sent_at and self._sent_at[0] < threshold:
+            self._sent_at.popleft()
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "deferred": self.deferred,
+            "skipped": self.skipped,
+            "purged": self.purged,
+            "backlog": self.backlog,
+            "throughput_per_sec": round(len(self._sent_at) / THROUGHPUT_WINDOW, 3),
+        }
+
+class OutboxSender:
+    def __init__(self, bot: Bot, session_factory,
+                 batch_size: int = Config.OUTBOX_BATCH_SIZE,
+                 rate_limit: float = Config.OUTBOX_RATE_LIMIT,
+                 chat_rate_limit: float = Config.OUTBOX_CHAT_RATE_LIMIT,
+                 window: float = Config.OUTBOX_BATCH_WINDOW,
+                 poll_interval: float = Config.OUTBOX_POLL_INTERVAL,
+                 max_attempts: int = Config.OUTBOX_MAX_ATTEMPTS,
+                 lease: float = Config.OUTBOX_LEASE,
+                 retention_days: int = Config.OUTBOX_RETENTION_DAYS,
+                 purge_interval: float = Config.OUTBOX_PURGE_INTERVAL):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.chat_rate_limit = chat_rate_limit
+        self.window = window
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.retention = timedelta(days=retention_days)
+        self.purge_interval = purge_interval
+        self._purged_at: Optional[float] = None
+        # Метка строк, забранных этим отправщиком
+        self.token = uuid.uuid4().hex
+        self.metrics = OutboxMetrics()
+        # Небольшой запас подряд, чтобы не простаивать между пачками
+        self._global_bucket = TokenBucket(rate_limit, capacity=max(1.0, rate_limit / 5))
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # Колбэк pub/sub может прийти из потока Redis
+        pubsub.subscribe(OUTBOX_CHANNEL, lambda message: self._loop.call_soon_threadsafe(self._wakeup.set))
+        self._task = asyncio.create_task(self._run(), name="outbox-sender")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as exc:
+                logger.exception(f"Ошибка отправщика outbox: {exc}")
+                processed = 0
+            now = time.monotonic()
+            if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+                self._purged_at = now
+                try:
+                    await self.purge_finished()
+                except Exception as exc:
+                    logger.exception(f"Ошибка чистки outbox: {exc}")
+            # Полная пачка — в очереди может быть ещё, продолжаем без ожидания
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_LIMIT:
+                now = time.monotonic()
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.idle(now)
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate_limit)
+        return bucket
+
+    async def process_batch(self) -> int:
+        """Отправляет одну пачку готовых сообщений; возвращает количество разобранных строк"""
+        now_utc = datetime.utcnow()
+        # Готова к отправке: ждёт своего времени или забрана упавшим отправщиком
+        due = or_(
+            and_(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.next_attempt_at <= now_utc),
+            and_(OutboxMessage.status == OutboxStatus.SENDING, OutboxMessage.locked_until <= now_utc)
+        )
+        # Строка не уходит, пока в её чате ждёт более ранняя (отложенная, на повторе
+        # или отправляемая другим процессом)
+        earlier = aliased(OutboxMessage)
+        earlier_waiting = exists().where(
+            earlier.chat_id == OutboxMessage.chat_id,
+            earlier.id < OutboxMessage.id,
+            or_(
+                and_(earlier.status == OutboxStatus.PENDING, earlier.next_attempt_at > now_utc),
+                and_(earlier.status == OutboxStatus.SENDING, earlier.locked_until > now_utc)
+            )
+        )
+        # Более ранняя строка чата, не забранная этим отправщиком
+        earlier_foreign = exists().where(
+            earlier.chat_id == OutboxMessage.chat_id,
+            earlier.id < OutboxMessage.id,
+            earlier.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]),
+            or_(earlier.locked_by.is_(None), earlier.locked_by != self.token)
+        )
+        async with self.session_factory() as session:
+            ids = (await session.execute(
+                select(OutboxMessage.id)
+                .where(due, ~earlier_waiting)
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+            )).scalars().all()
+            if not ids:
+                await session.rollback()
+                await self._refresh_backlog()
+                return 0
+            # Условие due проверяется заново при UPDATE: строку, которую уже забрал
+            # параллельный отправщик, этот не получит
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(ids), due)
+                .values(
+                    status=OutboxStatus.SENDING,
+                    locked_by=self.token,
+                    locked_until=now_utc + timedelta(seconds=self.lease)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            rows = (await session.execute(
+                select(
+                    OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.edit_message_id,
+                    OutboxMessage.text, OutboxMessage.reply_markup, OutboxMessage.attempts,
+                    earlier_foreign.label("blocked")
+                )
+                .where(
+                    OutboxMessage.id.in_(ids),
+                    OutboxMessage.status == OutboxStatus.SENDING,
+                    OutboxMessage.locked_by == self.token
+                )
+                .order_by(OutboxMessage.id)
+            )).all()
+        if not rows:
+            await self._refresh_backlog()
+            return 0
+
+        results = []
+
+        # Из нескольких правок одного сообщения отправляется только последняя
+        latest_edits = {}
+        for row in rows:
+            if row.edit_message_id is not None:
+                latest_edits[(row.chat_id, row.edit_message_id)] = row.id
+        queues = OrderedDict()
+        chat_counts = defaultdict(int)
+        deferred_chats = {}
+        now = time.monotonic()
+        for row in rows:
+            if row.blocked:
+                # Более ранняя строка чата у другого отправщика: эта ждёт её в очереди
+                results.append(self._postpone(row, 0))
+                continue
+            if row.edit_message_id is not None and latest_edits[(row.chat_id, row.edit_message_id)] != row.id:
+                results.append(self._result(row, OutboxStatus.SKIPPED))
+                self.metrics.skipped += 1
+                continue
+            # Строки, до которых очередь чата не дойдёт в этом окне, ждут в БД
+            chat_counts[row.chat_id] += 1
+            delay = deferred_chats.get(row.chat_id)
+            if delay is None:
+                delay = self._chat_bucket(row.chat_id).delay(now, chat_counts[row.chat_id])
+            else:
+                delay += 1 / self.chat_rate_limit
+            if delay > self.window:
+                deferred_chats[row.chat_id] = delay
+                results.append(self._postpone(row, delay))
+                self.metrics.deferred += 1
+            else:
+                queues.setdefault(row.chat_id, deque()).append(row)
+
+        # Отправка идёт вне транзакции, чтобы не держать соединение во время пауз
+        results.extend(await self._send_queues(queues))
+
+        async with self.session_factory() as session:
+            table = OutboxMessage.__table__
+            # Строки, чей срок истёк и которые уже забрал другой отправщик, не трогаем
+            await session.execute(
+                update(table).where(table.c.id == bindparam("row_id"), table.c.locked_by == self.token).values(
+                    status=bindparam("new_status"),
+                    attempts=bindparam("new_attempts"),
+                    next_attempt_at=bindparam("retry_at"),
+                    error=bindparam("last_error"),
+                    sent_at=bindparam("delivered_at"),
+                    locked_by=None,
+                    locked_until=None
+                ),
+                results
+            )
+            await session.commit()
+
+        await self._refresh_backlog()
+        return len(rows)
+
+    async def _send_queues(self, queues: "OrderedDict[int, deque]") -> list:
+        """Отправляет очереди чатов параллельно с учётом общей корзины и корзин чатов"""
+        results = []
+        in_flight = {}
+        while queues or in_flight:
+            now = time.monotonic()
+            global_delay = self._global_bucket.delay(now)
+            busy = {row.chat_id for row in in_flight.values()}
+
+            if global_delay == 0:
+                ready = next(
+                    (chat_id for chat_id in queues
+                     if chat_id not in busy and self._chat_bucket(chat_id).delay(now) == 0),
+                    None
+                )
+                if ready is not None:
+                    row = queues[ready].popleft()
+                    if not queues[ready]:
+                        del queues[ready]
+                    self._global_bucket.take(now)
+                    self._chat_bucket(ready).take(now)
+                    in_flight[asyncio.create_task(self._deliver(row))] = row
+                    continue
+
+            waits = [self._chat_bucket(chat_id).delay(now) for chat_id in queues if chat_id not in busy]
+            timeout = max(global_delay, min(waits)) if waits else None
+            if not in_flight:
+                await asyncio.sleep(timeout)
+                continue
+
+            done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                row = in_flight.pop(task)
+                result, retry_after = task.result()
+                results.append(result)
+                if retry_after is not None:
+                    # Чат замолкает на время, названное Telegram
+                    self._chat_bucket(row.chat_id).pause(retry_after)
+                if result["new_status"] == OutboxStatus.PENDING:
+                    # Строка ждёт повтора: оставшиеся строки чата ждут вместе с ней, порядок сохраняется
+                    delay = max((result["retry_at"] - datetime.utcnow()).total_seconds(), 0.0)
+                    for waiting in queues.pop(row.chat_id, ()):
+                        results.append(self._postpone(waiting, delay))
+        return results
+
+    async def _deliver(self, row):
+        """Один вызов Bot API; возвращает (результат для UPDATE, retry_after или None)"""
+        reply_markup = InlineKeyboardMarkup.model_validate_json(row.reply_markup) if row.reply_markup else None
+        try:
+            if row.edit_message_id is None:
+                await self.bot.send_message(row.chat_id, row.text, reply_markup=reply_markup)
+            else:
+                await self.bot.edit_message_text(
+                    text=row.text, chat_id=row.chat_id, message_id=row.edit_message_id, reply_markup=reply_markup
+                )
+        except TelegramRetryAfter as exc:
+            # Telegram просит подождать: попытка не тратится
+            self.metrics.rate_limited += 1
+            return self._postpone(row, exc.retry_after, str(exc)), exc.retry_after
+        except TelegramBadRequest as exc:
+            if NOT_MODIFIED in str(exc):
+                self.metrics.observe_sent(time.monotonic())
+                return self._result(row, OutboxStatus.SENT), None
+            # Некорректный запрос — повтор не поможет
+            return self._retry(row, str(exc), final=True), None
+        except TelegramForbiddenError as exc:
+            # Бот заблокирован пользователем
+            return self._retry(row, str(exc), final=True), None
+        except Exception as exc:
+            return self._retry(row, str(exc)), None
+
+        self.metrics.observe_sent(time.monotonic())
+        return self._result(row, OutboxStatus.SENT), None
+
+    def _result(self, row, status: OutboxStatus, attempts: Optional[int] = None,
+                retry_at: Optional[datetime] = None, error: Optional[str] = None) -> dict:
+        now = datetime.utcnow()
+        return {
+            "row_id": row.id,
+            "new_status": status,
+            "new_attempts": row.attempts if attempts is None else attempts,
+            "retry_at": retry_at or now,
+            "last_error": error[:1000] if error else None,
+            "delivered_at": now if status == OutboxStatus.SENT else None,
+        }
+
+    def _postpone(self, row, delay: float, error: Optional[str] = None) -> dict:
+        """Строка остаётся в очереди до now + delay без траты попытки"""
+        return self._result(
+            row, OutboxStatus.PENDING, retry_at=datetime.utcnow() + timedelta(seconds=delay), error=error
+        )
+
+    def _retry(self, row, error: str, final: bool = False) -> dict:
+        attempts = row.attempts + 1
+        if final or attempts >= self.max_attempts:
+            self.metrics.failed += 1
+            logger.warning(f"Сообщение outbox #{row.id} в чат {row.chat_id} не доставлено: {error}")
+            return self._result(row, OutboxStatus.FAILED, attempts, error=error)
+        self.metrics.retried += 1
+        # Экспоненциальная пауза между попытками, не больше 5 минут
+        delay = min(2 ** attempts, 300)
+        return self._result(
+            row, OutboxStatus.PENDING, attempts, retry_at=datetime.utcnow() + timedelta(seconds=delay), error=error
+        )
+
+    async def purge_finished(self) -> int:
+        """Удаляет строки с окончательным статусом старше срока хранения"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                delete(OutboxMessage)
+                .where(
+                    OutboxMessage.status.in_([OutboxStatus.SENT, OutboxStatus.FAILED, OutboxStatus.SKIPPED]),
+                    OutboxMessage.created_at < datetime.utcnow() - self.retention
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        self.metrics.purged += result.rowcount
+        return result.rowcount
+
+    async def _refresh_backlog(self) -> None:
+        async with self.session_factory() as session:
+            self.metrics.backlog = (await session.execute(
+                select(func.count(OutboxMessage.id))
+                .where(OutboxMessage.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]))
+            )).scalar()
+
+    def stats(self) -> dict:
+        return self.metrics.as_dict()
@@ -0,0 +1,273 @@
+"""
+Режим вебхука для бота
+
+Апдейт подтверждается Telegram сразу после проверки секрета и постановки
+в очередь. У каждого чата своя очередь, а общий пул воркеров берёт чаты
+по готовности: апдейты одного чата обрабатываются по одному и по
+порядку, а медленный чат занимает только одного воркера и не задерживает
+остальные. Общее число ожидающих апдейтов ограничено — при переполнении
+отвечаем 503, и Telegram повторит доставку позже.
+
+Без WEBHOOK_SECRET сервер не принимает апдейты: секрет генерируется и
+передаётся в set_webhook, а если вебхук устанавливается не этим
+процессом, запуск прерывается. Метрики отдаются на отдельном внутреннем
+порту (WEBHOOK_METRICS_HOST/WEBHOOK_METRICS_PORT), а не рядом с вебхуком.
+"""
+import asyncio
+import hmac
+import logging
+import secrets
+import signal
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import Config
+from database.database import get_async_session_factory
+from bot.outbox import OutboxSender
+from bot.my_listings import my_listings_pages
+from bot.api import api_metrics
+from bot.inline_search import inline_cache
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def chat_key(update: Update) -> int:
+    """Ключ упорядочивания: id чата, иначе id пользователя, иначе id апдейта"""
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None and getattr(event, "message", None) is not None:
+        chat = event.message.chat
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+class WebhookMetrics:
+    def __init__(self, latency_window: int = 1000):
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def as_dict(self, pending: int, chat_depths: Dict[int, int]) -> dict:
+        latencies = sorted(self._latencies)
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 3)
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_depth": pending,
+            "chats_waiting": len(chat_depths),
+            "max_chat_queue_depth": max(chat_depths.values()) if chat_depths else 0,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+            },
+        }
+
+class UpdateWorkerPool:
+    """Общий пул воркеров над очередями чатов с сохранением порядка внутри чата"""
+
+    def __init__(self, bot: Bot, dispatcher: Dispatcher,
+                 workers: int = Config.WEBHOOK_WORKERS,
+                 queue_size: int = Config.WEBHOOK_QUEUE_SIZE):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.metrics = WebhookMetrics()
+        self.workers = workers
+        self.queue_size = queue_size
+        # Ожидающие апдейты по чатам; чат есть в словаре, пока у него есть
+        # апдейты или один из них обрабатывается
+        self._chats: Dict[int, Deque[Tuple[Update, float]]] = {}
+        # Чаты, которые можно брать в работу: каждый чат здесь не больше одного
+        # раза и не одновременно с обработкой, поэтому порядок внутри чата сохраняется
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self, timeout: Optional[float] = 10) -> None:
+        """Дожидается разбора очередей и останавливает воркеры"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Очередь вебхука не разобрана до остановки")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, update: Update) -> bool:
+        if self._pending >= self.queue_size:
+            self.metrics.rejected += 1
+            return False
+
+        key = chat_key(update)
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = deque()
+            self._ready.put_nowait(key)
+        chat.append((update, time.perf_counter()))
+        self._pending += 1
+        self._idle.clear()
+        self.metrics.received += 1
+        return True
+
+    def pending(self) -> int:
+        return self._pending
+
+    def chat_depths(self) -> Dict[int, int]:
+        return {key: len(chat) for key, chat in self._chats.items() if chat}
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            chat = self._chats[key]
+            update, enqueued_at = chat.popleft()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+                self.metrics.processed += 1
+            except Exception as exc:
+                self.metrics.failed += 1
+                logger.exception(f"Ошибка обработки апдейта {update.update_id}: {exc}")
+            finally:
+                # Время от получения апдейта до конца обработки
+                self.metrics.observe(time.perf_counter() - enqueued_at)
+                self._pending -= 1
+                if chat:
+                    # Следующий апдейт чата встаёт в конец: другие чаты не ждут
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+                if not self._pending:
+                    self._idle.set()
+
+def create_webhook_app(bot: Bot, dispatcher: Dispatcher,
+                       secret: str = Config.WEBHOOK_SECRET,
+                       path: str = Config.WEBHOOK_PATH,
+                       set_webhook: bool = True,
+                       pool: Optional[UpdateWorkerPool] = None,
+                       outbox: Optional[OutboxSender] = None) -> web.Application:
+    will_set_webhook = set_webhook and bool(Config.WEBHOOK_URL)
+    if not secret:
+        if not will_set_webhook:
+            raise RuntimeError(
+                "WEBHOOK_SECRET не задан, а вебхук устанавливается не этим процессом: "
+                "без секрета любой POST был бы принят как апдейт"
+            )
+        # Секрет живёт до перезапуска и сразу передаётся в set_webhook
+        secret = secrets.token_urlsafe(32)
+        logger.info("WEBHOOK_SECRET не задан — сгенерирован секрет на время работы процесса")
+
+    app = web.Application()
+    pool = pool or UpdateWorkerPool(bot, dispatcher)
+    outbox = outbox or OutboxSender(bot, get_async_session_factory())
+    app["pool"] = pool
+    app["outbox"] = outbox
+
+    async def handle_update(request: web.Request) -> web.Response:
+        received_secret = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(received_secret.encode(), secret.encode()):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception:
+            return web.Response(status=400)
+
+        if not pool.submit(update):
+            return web.Response(status=503)
+        return web.Response()
+
+    async def on_startup(app: web.Application) -> None:
+        pool.start()
+        outbox.start()
+        if will_set_webhook:
+            await bot.set_webhook(
+                url=Config.WEBHOOK_URL.rstrip("/") + path,
+                secret_token=secret,
+                allowed_updates=dispatcher.resolve_used_update_types()
+            )
+            logger.info(f"Вебхук установлен: {Config.WEBHOOK_URL.rstrip('/')}{path}")
+
+    async def on_shutdown(app: web.Application) -> None:
+        await pool.stop()
+        await outbox.stop()
+        await bot.session.close()
+
+    app.router.add_post(path, handle_update)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+def create_metrics_app(webhook_app: web.Application) -> web.Application:
+    """Метрики вебхука — отдельное приложение для внутреннего порта"""
+    pool = webhook_app["pool"]
+    outbox = webhook_app["outbox"]
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.json_response({
+            **pool.metrics.as_dict(pool.pending(), pool.chat_depths()),
+            "outbox": outbox.stats(),
+            "my_listings": my_listings_pages.stats(),
+            "bot_api": api_metrics.stats(),
+            "inline_search": inline_cache.stats()
+        })
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+async def serve_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    app = create_webhook_app(bot, dispatcher)
+    sites = (
+        (app, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT),
+        (create_metrics_app(app), Config.WEBHOOK_METRICS_HOST, Config.WEBHOOK_METRICS_PORT),
+    )
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopped.set)
+        except NotImplementedError:
+            # Windows: остановка по KeyboardInterrupt
+            pass
+
+    runners = []
+    try:
+        for application, host, port in sites:
+            runner = web.AppRunner(application)
+            await runner.setup()
+            runners.append(runner)
+            await web.TCPSite(runner, host, port).start()
+            logger.info(f"Слушаем {host}:{port}")
+        await stopped.wait()
+    finally:
+        for runner in reversed(runners):
+            await runner.cleanup()
+
+def run_webhook(bot: Bot, dispatcher: Dispatcher) -> None:
+    asyncio.run(serve_webhook(bot, dispatcher))
@@ -0,0 +1,29 @@
+"""
+Сборка статики Mini App перед деплоем
+
+Копирует web/static в web/static/dist с хэшем содержимого в именах
+файлов, создаёт предсжатые .gz/.br версии и manifest.json.
+"""
+import os
+
+from web.assets import build_assets, DIST_DIR, brotli
+
+def main():
+    manifest = build_assets()
+
+    print("📦 Сборка статики")
+    print("=" * 60)
+    for logical, hashed in sorted(manifest.items()):
+        path = os.path.join(DIST_DIR, hashed)
+        sizes = [f"{os.path.getsize(path)} B"]
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(path + suffix):
+                sizes.append(f"{suffix[1:]} {os.path.getsize(path + suffix)} B")
+        print(f"   {logical} → {hashed} ({', '.join(sizes)})")
+    print("=" * 60)
+    if brotli is None:
+        print("⚠️ Пакет brotli не установлен — собраны только .gz версии")
+    print(f"✅ Готово: {len(manifest)} файлов в {DIST_DIR}")
+
+if __name__ == "__main__":
+    main()
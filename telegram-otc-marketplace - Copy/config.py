@@ -7,13 +7,86 @@ class Config:
     # Telegram Bot
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '16'))
+    WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+    WEBHOOK_METRICS_HOST = os.getenv('WEBHOOK_METRICS_HOST', '127.0.0.1')  # метрики только для внутренней сети
+    WEBHOOK_METRICS_PORT = int(os.getenv('WEBHOOK_METRICS_PORT', '9090'))
     
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///marketplace.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # секунды
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # секунды
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))  # миллисекунды
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # байты
     
     # Web App
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-me')
     WEB_APP_URL = os.getenv('WEB_APP_URL', 'http://localhost:5000')
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')  # auto, orjson или std
+    
+    # Cache
+    STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))  # секунды
+    VIEW_FLUSH_INTERVAL = int(os.getenv('VIEW_FLUSH_INTERVAL', '5'))  # секунды
+    VIEW_FLUSH_THRESHOLD = int(os.getenv('VIEW_FLUSH_THRESHOLD', '500'))  # просмотров
+    VIEWS_CACHE_INTERVAL = int(os.getenv('VIEWS_CACHE_INTERVAL', '60'))  # секунды; отставание просмотров в кэше ответов
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))  # секунды
+    USER_AUTH_CACHE_TTL = int(os.getenv('USER_AUTH_CACHE_TTL', '5'))  # секунды; права без Redis
+    AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))  # проверенных initData
+    LAST_LOGIN_GRANULARITY = int(os.getenv('LAST_LOGIN_GRANULARITY', '300'))  # секунды
+    LAST_LOGIN_FLUSH_INTERVAL = int(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', '60'))  # секунды
+    REDIS_URL = os.getenv('REDIS_URL', '')  # pub/sub инвалидации между процессами
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '512'))  # готовых JSON-ответов
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))  # секунды
+    LISTING_CARD_CACHE_SIZE = int(os.getenv('LISTING_CARD_CACHE_SIZE', '20000'))  # карточек объявлений
+    LISTING_CARD_CACHE_TTL = int(os.getenv('LISTING_CARD_CACHE_TTL', '300'))  # секунды
+    LOCAL_CACHE_TTL = int(os.getenv('LOCAL_CACHE_TTL', '15'))  # секунды; кэши ответов и карточек без Redis
+    CACHE_CONTROL_LISTINGS = os.getenv('CACHE_CONTROL_LISTINGS', 'public, no-cache')
+    CACHE_CONTROL_STATS = os.getenv('CACHE_CONTROL_STATS', 'public, max-age=30')
+    CACHE_CONTROL_CATEGORIES = os.getenv('CACHE_CONTROL_CATEGORIES', 'public, max-age=300')
+    
+    # Compression
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))  # байты
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))  # уровень gzip для динамических ответов
+    
+    # Admin stats rollups
+    ROLLUP_INTERVAL = int(os.getenv('ROLLUP_INTERVAL', '300'))  # секунды
+    ROLLUP_LOOKBACK_HOURS = int(os.getenv('ROLLUP_LOOKBACK_HOURS', '2'))
+    
+    # Admin bulk operations
+    BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '1000'))  # строк на один UPDATE/DELETE
+    BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', '100'))  # ошибок импорта в ответе
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0'))  # процессов, 0 — по числу ядер
+    
+    # Messaging
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))  # сообщений за один проход отправщика
+    OUTBOX_RATE_LIMIT = float(os.getenv('OUTBOX_RATE_LIMIT', '25'))  # сообщений в секунду на бота (лимит Telegram ~30)
+    OUTBOX_CHAT_RATE_LIMIT = float(os.getenv('OUTBOX_CHAT_RATE_LIMIT', '1'))  # сообщений в секунду в один чат
+    OUTBOX_BATCH_WINDOW = float(os.getenv('OUTBOX_BATCH_WINDOW', '2'))  # секунды; более поздние отправки откладываются
+    OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', '5'))  # секунды без сигнала через pub/sub
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+    OUTBOX_LEASE = int(os.getenv('OUTBOX_LEASE', '60'))  # секунды; строки упавшего отправщика забираются снова
+    OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '7'))  # сколько хранить отправленные и отброшенные строки
+    OUTBOX_PURGE_INTERVAL = int(os.getenv('OUTBOX_PURGE_INTERVAL', '3600'))  # секунды между чистками outbox
+    MESSAGE_STREAM_KEEPALIVE = int(os.getenv('MESSAGE_STREAM_KEEPALIVE', '15'))  # секунды
+    MESSAGE_STREAM_MAX_CONNECTIONS = int(os.getenv('MESSAGE_STREAM_MAX_CONNECTIONS', '32'))  # SSE-соединений на процесс
+    MESSAGE_POLL_INTERVAL = int(os.getenv('MESSAGE_POLL_INTERVAL', '20'))  # секунды опроса, когда SSE-мест нет
+    
+    # Bot listings
+    MY_LISTINGS_PAGE_SIZE = int(os.getenv('MY_LISTINGS_PAGE_SIZE', '5'))  # объявлений на странице
+    MY_LISTINGS_CACHE_SIZE = int(os.getenv('MY_LISTINGS_CACHE_SIZE', '5000'))  # готовых страниц
+    MY_LISTINGS_CACHE_TTL = int(os.getenv('MY_LISTINGS_CACHE_TTL', '300'))  # секунды
+    INLINE_PAGE_SIZE = int(os.getenv('INLINE_PAGE_SIZE', '20'))  # результатов в одном ответе (лимит Telegram 50)
+    INLINE_MAX_RESULTS = int(os.getenv('INLINE_MAX_RESULTS', '200'))  # результатов поиска на все страницы
+    INLINE_CACHE_SIZE = int(os.getenv('INLINE_CACHE_SIZE', '2000'))  # страниц результатов
+    INLINE_CACHE_TTL = int(os.getenv('INLINE_CACHE_TTL', '15'))  # секунды
+    INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '30'))  # секунды, подсказка кэша для Telegram
     
     # Security
     ADMIN_IDS = list(map(int, os.getenv('ADMIN_IDS', '').split(','))) if os.getenv('ADMIN_IDS') else []
\ No newline at end of file
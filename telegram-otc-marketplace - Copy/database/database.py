@@ -1,11 +1,190 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool, AsyncAdaptedQueuePool
 from database.models import Base
 from config import Config
 
-engine = create_engine(Config.DATABASE_URL)
+def is_sqlite(url):
+    return str(url).startswith('sqlite')
+
+def is_sqlite_memory(url):
+    url = str(url)
+    return url in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in url
+
+def async_database_url(url=Config.DATABASE_URL):
+    """URL для асинхронного драйвера: aiosqlite или asyncpg"""
+    url = str(url)
+    if url.startswith('sqlite://'):
+        return 'sqlite+aiosqlite://' + url[len('sqlite://'):]
+    if url.startswith('postgresql://'):
+        return 'postgresql+asyncpg://' + url[len('postgresql://'):]
+    if url.startswith('postgres://'):
+        return 'postgresql+asyncpg://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url=Config.DATABASE_URL, is_async=False):
+    """Настройки пула соединений — общие для бота, веб-приложения и админ API"""
+    if is_sqlite_memory(url):
+        # Одна общая in-memory база на процесс
+        return {
+            'poolclass': StaticPool,
+            'connect_args': {'check_same_thread': False},
+        }
+    if is_sqlite(url):
+        return {
+            'poolclass': AsyncAdaptedQueuePool if is_async else QueuePool,
+            'pool_size': Config.DB_POOL_SIZE,
+            'max_overflow': Config.DB_MAX_OVERFLOW,
+            'pool_timeout': Config.DB_POOL_TIMEOUT,
+            'pool_pre_ping': True,
+            'connect_args': {
+                'check_same_thread': False,
+                'timeout': Config.SQLITE_BUSY_TIMEOUT / 1000,
+            },
+        }
+    return {
+        'pool_size': Config.DB_POOL_SIZE,
+        'max_overflow': Config.DB_MAX_OVERFLOW,
+        'pool_timeout': Config.DB_POOL_TIMEOUT,
+        'pool_recycle': Config.DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+class PoolMetrics:
+    """Счётчики выдачи соединений из пула"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.invalidated = 0
+        self.checkout_seconds = 0.0
+
+    def as_dict(self, pool=None):
+        with self._lock:
+            data = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'invalidated': self.invalidated,
+                'avg_hold_ms': round(self.checkout_seconds / self.checkins * 1000, 3) if self.checkins else 0.0,
+            }
+        if pool is not None:
+            data['pool_status'] = pool.status()
+        return data
+
+_pool_metrics = {}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: читатели не блокируются писателем, писатели ждут busy_timeout вместо ошибки
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT)}')
+    cursor.execute(f'PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}')
+    cursor.close()
+
+def install_engine_hooks(engine):
+    """Вешает SQLite-прагмы и метрики пула на движок (в том числе созданный Flask-SQLAlchemy)"""
+    if engine in _pool_metrics:
+        return _pool_metrics[engine]
+
+    metrics = PoolMetrics()
+    _pool_metrics[engine] = metrics
+
+    if is_sqlite(engine.url) and not is_sqlite_memory(engine.url):
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with metrics._lock:
+            metrics.connects += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checkout_at'] = time.perf_counter()
+        with metrics._lock:
+            metrics.checkouts += 1
+            metrics.checked_out += 1
+            metrics.max_checked_out = max(metrics.max_checked_out, metrics.checked_out)
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checkout_at', None)
+        with metrics._lock:
+            metrics.checkins += 1
+            metrics.checked_out = max(metrics.checked_out - 1, 0)
+            if started is not None:
+                metrics.checkout_seconds += time.perf_counter() - started
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics._lock:
+            metrics.invalidated += 1
+
+    return metrics
+
+def create_db_engine(url=Config.DATABASE_URL):
+    """Единая фабрика движков БД"""
+    engine = create_engine(url, **engine_options(url))
+    install_engine_hooks(engine)
+    return engine
+
+def get_pool_metrics(target_engine=None):
+    target_engine = target_engine or engine
+    metrics = _pool_metrics.get(target_engine)
+    return metrics.as_dict(target_engine.pool) if metrics else {}
+
+def create_async_db_engine(url=Config.DATABASE_URL):
+    """Асинхронный движок для бота с теми же настройками пула и прагмами"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = async_database_url(url)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, is_async=True))
+    install_engine_hooks(async_engine.sync_engine)
+    return async_engine
+
+def insert_for(dialect_name):
+    """INSERT с поддержкой ON CONFLICT для текущего диалекта"""
+    if dialect_name == 'postgresql':
+        return postgresql_insert
+    return sqlite_insert
+
+engine = create_db_engine(Config.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок создаётся лениво: он нужен только боту
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine(Config.DATABASE_URL)
+    return _async_engine
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        _async_session_factory = sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_session_factory
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
@@ -14,4 +193,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
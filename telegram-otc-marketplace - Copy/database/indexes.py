@@ -0,0 +1,30 @@
+"""
+Составные индексы таблицы listings для ленты Mini App
+
+Лента всегда фильтруется по status и сортируется по одной колонке с id
+в качестве разделителя, поэтому под каждую сортировку есть индекс
+(status, [category,] колонка, id). Индексы создаются при init_db
+через CREATE INDEX IF NOT EXISTS — так же, как полнотекстовый индекс.
+Индекс "Моих объявлений" бота объявлен в модели Listing.
+"""
+from sqlalchemy import text
+
+LISTING_INDEXES = [
+    ("idx_listings_status_created", "status, created_at, id"),
+    ("idx_listings_status_category_created", "status, category, created_at, id"),
+    ("idx_listings_status_price", "status, price, id"),
+    ("idx_listings_status_category_price", "status, category, price, id"),
+    ("idx_listings_status_views", "status, views, id"),
+    ("idx_listings_status_subscribers", "status, subscribers_count, id"),
+]
+
+def ensure_listing_indexes(engine):
+    """Создаёт недостающие индексы под сортировки и фильтры ленты"""
+    try:
+        with engine.begin() as conn:
+            for name, columns in LISTING_INDEXES:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON listings ({columns})"))
+    except Exception as e:
+        print(f"⚠️ Не удалось создать индексы listings: {e}")
+        return False
+    return True
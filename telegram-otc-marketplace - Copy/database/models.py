@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Boolean, ForeignKey, Enum as SQLEnum, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -35,6 +35,10 @@ class User(Base):
     
     def is_moderator(self):
         return self.role in [UserRole.ADMIN, UserRole.MODERATOR]
+    
+    __table_args__ = (
+        Index('idx_users_created', 'created_at'),
+    )
 
 class Category(Base):
     __tablename__ = "categories"
@@ -70,9 +74,90 @@ class Listing(Base):
     owner = relationship("User", back_populates="listings")
     category = relationship("Category", back_populates="listings")
     
+    # Поля AdminListingResponse, читаются через from_attributes
+    @property
+    def owner_username(self):
+        return self.owner.username if self.owner else None
+    
+    @property
+    def category_name(self):
+        return self.category.name if self.category else None
+    
     # Индексы для оптимизации поиска
     __table_args__ = (
         Index('idx_listings_search', 'title', 'location', 'is_active'),
         Index('idx_listings_category_price', 'category_id', 'price', 'is_active'),
         Index('idx_listings_created', 'created_at', 'is_active'),
-    )
\ No newline at end of file
+        # "Мои объявления" в боте: страницы продавца по (created_at, id)
+        Index('idx_listings_owner_created', 'owner_id', 'created_at', 'id'),
+    )
+
+class Message(Base):
+    """Сообщения покупателей продавцам по объявлениям"""
+    __tablename__ = "messages"
+    
+    id = Column(Integer, primary_key=True)
+    sender_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
+    recipient_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
+    listing_id = Column(Integer, ForeignKey("listings.id"), nullable=False)
+    message = Column(Text, nullable=False)
+    is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_messages_recipient', 'recipient_id', 'id'),
+    )
+
+class RollupBucket(enum.Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+class StatsRollup(Base):
+    """Почасовые и дневные счётчики регистраций и объявлений для графиков админки"""
+    __tablename__ = "stats_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(SQLEnum(RollupBucket), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    users_created = Column(Integer, default=0, nullable=False)
+    listings_created = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('bucket', 'bucket_start', name='uq_stats_rollups_bucket'),
+    )
+
+class OutboxStatus(enum.Enum):
+    PENDING = "pending"
+    # Забрана отправщиком до locked_until
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    # Правка, вытесненная более новой правкой того же сообщения
+    SKIPPED = "skipped"
+
+class OutboxMessage(Base):
+    """Исходящие сообщения бота: пишутся в одной транзакции с событием, доставляются отправщиком"""
+    __tablename__ = "outbox"
+    
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    # Задан — правка уже отправленного сообщения, иначе новое сообщение
+    edit_message_id = Column(BigInteger)
+    text = Column(Text, nullable=False)
+    reply_markup = Column(Text)
+    status = Column(SQLEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Кто и до какого времени отправляет строку; после locked_until её забирает другой отправщик
+    locked_by = Column(String(32))
+    locked_until = Column(DateTime)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index('idx_outbox_due', 'status', 'next_attempt_at', 'id'),
+        Index('idx_outbox_chat', 'chat_id', 'id'),
+        Index('idx_outbox_edit', 'chat_id', 'edit_message_id', 'status'),
+    )
@@ -0,0 +1,81 @@
+"""
+Курсорная (keyset) пагинация
+
+Курсор — непрозрачная строка (base64 от JSON), которую клиент получает
+в next_cursor и возвращает как есть. Вместо OFFSET следующая страница
+выбирается условием "строго после последней строки" по индексу.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, or_
+
+def encode_cursor(values):
+    """Кодирует позицию в непрозрачный курсор"""
+    payload = json.dumps(values, separators=(',', ':'), default=_json_default)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Декодирует курсор, возвращает None для некорректного значения"""
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, dict) else None
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Cannot encode {type(value).__name__} in cursor')
+
+def after_created_cursor(model, cursor_values, descending=True):
+    """
+    Условие "после курсора" для сортировки по (created_at, id).
+    Возвращает None, если курсор не относится к этой сортировке.
+    """
+    try:
+        created_at = datetime.fromisoformat(cursor_values['c'])
+        row_id = int(cursor_values['i'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if descending:
+        return or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        )
+    return or_(
+        model.created_at > created_at,
+        and_(model.created_at == created_at, model.id > row_id)
+    )
+
+def keyset_cursor(row, column):
+    """Курсор по (column, id) для последней строки страницы"""
+    return encode_cursor({'s': column, 'k': getattr(row, column), 'i': row.id})
+
+def after_keyset_cursor(model, column, cursor_values, descending=True):
+    """
+    Условие "после курсора" для сортировки по (column, id).
+    Возвращает None, если курсор выдан для другой сортировки.
+    """
+    if cursor_values.get('s') != column:
+        return None
+
+    attribute = getattr(model, column)
+    try:
+        value = cursor_values['k']
+        row_id = int(cursor_values['i'])
+        if isinstance(attribute.type, DateTime):
+            value = datetime.fromisoformat(value)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if value is None:
+        return None
+    if descending:
+        return or_(attribute < value, and_(attribute == value, model.id < row_id))
+    return or_(attribute > value, and_(attribute == value, model.id > row_id))
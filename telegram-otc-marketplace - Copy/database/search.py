@@ -0,0 +1,163 @@
+"""
+Полнотекстовый поиск по объявлениям
+
+SQLite: виртуальная таблица FTS5 listings_fts, синхронизируется триггерами.
+PostgreSQL: генерируемая колонка search_vector (tsvector) с GIN-индексом.
+Для остальных бэкендов остаётся поиск через ILIKE.
+"""
+import re
+
+from sqlalchemy import text, func, or_, false, literal_column, table, column
+
+# Максимум слов из поисковой строки, которые идут в запрос
+MAX_SEARCH_TERMS = 8
+
+listings_fts = table('listings_fts', column('rowid'), column('rank'))
+
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+        title, description,
+        content='listings', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN
+        INSERT INTO listings_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title, description ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO listings_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+POSTGRES_FTS_DDL = [
+    """
+    ALTER TABLE listings ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_listings_search_vector ON listings USING GIN (search_vector)",
+]
+
+# Кэш результата проверки: url движка -> есть ли полнотекстовый индекс
+_fulltext_support = {}
+
+def ensure_fulltext_index(engine):
+    """Создаёт полнотекстовый индекс для listings, если бэкенд его поддерживает"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == 'sqlite':
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'"
+                )).first()
+                for statement in SQLITE_FTS_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    # Индексируем уже существующие объявления
+                    conn.execute(text("INSERT INTO listings_fts(listings_fts) VALUES ('rebuild')"))
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_FTS_DDL:
+                    conn.execute(text(statement))
+            else:
+                _fulltext_support[str(engine.url)] = False
+                return False
+    except Exception as e:
+        print(f"⚠️ Полнотекстовый поиск недоступен, используется ILIKE: {e}")
+        _fulltext_support[str(engine.url)] = False
+        return False
+
+    _fulltext_support[str(engine.url)] = True
+    return True
+
+def fulltext_available(engine):
+    """Проверяет, что полнотекстовый индекс уже создан"""
+    key = str(engine.url)
+    if key not in _fulltext_support:
+        dialect = engine.dialect.name
+        try:
+            with engine.connect() as conn:
+                if dialect == 'sqlite':
+                    found = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'"
+                    )).first()
+                elif dialect == 'postgresql':
+                    found = conn.execute(text(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'listings' AND column_name = 'search_vector'"
+                    )).first()
+                else:
+                    found = None
+        except Exception:
+            found = None
+        _fulltext_support[key] = found is not None
+    return _fulltext_support[key]
+
+def search_terms(search):
+    """Разбивает строку поиска на слова"""
+    return re.findall(r'\w+', search.lower())[:MAX_SEARCH_TERMS]
+
+def sqlite_match_expression(terms):
+    """Строит выражение FTS5 MATCH с префиксным поиском по каждому слову"""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+def postgres_tsquery_expression(terms):
+    """Строит выражение to_tsquery с префиксным поиском по каждому слову"""
+    return ' & '.join(f"'{term}':*" for term in terms)
+
+def apply_search(query, model, search, engine):
+    """
+    Добавляет к запросу (Query или select) фильтр поиска по title/description.
+    При полнотекстовом индексе результаты сортируются по релевантности.
+    Равные по релевантности (и вся выдача ILIKE) идут от новых к старым по
+    (created_at, id) — порядок однозначен, и страницы по OFFSET не теряют
+    и не повторяют строки. Строка без единого слова (одни символы) не
+    находит ничего, а не всю ленту.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return query.where(false())
+
+    dialect = engine.dialect.name
+    if fulltext_available(engine):
+        if dialect == 'sqlite':
+            return query.join(
+                listings_fts, listings_fts.c.rowid == model.id
+            ).where(
+                literal_column('listings_fts').op('MATCH')(sqlite_match_expression(terms))
+            ).order_by(listings_fts.c.rank, model.created_at.desc(), model.id.desc())
+
+        if dialect == 'postgresql':
+            search_vector = literal_column('listings.search_vector')
+            tsquery = func.to_tsquery('simple', postgres_tsquery_expression(terms))
+            return query.where(
+                search_vector.op('@@')(tsquery)
+            ).order_by(
+                func.ts_rank(search_vector, tsquery).desc(), model.created_at.desc(), model.id.desc()
+            )
+
+    # Запасной вариант для бэкендов без полнотекстового поиска
+    search = f'%{search}%'
+    return query.where(
+        or_(
+            model.title.ilike(search),
+            model.description.ilike(search)
+        )
+    ).order_by(model.created_at.desc(), model.id.desc())
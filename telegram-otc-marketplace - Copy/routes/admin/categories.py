@@ -9,8 +9,14 @@ from app.schemas.admin import (
     AdminCategoryResponse, AdminCategoryCreate, AdminCategoryUpdate
 )
 from app.middleware.admin import require_admin
+from app.utils.pubsub import publish_data_change
+from app.utils.responses import FastJSONResponse
 
-router = APIRouter(prefix="/admin/categories", tags=["Admin - Categories"])
+router = APIRouter(
+    prefix="/admin/categories",
+    tags=["Admin - Categories"],
+    default_response_class=FastJSONResponse
+)
 
 @router.get("/", response_model=List[AdminCategoryResponse])
 def get_categories(
@@ -24,19 +30,11 @@ def get_categories(
         func.count(Listing.id).label('listings_count')
     ).outerjoin(Listing).group_by(Category.id).order_by(Category.name).all()
     
-    categories_response = []
+    # Количество объявлений передаётся в ответ атрибутом ORM-объекта
     for category, listings_count in categories:
-        category_dict = {
-            "id": category.id,
-            "name": category.name,
-            "description": category.description,
-            "is_active": category.is_active,
-            "created_at": category.created_at,
-            "listings_count": listings_count
-        }
-        categories_response.append(AdminCategoryResponse(**category_dict))
-    
-    return categories_response
+        category.listings_count = listings_count
+    
+    return [category for category, _ in categories]
 
 @router.get("/{category_id}", response_model=AdminCategoryResponse)
 def get_category(
@@ -58,16 +56,9 @@ def get_category(
         )
     
     category, listings_count = result
-    category_dict = {
-        "id": category.id,
-        "name": category.name,
-        "description": category.description,
-        "is_active": category.is_active,
-        "created_at": category.created_at,
-        "listings_count": listings_count
-    }
-    
-    return AdminCategoryResponse(**category_dict)
+    category.listings_count = listings_count
+    
+    return category
 
 @router.post("/", response_model=AdminCategoryResponse, status_code=status.HTTP_201_CREATED)
 def create_category(
@@ -93,17 +84,11 @@ def create_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    publish_data_change()
     
-    category_dict = {
-        "id": db_category.id,
-        "name": db_category.name,
-        "description": db_category.description,
-        "is_active": db_category.is_active,
-        "created_at": db_category.created_at,
-        "listings_count": 0
-    }
+    db_category.listings_count = 0
     
-    return AdminCategoryResponse(**category_dict)
+    return db_category
 
 @router.put("/{category_id}", response_model=AdminCategoryResponse)
 def update_category(
@@ -141,22 +126,16 @@ def update_category(
     
     db.commit()
     db.refresh(db_category)
+    publish_data_change()
     
     # Получение количества объявлений
     listings_count = db.query(func.count(Listing.id)).filter(
         Listing.category_id == category_id
     ).scalar()
     
-    category_dict = {
-        "id": db_category.id,
-        "name": db_category.name,
-        "description": db_category.description,
-        "is_active": db_category.is_active,
-        "created_at": db_category.created_at,
-        "listings_count": listings_count
-    }
+    db_category.listings_count = listings_count
     
-    return AdminCategoryResponse(**category_dict)
+    return db_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_category(
@@ -185,4 +164,5 @@ def delete_category(
         )
     
     db.delete(db_category)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    publish_data_change()
\ No newline at end of file
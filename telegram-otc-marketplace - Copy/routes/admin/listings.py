@@ -1,18 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, update, delete
 from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.models import User, Listing, Category
-from app.schemas.admin import AdminListingResponse, AdminListingUpdate
+from app.schemas.admin import (
+    AdminListingResponse, AdminListingUpdate, AdminListingFilters,
+    AdminListingBulkRequest, AdminListingBulkUpdate, AdminBulkResult
+)
 from app.middleware.admin import require_moderator
+from app.utils.pubsub import publish_data_change, publish_listing_invalidation, publish_listings_invalidation
+from app.utils.bulk import id_list_chunks, matching_id_chunks, bulk_response, export_response
+from app.utils.responses import FastJSONResponse
 
-router = APIRouter(prefix="/admin/listings", tags=["Admin - Listings"])
+# Роуты возвращают ORM-объекты: response_model читает их через from_attributes
+router = APIRouter(
+    prefix="/admin/listings",
+    tags=["Admin - Listings"],
+    default_response_class=FastJSONResponse
+)
 
-@router.get("/", response_model=List[AdminListingResponse])
-def get_listings(
+# Колонки выгрузки: поля объявления плюс имя владельца и название категории
+LISTING_EXPORT_COLUMNS = [
+    Listing.id, Listing.title, Listing.description, Listing.price,
+    Listing.category_id, Category.name.label("category_name"),
+    Listing.owner_id, User.username.label("owner_username"),
+    Listing.location, Listing.contact_phone, Listing.contact_email,
+    Listing.is_active, Listing.is_featured, Listing.views_count,
+    Listing.created_at, Listing.updated_at
+]
+LISTING_EXPORT_FIELDS = [column.key for column in LISTING_EXPORT_COLUMNS]
+
+# Колонки сортировки; свойства модели (owner_username, category_name) сюда не входят
+LISTING_SORT_COLUMNS = ("created_at", "updated_at", "price", "title", "views_count", "id")
+
+def listing_filters(
     search: Optional[str] = Query(None, description="Поиск по названию или описанию"),
     category_id: Optional[int] = Query(None, description="Фильтр по категории"),
     owner_id: Optional[int] = Query(None, description="Фильтр по владельцу"),
@@ -21,25 +45,25 @@ def get_listings(
     date_from: Optional[datetime] = Query(None, description="Дата создания от"),
     date_to: Optional[datetime] = Query(None, description="Дата создания до"),
     min_price: Optional[int] = Query(None, description="Минимальная цена"),
-    max_price: Optional[int] = Query(None, description="Максимальная цена"),
-    sort_by: str = Query("created_at", description="Поле для сортировки"),
-    sort_order: str = Query("desc", description="Порядок сортировки (asc/desc)"),
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(require_moderator)
-):
-    """Получение списка объявлений с фильтрами и поиском"""
-    
-    # Базовый запрос с JOIN для получения данных владельца и категории
-    query = db.query(Listing).options(
-        joinedload(Listing.owner),
-        joinedload(Listing.category)
+    max_price: Optional[int] = Query(None, description="Максимальная цена")
+) -> AdminListingFilters:
+    """Фильтры списка объявлений из параметров запроса"""
+    return AdminListingFilters(
+        search=search,
+        category_id=category_id,
+        owner_id=owner_id,
+        is_active=is_active,
+        is_featured=is_featured,
+        date_from=date_from,
+        date_to=date_to,
+        min_price=min_price,
+        max_price=max_price
     )
-    
-    # Применение фильтров
-    if search:
-        search_term = f"%{search}%"
+
+def apply_listing_filters(query, filters: AdminListingFilters):
+    """Фильтры списка объявлений — общие для выборки и пакетных операций"""
+    if filters.search:
+        search_term = f"%{filters.search}%"
         query = query.filter(
             or_(
                 Listing.title.ilike(search_term),
@@ -48,67 +72,86 @@ def get_listings(
             )
         )
     
-    if category_id:
-        query = query.filter(Listing.category_id == category_id)
+    if filters.category_id:
+        query = query.filter(Listing.category_id == filters.category_id)
+    
+    if filters.owner_id:
+        query = query.filter(Listing.owner_id == filters.owner_id)
+    
+    if filters.is_active is not None:
+        query = query.filter(Listing.is_active == filters.is_active)
     
-    if owner_id:
-        query = query.filter(Listing.owner_id == owner_id)
+    if filters.is_featured is not None:
+        query = query.filter(Listing.is_featured == filters.is_featured)
     
-    if is_active is not None:
-        query = query.filter(Listing.is_active == is_active)
+    if filters.date_from:
+        query = query.filter(Listing.created_at >= filters.date_from)
     
-    if is_featured is not None:
-        query = query.filter(Listing.is_featured == is_featured)
+    if filters.date_to:
+        query = query.filter(Listing.created_at <= filters.date_to)
     
-    if date_from:
-        query = query.filter(Listing.created_at >= date_from)
+    if filters.min_price is not None:
+        query = query.filter(Listing.price >= filters.min_price)
     
-    if date_to:
-        query = query.filter(Listing.created_at <= date_to)
+    if filters.max_price is not None:
+        query = query.filter(Listing.price <= filters.max_price)
+    
+    return query
+
+@router.get("/", response_model=List[AdminListingResponse])
+def get_listings(
+    filters: AdminListingFilters = Depends(listing_filters),
+    sort_by: str = Query("created_at", description="Поле для сортировки: " + ", ".join(LISTING_SORT_COLUMNS)),
+    sort_order: str = Query("desc", description="Порядок сортировки (asc/desc)"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_moderator)
+):
+    """Получение списка объявлений с фильтрами и поиском"""
     
-    if min_price is not None:
-        query = query.filter(Listing.price >= min_price)
+    # Базовый запрос с JOIN для получения данных владельца и категории
+    query = db.query(Listing).options(
+        joinedload(Listing.owner),
+        joinedload(Listing.category)
+    )
     
-    if max_price is not None:
-        query = query.filter(Listing.price <= max_price)
+    # Применение фильтров
+    query = apply_listing_filters(query, filters)
     
     # Сортировка
-    if hasattr(Listing, sort_by):
-        order_column = getattr(Listing, sort_by)
-        if sort_order.lower() == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
+    if sort_by not in LISTING_SORT_COLUMNS:
+        sort_by = "created_at"
+    order_column = getattr(Listing, sort_by)
+    if sort_order.lower() == "desc":
+        query = query.order_by(order_column.desc())
+    else:
+        query = query.order_by(order_column.asc())
     
     # Пагинация
-    total = query.count()
     offset = (page - 1) * per_page
-    listings = query.offset(offset).limit(per_page).all()
-    
-    # Формирование ответа
-    listings_response = []
-    for listing in listings:
-        listing_dict = {
-            "id": listing.id,
-            "title": listing.title,
-            "description": listing.description,
-            "price": listing.price,
-            "category_id": listing.category_id,
-            "owner_id": listing.owner_id,
-            "location": listing.location,
-            "contact_phone": listing.contact_phone,
-            "contact_email": listing.contact_email,
-            "is_active": listing.is_active,
-            "is_featured": listing.is_featured,
-            "views_count": listing.views_count,
-            "created_at": listing.created_at,
-            "updated_at": listing.updated_at,
-            "owner_username": listing.owner.username,
-            "category_name": listing.category.name
-        }
-        listings_response.append(AdminListingResponse(**listing_dict))
-    
-    return listings_response
+    return query.offset(offset).limit(per_page).all()
+
+@router.get("/export")
+def export_listings(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$", description="Формат выгрузки: csv или ndjson"),
+    compress: bool = Query(False, description="Отдать файл, сжатый gzip"),
+    filters: AdminListingFilters = Depends(listing_filters),
+    current_admin: User = Depends(require_moderator)
+):
+    """Потоковая выгрузка объявлений по фильтрам — вместо постраничного обхода списка"""
+    return export_response(
+        lambda session: apply_listing_filters(
+            session.query(*LISTING_EXPORT_COLUMNS)
+            .outerjoin(Category, Listing.category_id == Category.id)
+            .outerjoin(User, Listing.owner_id == User.id),
+            filters
+        ).order_by(Listing.id),
+        LISTING_EXPORT_FIELDS,
+        format,
+        "listings",
+        compress
+    )
 
 @router.get("/{listing_id}", response_model=AdminListingResponse)
 def get_listing(
@@ -129,26 +172,7 @@ def get_listing(
             detail="Объявление не найдено"
         )
     
-    listing_dict = {
-        "id": listing.id,
-        "title": listing.title,
-        "description": listing.description,
-        "price": listing.price,
-        "category_id": listing.category_id,
-        "owner_id": listing.owner_id,
-        "location": listing.location,
-        "contact_phone": listing.contact_phone,
-        "contact_email": listing.contact_email,
-        "is_active": listing.is_active,
-        "is_featured": listing.is_featured,
-        "views_count": listing.views_count,
-        "created_at": listing.created_at,
-        "updated_at": listing.updated_at,
-        "owner_username": listing.owner.username,
-        "category_name": listing.category.name
-    }
-    
-    return AdminListingResponse(**listing_dict)
+    return listing
 
 @router.put("/{listing_id}", response_model=AdminListingResponse)
 def update_listing(
@@ -192,6 +216,8 @@ def update_listing(
     db_listing.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_listing)
+    publish_listing_invalidation(listing_id)
+    publish_data_change()
     
     # Загрузка связанных данных
     db_listing = db.query(Listing).options(
@@ -199,26 +225,7 @@ def update_listing(
         joinedload(Listing.category)
     ).filter(Listing.id == listing_id).first()
     
-    listing_dict = {
-        "id": db_listing.id,
-        "title": db_listing.title,
-        "description": db_listing.description,
-        "price": db_listing.price,
-        "category_id": db_listing.category_id,
-        "owner_id": db_listing.owner_id,
-        "location": db_listing.location,
-        "contact_phone": db_listing.contact_phone,
-        "contact_email": db_listing.contact_email,
-        "is_active": db_listing.is_active,
-        "is_featured": db_listing.is_featured,
-        "views_count": db_listing.views_count,
-        "created_at": db_listing.created_at,
-        "updated_at": db_listing.updated_at,
-        "owner_username": db_listing.owner.username,
-        "category_name": db_listing.category.name
-    }
-    
-    return AdminListingResponse(**listing_dict)
+    return db_listing
 
 @router.delete("/{listing_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_listing(
@@ -237,6 +244,8 @@ def delete_listing(
     
     db.delete(db_listing)
     db.commit()
+    publish_listing_invalidation(listing_id)
+    publish_data_change()
 
 @router.patch("/{listing_id}/toggle-active")
 def toggle_listing_active(
@@ -256,6 +265,8 @@ def toggle_listing_active(
     db_listing.is_active = not db_listing.is_active
     db_listing.updated_at = datetime.utcnow()
     db.commit()
+    publish_listing_invalidation(listing_id)
+    publish_data_change()
     
     return {"message": f"Объявление {'активировано' if db_listing.is_active else 'деактивировано'}"}
 
@@ -277,5 +288,76 @@ def toggle_listing_featured(
     db_listing.is_featured = not db_listing.is_featured
     db_listing.updated_at = datetime.utcnow()
     db.commit()
+    publish_listing_invalidation(listing_id)
+    publish_data_change()
     
-    return {"message": f"Объявление {'добавлено в рекомендуемые' if db_listing.is_featured else 'убрано из рекомендуемых'}"}
\ No newline at end of file
+    return {"message": f"Объявление {'добавлено в рекомендуемые' if db_listing.is_featured else 'убрано из рекомендуемых'}"}
+
+def bulk_id_chunks(db: Session, request: AdminListingBulkRequest):
+    """Пачки id из явного списка или из выборки по фильтрам"""
+    if request.ids:
+        return id_list_chunks(request.ids)
+    
+    filters = request.filters
+    if filters is None or not filters.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Укажите ids или хотя бы один фильтр"
+        )
+    return matching_id_chunks(apply_listing_filters(db.query(Listing), filters), Listing)
+
+def bulk_listings_response(request: AdminListingBulkRequest, make_statement, stream: bool, db: Session):
+    """Запускает пакетную операцию: итог одним ответом или прогресс в NDJSON"""
+    def after_chunk(ids):
+        publish_listings_invalidation(ids)
+        publish_data_change()
+    
+    return bulk_response(
+        db, Listing, lambda session: bulk_id_chunks(session, request), make_statement, after_chunk, stream
+    )
+
+@router.post("/bulk/update", response_model=AdminBulkResult)
+def bulk_update_listings(
+    request: AdminListingBulkUpdate,
+    stream: bool = Query(False, description="Отдавать прогресс по пачкам в NDJSON"),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_moderator)
+):
+    """Пакетное изменение активности, рекомендуемого статуса или категории"""
+    
+    values = request.model_dump(include={"is_active", "is_featured", "category_id"}, exclude_none=True)
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указаны поля для изменения"
+        )
+    
+    if "category_id" in values and not db.query(Category.id).filter(Category.id == values["category_id"]).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Категория не найдена"
+        )
+    
+    values["updated_at"] = datetime.utcnow()
+    return bulk_listings_response(
+        request,
+        lambda condition: update(Listing).where(condition).values(**values),
+        stream,
+        db
+    )
+
+@router.post("/bulk/delete", response_model=AdminBulkResult)
+def bulk_delete_listings(
+    request: AdminListingBulkRequest,
+    stream: bool = Query(False, description="Отдавать прогресс по пачкам в NDJSON"),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_moderator)
+):
+    """Пакетное удаление объявлений"""
+    
+    return bulk_listings_response(
+        request,
+        lambda condition: delete(Listing).where(condition),
+        stream,
+        db
+    )
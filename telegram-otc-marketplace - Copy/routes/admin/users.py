@@ -1,71 +1,126 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import User, Listing, UserRole
+from app.models import User, Listing, Category, UserRole, RollupBucket
 from app.schemas.admin import (
     AdminUserResponse, AdminUserCreate, AdminUserUpdate, 
-    AdminSearchFilters, AdminStats
+    AdminSearchFilters, AdminStats, AdminUserPage, AdminUserFilters,
+    AdminUserBulkRequest, AdminUserBulkUpdate, AdminUserImportRow,
+    AdminImportResult, AdminBulkResult
 )
 from app.middleware.admin import require_admin
 from app.auth.password import get_password_hash
-from app.utils.pagination import paginate
+from app.utils.pagination import paginate, count_total
+from app.utils.rollups import floor_day, floor_hour, get_series
+from app.utils.pubsub import publish_user_invalidation, publish_users_invalidation
+from app.utils.bulk import (
+    id_list_chunks, matching_id_chunks, bulk_response, read_record_chunks,
+    new_import_result, validate_records, add_import_error, hash_in_pool, export_response
+)
+from app.utils.responses import FastJSONResponse
+
+# Колонки, по которым возможна keyset-пагинация списка пользователей
+USER_SORT_COLUMNS = ("created_at", "username", "email", "id")
 
-router = APIRouter(prefix="/admin/users", tags=["Admin - Users"])
+# Колонки выгрузки; хэш пароля не выгружается
+USER_EXPORT_FIELDS = [
+    "id", "username", "email", "full_name", "phone", "role",
+    "is_active", "is_verified", "created_at", "updated_at", "last_login"
+]
+
+router = APIRouter(
+    prefix="/admin/users",
+    tags=["Admin - Users"],
+    default_response_class=FastJSONResponse
+)
 
 @router.get("/stats", response_model=AdminStats)
 def get_admin_stats(
+    days: int = Query(30, ge=1, le=365, description="Окно дневного ряда, дней"),
+    hours: int = Query(48, ge=1, le=24 * 31, description="Окно почасового ряда, часов"),
     db: Session = Depends(get_db),
     current_admin: User = Depends(require_admin)
 ):
     """Получение общей статистики"""
-    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+    today_start = floor_day(now)
+    tomorrow_start = today_start + timedelta(days=1)
+    
+    # Диапазон вместо func.date(created_at), чтобы сравнение шло по индексу
+    users_created_today = and_(User.created_at >= today_start, User.created_at < tomorrow_start)
+    listings_created_today = and_(Listing.created_at >= today_start, Listing.created_at < tomorrow_start)
+    
+    total_users, active_users, users_today = db.query(
+        func.count(User.id),
+        func.count(case((User.is_active == True, 1))),
+        func.count(case((users_created_today, 1)))
+    ).one()
+    
+    total_listings, active_listings, featured_listings, listings_today, total_categories = db.query(
+        func.count(Listing.id),
+        func.count(case((Listing.is_active == True, 1))),
+        func.count(case((Listing.is_featured == True, 1))),
+        func.count(case((listings_created_today, 1))),
+        select(func.count(Category.id)).scalar_subquery()
+    ).one()
+    
+    # Ряды для графиков берутся только из таблицы ролапов
+    hour_end = floor_hour(now) + timedelta(hours=1)
     
     stats = {
-        "total_users": db.query(func.count(User.id)).scalar(),
-        "active_users": db.query(func.count(User.id)).filter(User.is_active == True).scalar(),
-        "total_listings": db.query(func.count(Listing.id)).scalar(),
-        "active_listings": db.query(func.count(Listing.id)).filter(Listing.is_active == True).scalar(),
-        "featured_listings": db.query(func.count(Listing.id)).filter(Listing.is_featured == True).scalar(),
-        "users_today": db.query(func.count(User.id)).filter(
-            func.date(User.created_at) == today
-        ).scalar(),
-        "listings_today": db.query(func.count(Listing.id)).filter(
-            func.date(Listing.created_at) == today
-        ).scalar(),
+        "total_users": total_users,
+        "active_users": active_users,
+        "total_listings": total_listings,
+        "active_listings": active_listings,
+        "featured_listings": featured_listings,
+        "total_categories": total_categories,
+        "users_today": users_today,
+        "listings_today": listings_today,
+        "daily": get_series(db, RollupBucket.DAY, tomorrow_start - timedelta(days=days), tomorrow_start),
+        "hourly": get_series(db, RollupBucket.HOUR, hour_end - timedelta(hours=hours), hour_end),
     }
     
     return AdminStats(**stats)
 
-@router.get("/", response_model=List[AdminUserResponse])
-def get_users(
+def attach_listings_counts(db: Session, users: List[User]) -> None:
+    """Количество объявлений для страницы пользователей одним запросом по индексу owner_id"""
+    counts = dict(
+        db.query(Listing.owner_id, func.count(Listing.id))
+        .filter(Listing.owner_id.in_([user.id for user in users]))
+        .group_by(Listing.owner_id)
+        .all()
+    ) if users else {}
+    for user in users:
+        user.listings_count = counts.get(user.id, 0)
+
+def user_filters(
     search: Optional[str] = Query(None, description="Поиск по имени пользователя, email или полному имени"),
     role: Optional[UserRole] = Query(None, description="Фильтр по роли"),
     is_active: Optional[bool] = Query(None, description="Фильтр по активности"),
     is_verified: Optional[bool] = Query(None, description="Фильтр по верификации"),
     date_from: Optional[datetime] = Query(None, description="Дата создания от"),
-    date_to: Optional[datetime] = Query(None, description="Дата создания до"),
-    sort_by: str = Query("created_at", description="Поле для сортировки"),
-    sort_order: str = Query("desc", description="Порядок сортировки (asc/desc)"),
-    page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(require_admin)
-):
-    """Получение списка пользователей с фильтрами и поиском"""
-    
-    # Базовый запрос с подсчётом объявлений
-    query = db.query(
-        User,
-        func.count(Listing.id).label('listings_count')
-    ).outerjoin(Listing).group_by(User.id)
-    
-    # Применение фильтров
-    if search:
-        search_term = f"%{search}%"
+    date_to: Optional[datetime] = Query(None, description="Дата создания до")
+) -> AdminUserFilters:
+    """Фильтры списка пользователей из параметров запроса"""
+    return AdminUserFilters(
+        search=search,
+        role=role,
+        is_active=is_active,
+        is_verified=is_verified,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+def apply_user_filters(query, filters: AdminUserFilters):
+    """Фильтры списка пользователей — общие для выборки, выгрузки и пакетных операций"""
+    if filters.search:
+        search_term = f"%{filters.search}%"
         query = query.filter(
             or_(
                 User.username.ilike(search_term),
@@ -74,54 +129,74 @@ def get_users(
             )
         )
     
-    if role:
-        query = query.filter(User.role == role)
+    if filters.role:
+        query = query.filter(User.role == filters.role)
     
-    if is_active is not None:
-        query = query.filter(User.is_active == is_active)
+    if filters.is_active is not None:
+        query = query.filter(User.is_active == filters.is_active)
     
-    if is_verified is not None:
-        query = query.filter(User.is_verified == is_verified)
+    if filters.is_verified is not None:
+        query = query.filter(User.is_verified == filters.is_verified)
     
-    if date_from:
-        query = query.filter(User.created_at >= date_from)
+    if filters.date_from:
+        query = query.filter(User.created_at >= filters.date_from)
     
-    if date_to:
-        query = query.filter(User.created_at <= date_to)
+    if filters.date_to:
+        query = query.filter(User.created_at <= filters.date_to)
     
-    # Сортировка
-    if hasattr(User, sort_by):
-        order_column = getattr(User, sort_by)
-        if sort_order.lower() == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
-    
-    # Пагинация
-    total = query.count()
-    offset = (page - 1) * per_page
-    results = query.offset(offset).limit(per_page).all()
-    
-    # Формирование ответа
-    users_response = []
-    for user, listings_count in results:
-        user_dict = {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "full_name": user.full_name,
-            "phone": user.phone,
-            "role": user.role,
-            "is_active": user.is_active,
-            "is_verified": user.is_verified,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at,
-            "last_login": user.last_login,
-            "listings_count": listings_count
-        }
-        users_response.append(AdminUserResponse(**user_dict))
-    
-    return users_response
+    return query
+
+@router.get("/", response_model=AdminUserPage)
+def get_users(
+    filters: AdminUserFilters = Depends(user_filters),
+    sort_by: str = Query("created_at", description="Поле для сортировки: created_at, username, email, id"),
+    sort_order: str = Query("desc", description="Порядок сортировки (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из next_cursor"),
+    per_page: int = Query(20, ge=1, le=100),
+    total: str = Query("approx", pattern="^(none|approx|exact)$", description="Подсчёт total: none, approx, exact"),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_admin)
+):
+    """Получение списка пользователей с фильтрами и поиском"""
+    
+    filtered = bool(filters.model_dump(exclude_none=True))
+    
+    # Применение фильтров
+    query = apply_user_filters(db.query(User), filters)
+    
+    total_count, total_is_approximate = count_total(db, query, User, total, filtered)
+    
+    # Keyset-пагинация по (колонка сортировки, id)
+    if sort_by not in USER_SORT_COLUMNS:
+        sort_by = "created_at"
+    users, next_cursor = paginate(query, User, sort_by, sort_order.lower() == "desc", cursor, per_page)
+    
+    # Количество объявлений передаётся в ответ атрибутом ORM-объекта
+    attach_listings_counts(db, users)
+    
+    return AdminUserPage(
+        items=users,
+        next_cursor=next_cursor,
+        total=total_count,
+        total_is_approximate=total_is_approximate
+    )
+
+@router.get("/export")
+def export_users(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Формат выгрузки: csv или ndjson"),
+    compress: bool = Query(False, description="Отдать файл, сжатый gzip"),
+    filters: AdminUserFilters = Depends(user_filters),
+    current_admin: User = Depends(require_admin)
+):
+    """Потоковая выгрузка пользователей по фильтрам"""
+    columns = [getattr(User, field) for field in USER_EXPORT_FIELDS]
+    return export_response(
+        lambda session: apply_user_filters(session.query(*columns), filters).order_by(User.id),
+        USER_EXPORT_FIELDS,
+        format,
+        "users",
+        compress
+    )
 
 @router.get("/{user_id}", response_model=AdminUserResponse)
 def get_user(
@@ -130,34 +205,17 @@ def get_user(
     current_admin: User = Depends(require_admin)
 ):
     """Получение информации о пользователе"""
-    result = db.query(
-        User,
-        func.count(Listing.id).label('listings_count')
-    ).outerjoin(Listing).filter(User.id == user_id).group_by(User.id).first()
+    user = db.query(User).filter(User.id == user_id).first()
     
-    if not result:
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
     
-    user, listings_count = result
-    user_dict = {
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "full_name": user.full_name,
-        "phone": user.phone,
-        "role": user.role,
-        "is_active": user.is_active,
-        "is_verified": user.is_verified,
-        "created_at": user.created_at,
-        "updated_at": user.updated_at,
-        "last_login": user.last_login,
-        "listings_count": listings_count
-    }
+    attach_listings_counts(db, [user])
     
-    return AdminUserResponse(**user_dict)
+    return user
 
 @router.post("/", response_model=AdminUserResponse, status_code=status.HTTP_201_CREATED)
 def create_user(
@@ -198,22 +256,9 @@ def create_user(
     db.commit()
     db.refresh(db_user)
     
-    user_dict = {
-        "id": db_user.id,
-        "username": db_user.username,
-        "email": db_user.email,
-        "full_name": db_user.full_name,
-        "phone": db_user.phone,
-        "role": db_user.role,
-        "is_active": db_user.is_active,
-        "is_verified": db_user.is_verified,
-        "created_at": db_user.created_at,
-        "updated_at": db_user.updated_at,
-        "last_login": db_user.last_login,
-        "listings_count": 0
-    }
+    db_user.listings_count = 0
     
-    return AdminUserResponse(**user_dict)
+    return db_user
 
 @router.put("/{user_id}", response_model=AdminUserResponse)
 def update_user(
@@ -265,26 +310,14 @@ def update_user(
     db_user.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_user)
+    publish_user_invalidation(user_id)
     
     # Получение количества объявлений
     listings_count = db.query(func.count(Listing.id)).filter(Listing.owner_id == user_id).scalar()
     
-    user_dict = {
-        "id": db_user.id,
-        "username": db_user.username,
-        "email": db_user.email,
-        "full_name": db_user.full_name,
-        "phone": db_user.phone,
-        "role": db_user.role,
-        "is_active": db_user.is_active,
-        "is_verified": db_user.is_verified,
-        "created_at": db_user.created_at,
-        "updated_at": db_user.updated_at,
-        "last_login": db_user.last_login,
-        "listings_count": listings_count
-    }
+    db_user.listings_count = listings_count
     
-    return AdminUserResponse(**user_dict)
+    return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
@@ -310,6 +343,7 @@ def delete_user(
     
     db.delete(db_user)
     db.commit()
+    publish_user_invalidation(user_id)
 
 @router.patch("/{user_id}/toggle-active")
 def toggle_user_active(
@@ -335,5 +369,140 @@ def toggle_user_active(
     db_user.is_active = not db_user.is_active
     db_user.updated_at = datetime.utcnow()
     db.commit()
+    publish_user_invalidation(user_id)
+    
+    return {"message": f"Пользователь {'активирован' if db_user.is_active else 'деактивирован'}"}
+
+def split_taken_users(db: Session, rows: list, result: dict) -> list:
+    """
+    Отбрасывает строки с занятыми username или email — два запроса
+    на пачку; повторы внутри файла тоже считаются занятыми.
+    """
+    taken_usernames = {
+        username for (username,) in
+        db.query(User.username).filter(User.username.in_({row["username"] for _, row in rows}))
+    }
+    taken_emails = {
+        email for (email,) in
+        db.query(User.email).filter(User.email.in_({row["email"] for _, row in rows}))
+    }
+    
+    new_rows = []
+    for line, row in rows:
+        if row["username"] in taken_usernames:
+            add_import_error(result, line, "Пользователь с таким именем уже существует")
+        elif row["email"] in taken_emails:
+            add_import_error(result, line, "Пользователь с таким email уже существует")
+        else:
+            taken_usernames.add(row["username"])
+            taken_emails.add(row["email"])
+            new_rows.append((line, row))
+            continue
+        result["skipped"] += 1
+    return new_rows
+
+# Попыток пакетной вставки, прежде чем вставлять строки пачки по одной
+INSERT_ATTEMPTS = 3
+
+def insert_users(db: Session, rows: list, result: dict) -> None:
+    """
+    Пакетная вставка. При гонке с параллельной записью занятые строки
+    отбрасываются и пачка вставляется снова; если конфликты не кончаются,
+    строки вставляются по одной, а проигравшие гонку считаются пропущенными.
+    """
+    for _ in range(INSERT_ATTEMPTS):
+        if not rows:
+            return
+        try:
+            db.bulk_insert_mappings(User, [row for _, row in rows])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            rows = split_taken_users(db, rows, result)
+            continue
+        result["created"] += len(rows)
+        return
+    
+    for line, row in rows:
+        try:
+            db.bulk_insert_mappings(User, [row])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            add_import_error(result, line, "Пользователь с таким именем или email уже существует")
+            result["skipped"] += 1
+            continue
+        result["created"] += 1
+
+@router.post("/import", response_model=AdminImportResult)
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="csv или ndjson; по умолчанию по Content-Type"),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_admin)
+):
+    """
+    Импорт пользователей из CSV с заголовком или NDJSON в теле запроса.
+    Тело читается потоком и обрабатывается пачками: проверка уникальности,
+    хэширование паролей в пуле процессов и пакетная вставка.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    result = new_import_result()
+    
+    async for records in read_record_chunks(request.stream(), fmt):
+        rows = [(line, row.model_dump()) for line, row in validate_records(records, AdminUserImportRow, result)]
+        rows = await run_in_threadpool(split_taken_users, db, rows, result)
+        
+        # Хэшируются только пароли строк, которые будут вставлены
+        to_hash = [row for _, row in rows if not row["hashed_password"]]
+        hashes = await hash_in_pool(get_password_hash, [row["password"] for row in to_hash])
+        for row, hashed_password in zip(to_hash, hashes):
+            row["hashed_password"] = hashed_password
+        
+        now = datetime.utcnow()
+        for _, row in rows:
+            del row["password"]
+            row["created_at"] = now
+            row["updated_at"] = now
+        
+        if rows:
+            await run_in_threadpool(insert_users, db, rows, result)
+    
+    return AdminImportResult(**result)
+
+@router.post("/bulk/update", response_model=AdminBulkResult)
+def bulk_update_users(
+    request: AdminUserBulkUpdate,
+    stream: bool = Query(False, description="Отдавать прогресс по пачкам в NDJSON"),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(require_admin)
+):
+    """Пакетная активация, деактивация или смена роли"""
     
-    return {"message": f"Пользователь {'активирован' if db_user.is_active else 'деактивирован'}"}
\ No newline at end of file
+    values = request.model_dump(include={"role", "is_active"}, exclude_none=True)
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указаны поля для изменения"
+        )
+    values["updated_at"] = datetime.utcnow()
+    
+    def make_chunks(session: Session):
+        if request.ids:
+            return id_list_chunks(request.ids)
+        if request.filters is None or not request.filters.model_dump(exclude_none=True):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Укажите ids или хотя бы один фильтр"
+            )
+        return matching_id_chunks(apply_user_filters(session.query(User), request.filters), User)
+    
+    # Свои роль и активность администратор пакетно не меняет
+    return bulk_response(
+        db,
+        User,
+        make_chunks,
+        lambda condition: update(User).where(condition, User.id != current_admin.id).values(**values),
+        publish_users_invalidation,
+        stream
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, model_validator
 from typing import Optional, List
 from datetime import datetime
 from app.models import UserRole
@@ -36,6 +36,57 @@ class AdminUserResponse(AdminUserBase):
     class Config:
         from_attributes = True
 
+class AdminUserPage(BaseModel):
+    items: List[AdminUserResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_approximate: bool = False
+
+class AdminUserFilters(BaseModel):
+    search: Optional[str] = None
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class AdminUserBulkRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    filters: Optional[AdminUserFilters] = None
+
+class AdminUserBulkUpdate(AdminUserBulkRequest):
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+
+class AdminUserImportRow(BaseModel):
+    username: str
+    email: EmailStr
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+    role: UserRole = UserRole.USER
+    is_active: bool = True
+    is_verified: bool = False
+    password: Optional[str] = None
+    # Готовый хэш при переносе базы: пароль повторно не хэшируется
+    hashed_password: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if not self.password and not self.hashed_password:
+            raise ValueError("Нужен password или hashed_password")
+        return self
+
+class AdminImportError(BaseModel):
+    line: int
+    detail: str
+
+class AdminImportResult(BaseModel):
+    processed: int
+    created: int
+    skipped: int
+    failed: int
+    errors: List[AdminImportError] = []
+
 # Объявления
 class AdminListingBase(BaseModel):
     title: str
@@ -60,6 +111,30 @@ class AdminListingUpdate(BaseModel):
     is_featured: Optional[bool] = None
     owner_id: Optional[int] = None
 
+class AdminListingFilters(BaseModel):
+    search: Optional[str] = None
+    category_id: Optional[int] = None
+    owner_id: Optional[int] = None
+    is_active: Optional[bool] = None
+    is_featured: Optional[bool] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+
+class AdminListingBulkRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    filters: Optional[AdminListingFilters] = None
+
+class AdminListingBulkUpdate(AdminListingBulkRequest):
+    is_active: Optional[bool] = None
+    is_featured: Optional[bool] = None
+    category_id: Optional[int] = None
+
+class AdminBulkResult(BaseModel):
+    processed: int
+    affected: int
+
 class AdminListingResponse(AdminListingBase):
     id: int
     owner_id: int
@@ -95,6 +170,11 @@ class AdminCategoryResponse(AdminCategoryBase):
         from_attributes = True
 
 # Статистика
+class AdminStatsPoint(BaseModel):
+    bucket_start: datetime
+    users: int
+    listings: int
+
 class AdminStats(BaseModel):
     total_users: int
     active_users: int
@@ -104,6 +184,8 @@ class AdminStats(BaseModel):
     total_categories: int
     users_today: int
     listings_today: int
+    daily: List[AdminStatsPoint] = []
+    hourly: List[AdminStatsPoint] = []
 
 # Поиск и фильтры
 class AdminSearchFilters(BaseModel):
@@ -0,0 +1,130 @@
+"""
+Инлайн-поиск: запросы к моделям бота (поиск и лента с next_offset) и
+кэш — общий запрос к БД для одинаковых запросов
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from bot.inline_search import InlineSearchCache, inline_results, listing_message, search_listings
+from database.models import Base, Category, Listing, User
+from database.search import ensure_fulltext_index
+
+def run_with_listings(tmp_path, scenario, fulltext):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'inline.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        if fulltext:
+            async with engine.connect() as connection:
+                assert await connection.run_sync(lambda sync_connection: ensure_fulltext_index(sync_connection.engine))
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        created = datetime(2024, 5, 1, 12, 0)
+        async with session_factory() as session:
+            session.add(User(id=1, username="seller", email="seller@example.com", hashed_password="x"))
+            session.add(Category(id=1, name="Электроника"))
+            await session.flush()
+            session.add_all(
+                Listing(id=i, title=f"iPhone {i}" if i % 2 else f"MacBook {i}", description="Почти новый",
+                        price=1000000 + i * 100, category_id=1, owner_id=1, is_active=i != 5,
+                        created_at=created + timedelta(minutes=min(i, 6)))
+                for i in range(1, 8)
+            )
+            await session.commit()
+        try:
+            await scenario(session_factory)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+def check_search(session_factory):
+    async def check():
+        async with session_factory() as session:
+            rows, next_offset = await search_listings(session, ["iphone"], "", page_size=2)
+            # Снятое с продажи объявление 5 не находится
+            assert [row.id for row in rows] == [7, 3] and next_offset == "2"
+            assert rows[0].category == "Электроника"
+            rows, next_offset = await search_listings(session, ["iphone"], next_offset, page_size=2)
+            assert [row.id for row in rows] == [1] and next_offset == ""
+    return check()
+
+def test_search_branch_with_fulltext_index(tmp_path):
+    run_with_listings(tmp_path, check_search, fulltext=True)
+
+def test_search_branch_with_ilike_fallback(tmp_path):
+    run_with_listings(tmp_path, check_search, fulltext=False)
+
+def test_feed_pages_by_next_offset(tmp_path):
+    async def scenario(session_factory):
+        seen, offset = [], ""
+        async with session_factory() as session:
+            while True:
+                rows, offset = await search_listings(session, [], offset, page_size=2)
+                seen += [row.id for row in rows]
+                if not offset:
+                    break
+        # Объявления 6 и 7 созданы в одну минуту — порядок решает id
+        assert seen == [7, 6, 4, 3, 2, 1]
+
+        results, next_offset = await inline_results(session_factory, "", "", "otc_bot")
+        assert results[0].id == "7" and "10 007 ₽ · Электроника" in results[0].description
+        assert "start=listing_7" in results[0].reply_markup.inline_keyboard[0][0].url
+
+        async with session_factory() as session:
+            text, _ = await listing_message(session, 7)
+            assert "<b>iPhone 7</b>" in text and "10 007 ₽" in text
+            assert await listing_message(session, 5) is None
+
+    run_with_listings(tmp_path, scenario, fulltext=False)
+
+def test_coalesced_waiters_survive_cancelled_starter():
+    async def main():
+        cache = InlineSearchCache(maxsize=10, ttl=60)
+        started = asyncio.Event()
+        release = asyncio.Event()
+        loads = []
+
+        async def load():
+            loads.append(1)
+            started.set()
+            await release.wait()
+            return ["result"], "20"
+
+        first = asyncio.create_task(cache.get(("query", ""), load))
+        await started.wait()
+        second = asyncio.create_task(cache.get(("query", ""), load))
+        await asyncio.sleep(0)
+
+        # Хендлер, начавший запрос, отменён — остальные получают результат
+        first.cancel()
+        release.set()
+        assert await second == (["result"], "20")
+        assert loads == [1]
+        assert cache.coalesced == 1
+
+        # Результат сохранён в кэше, повторный запрос в БД не идёт
+        assert await cache.get(("query", ""), load) == (["result"], "20")
+        assert loads == [1]
+        assert cache.hits == 1
+
+    asyncio.run(main())
+
+def test_failed_load_is_not_cached():
+    async def main():
+        cache = InlineSearchCache(maxsize=10, ttl=60)
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("db down")
+
+        for _ in range(2):
+            try:
+                await cache.get(("query", ""), failing)
+            except RuntimeError:
+                pass
+        assert calls == [1, 1]
+        assert cache.stats()['size'] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+"Мои объявления" на моделях бота: страницы продавца по (created_at, id)
+без OFFSET, следующая страница — из callback_data кнопки "Дальше"
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from bot.my_listings import (
+    FIRST_PAGE_CALLBACK, decode_page_callback, fetch_page, format_price, get_page, my_listings_pages
+)
+from database.models import Base, Category, Listing, User
+
+def run_with_listings(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'listings.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        created = datetime(2024, 5, 1, 12, 0)
+        async with session_factory() as session:
+            session.add_all([
+                User(id=1, username="seller", email="seller@example.com", hashed_password="x"),
+                User(id=2, username="other", email="other@example.com", hashed_password="x")
+            ])
+            session.add(Category(id=1, name="Электроника"))
+            await session.flush()
+            # Два объявления с одинаковым created_at — порядок решает id
+            session.add_all(
+                Listing(id=i, title=f"Лот {i}", description="—", price=150000 + i, category_id=1,
+                        owner_id=1, is_active=i % 2 == 0, created_at=created + timedelta(minutes=min(i, 6)))
+                for i in range(1, 8)
+            )
+            session.add(Listing(id=8, title="Чужой", description="—", price=100, category_id=1,
+                                owner_id=2, created_at=created))
+            await session.commit()
+        try:
+            async with session_factory() as session:
+                await scenario(session)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+def test_fetch_page_walks_seller_listings_without_gaps(tmp_path):
+    async def scenario(session):
+        rows, has_more = await fetch_page(session, 1, page_size=2)
+        assert [row.id for row in rows] == [7, 6] and has_more
+        seen = [row.id for row in rows]
+        while has_more:
+            rows, has_more = await fetch_page(session, 1, (rows[-1].created_at, rows[-1].id), page_size=2)
+            seen += [row.id for row in rows]
+        assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+    run_with_listings(tmp_path, scenario)
+
+def test_get_page_renders_cards_and_next_button(tmp_path):
+    my_listings_pages._evict_seller(1)
+
+    async def scenario(session):
+        text, markup = await get_page(session, 1, FIRST_PAGE_CALLBACK)
+        # По 5 объявлений на странице (MY_LISTINGS_PAGE_SIZE)
+        assert "1. Лот 7" in text and "5. Лот 3" in text and "Лот 2" not in text and "Чужой" not in text
+        assert "1 500,07 ₽" in text and "🟢 Активно" in text and "⏸ Снято" in text
+
+        next_callback = markup.inline_keyboard[0][-1].callback_data
+        assert decode_page_callback(next_callback)[0] == 2
+        text, markup = await get_page(session, 1, next_callback)
+        assert "стр. 2" in text and "6. Лот 2" in text and "7. Лот 1" in text
+        assert markup.inline_keyboard[0][0].callback_data == FIRST_PAGE_CALLBACK
+
+    run_with_listings(tmp_path, scenario)
+
+def test_format_price_from_kopecks():
+    assert format_price(150000) == "1 500 ₽"
+    assert format_price(123456789) == "1 234 567,89 ₽"
+    assert format_price(5) == "0,05 ₽"
@@ -0,0 +1,220 @@
+"""
+Отправщик outbox против поддельного Bot API: 429 и сбои откладывают
+остальные строки чата, корзины токенов задают темп, из нескольких
+правок одного сообщения уходит только последняя
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from bot.outbox import OutboxSender, TokenBucket, enqueue_edit
+from database.models import OutboxMessage, OutboxStatus
+
+class FakeBotApi:
+    """Записывает вызовы; failures — очередь ответов-ошибок по chat_id"""
+
+    def __init__(self):
+        self.calls = []
+        self.failures = {}
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        data = await request.post()
+        chat_id = int(data["chat_id"])
+        failures = self.failures.get(chat_id)
+        if failures:
+            status, payload = failures.pop(0)
+            return web.json_response(payload, status=status)
+        self.calls.append((time.monotonic(), method, chat_id, data["text"]))
+        return web.json_response({"ok": True, "result": {
+            "message_id": int(data.get("message_id", len(self.calls))),
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data["text"]
+        }})
+
+    def fail(self, chat_id, status, description, retry_after=None):
+        payload = {"ok": False, "error_code": status, "description": description}
+        if retry_after is not None:
+            payload["parameters"] = {"retry_after": retry_after}
+        self.failures.setdefault(chat_id, []).append((status, payload))
+
+    def texts(self, chat_id):
+        return [text for _, _, chat, text in self.calls if chat == chat_id]
+
+def run_sender(tmp_path, scenario, senders=1, **options):
+    async def main():
+        api = FakeBotApi()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(OutboxMessage.__table__.create)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with TestServer(api.app) as server:
+            session = AiohttpSession(api=TelegramAPIServer.from_base(str(server.make_url(""))))
+            bot = Bot("123456:TEST", session=session)
+            sender = [OutboxSender(bot, session_factory, **options) for _ in range(senders)]
+            try:
+                await scenario(api, sender[0] if senders == 1 else sender, session_factory)
+            finally:
+                await session.close()
+        await engine.dispose()
+    asyncio.run(main())
+
+async def add_rows(session_factory, *rows):
+    async with session_factory() as session:
+        session.add_all(OutboxMessage(**row) for row in rows)
+        await session.commit()
+
+async def statuses(session_factory):
+    async with session_factory() as session:
+        rows = (await session.execute(
+            select(OutboxMessage.text, OutboxMessage.status, OutboxMessage.attempts).order_by(OutboxMessage.id)
+        )).all()
+    return {text: (status, attempts) for text, status, attempts in rows}
+
+def test_retry_after_postpones_chat_without_spending_attempt(tmp_path):
+    async def scenario(api, sender, session_factory):
+        api.fail(1, 429, "Too Many Requests: retry after 30", retry_after=30)
+        await add_rows(session_factory,
+                       dict(chat_id=1, text="a1"), dict(chat_id=1, text="a2"), dict(chat_id=2, text="b1"))
+
+        assert await sender.process_batch() == 3
+        assert api.texts(1) == [] and api.texts(2) == ["b1"]
+        assert await statuses(session_factory) == {
+            "a1": (OutboxStatus.PENDING, 0),
+            "a2": (OutboxStatus.PENDING, 0),
+            "b1": (OutboxStatus.SENT, 0)
+        }
+        assert sender.metrics.rate_limited == 1
+        # Чат молчит: следующий проход не трогает его строки
+        assert await sender.process_batch() == 0
+
+    run_sender(tmp_path, scenario)
+
+def test_failure_postpones_rest_of_chat(tmp_path):
+    async def scenario(api, sender, session_factory):
+        api.fail(1, 500, "Internal Server Error")
+        await add_rows(session_factory,
+                       dict(chat_id=1, text="a1"), dict(chat_id=1, text="a2"), dict(chat_id=2, text="b1"))
+
+        await sender.process_batch()
+        # a2 не обгоняет a1, ушедшую на повтор
+        assert api.texts(1) == [] and api.texts(2) == ["b1"]
+        assert await statuses(session_factory) == {
+            "a1": (OutboxStatus.PENDING, 1),
+            "a2": (OutboxStatus.PENDING, 0),
+            "b1": (OutboxStatus.SENT, 0)
+        }
+        assert sender.metrics.retried == 1
+        assert await sender.process_batch() == 0
+
+    run_sender(tmp_path, scenario)
+
+def test_chat_bucket_paces_and_defers_beyond_window(tmp_path):
+    async def scenario(api, sender, session_factory):
+        await add_rows(session_factory, *(dict(chat_id=1, text=f"a{i}") for i in range(5)))
+
+        await sender.process_batch()
+        # 10 в секунду при окне 0.25 с: три сообщения сейчас, два ждут в БД
+        assert api.texts(1) == ["a0", "a1", "a2"]
+        sent_at = [at for at, _, _, _ in api.calls]
+        assert all(later - earlier >= 0.09 for earlier, later in zip(sent_at, sent_at[1:]))
+        assert sender.metrics.deferred == 2
+
+        await asyncio.sleep(0.3)
+        await sender.process_batch()
+        assert api.texts(1) == ["a0", "a1", "a2", "a3", "a4"]
+
+    run_sender(tmp_path, scenario, rate_limit=100, chat_rate_limit=10, window=0.25)
+
+def test_token_bucket_refill_and_pause():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = time.monotonic()
+    assert bucket.delay(now, 2) == 0
+    bucket.take(now)
+    bucket.take(now)
+    assert abs(bucket.delay(now) - 0.1) < 1e-6
+    bucket.pause(5)
+    assert bucket.delay(now) >= 5
+
+def test_only_latest_edit_is_sent(tmp_path):
+    async def scenario(api, sender, session_factory):
+        # Строки добавлены минуя enqueue_edit: вытеснение внутри пачки
+        await add_rows(session_factory,
+                       dict(chat_id=1, edit_message_id=7, text="v1"),
+                       dict(chat_id=1, edit_message_id=7, text="v2"))
+        # enqueue_edit вытесняет неотправленную правку ещё при постановке
+        async with session_factory() as session:
+            await enqueue_edit(session, 1, 8, "w1")
+            await enqueue_edit(session, 1, 8, "w2")
+            await session.commit()
+
+        await sender.process_batch()
+        assert [(method, text) for _, method, _, text in api.calls] == [
+            ("editMessageText", "v2"), ("editMessageText", "w2")
+        ]
+        result = await statuses(session_factory)
+        assert result["v1"][0] == result["w1"][0] == OutboxStatus.SKIPPED
+        assert result["v2"][0] == result["w2"][0] == OutboxStatus.SENT
+        assert sender.metrics.skipped == 1
+
+    run_sender(tmp_path, scenario, chat_rate_limit=100)
+
+def test_parallel_senders_claim_each_row_once(tmp_path):
+    async def scenario(api, senders, session_factory):
+        await add_rows(session_factory, *(dict(chat_id=chat_id, text=f"{chat_id}:{i}")
+                                          for chat_id in range(1, 11) for i in range(3)))
+
+        await asyncio.gather(*(sender.process_batch() for sender in senders))
+        for sender in senders:
+            await sender.process_batch()
+        texts = [text for _, _, _, text in api.calls]
+        assert sorted(texts) == sorted(f"{chat_id}:{i}" for chat_id in range(1, 11) for i in range(3))
+        for chat_id in range(1, 11):
+            assert api.texts(chat_id) == [f"{chat_id}:{i}" for i in range(3)]
+
+    run_sender(tmp_path, scenario, senders=3, chat_rate_limit=100)
+
+def test_rows_of_other_sender_block_chat_until_lease_expires(tmp_path):
+    async def scenario(api, sender, session_factory):
+        now = datetime.utcnow()
+        await add_rows(session_factory,
+                       dict(chat_id=1, text="a1", status=OutboxStatus.SENDING, locked_by="other",
+                            locked_until=now + timedelta(seconds=60)),
+                       dict(chat_id=1, text="a2"),
+                       dict(chat_id=2, text="b1", status=OutboxStatus.SENDING, locked_by="crashed",
+                            locked_until=now - timedelta(seconds=1)))
+
+        await sender.process_batch()
+        # a1 ещё у другого отправщика, b1 — у упавшего и забирается снова
+        assert api.texts(1) == [] and api.texts(2) == ["b1"]
+        result = await statuses(session_factory)
+        assert result["a1"][0] == OutboxStatus.SENDING and result["a2"][0] == OutboxStatus.PENDING
+
+    run_sender(tmp_path, scenario)
+
+def test_purge_removes_only_old_finished_rows(tmp_path):
+    async def scenario(api, sender, session_factory):
+        old = datetime.utcnow() - timedelta(days=8)
+        await add_rows(session_factory,
+                       dict(chat_id=1, text="old sent", status=OutboxStatus.SENT, created_at=old),
+                       dict(chat_id=1, text="old failed", status=OutboxStatus.FAILED, created_at=old),
+                       dict(chat_id=1, text="old skipped", status=OutboxStatus.SKIPPED, created_at=old),
+                       dict(chat_id=1, text="old pending", created_at=old),
+                       dict(chat_id=1, text="new sent", status=OutboxStatus.SENT))
+
+        assert await sender.purge_finished() == 3
+        assert set(await statuses(session_factory)) == {"old pending", "new sent"}
+        assert sender.stats()["purged"] == 3
+
+    run_sender(tmp_path, scenario, retention_days=7)
@@ -0,0 +1,144 @@
+"""
+Вебхук против тестового aiohttp-сервера: проверка секрета, порядок
+апдейтов внутри чата и изоляция медленного чата от остальных
+"""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot
+from aiogram.types import Update
+
+from bot.webhook import UpdateWorkerPool, create_webhook_app, create_metrics_app, SECRET_HEADER
+
+SECRET = "test-secret"
+
+class FakeDispatcher:
+    """Записывает порядок обработки; апдейты из slow_chats ждут события release"""
+
+    def __init__(self, slow_chats=()):
+        self.handled = []
+        self.slow_chats = set(slow_chats)
+        self.release = asyncio.Event()
+
+    async def feed_update(self, bot, update):
+        chat_id = update.message.chat.id
+        if chat_id in self.slow_chats:
+            await self.release.wait()
+        self.handled.append((chat_id, update.update_id))
+
+    def resolve_used_update_types(self):
+        return ["message"]
+
+class FakeOutbox:
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self):
+        return {}
+
+def make_update(update_id, chat_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": f"update {update_id}"
+        }
+    }
+
+async def wait_for(condition, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("условие не выполнилось")
+        await asyncio.sleep(0.01)
+
+def run_client(dispatcher, scenario, workers=4, queue_size=100):
+    async def main():
+        bot = Bot("123456:TEST")
+        pool = UpdateWorkerPool(bot, dispatcher, workers=workers, queue_size=queue_size)
+        app = create_webhook_app(bot, dispatcher, secret=SECRET, path="/webhook",
+                                 set_webhook=False, pool=pool, outbox=FakeOutbox())
+        async with TestClient(TestServer(app)) as client:
+            await scenario(client, pool)
+    asyncio.run(main())
+
+def post(client, payload, secret=SECRET):
+    headers = {SECRET_HEADER: secret} if secret is not None else {}
+    return client.post("/webhook", json=payload, headers=headers)
+
+def test_rejects_missing_or_wrong_secret():
+    dispatcher = FakeDispatcher()
+
+    async def scenario(client, pool):
+        assert (await post(client, make_update(1, 10), secret=None)).status == 401
+        assert (await post(client, make_update(2, 10), secret="wrong")).status == 401
+        assert (await post(client, make_update(3, 10))).status == 200
+        await wait_for(lambda: dispatcher.handled == [(10, 3)])
+
+    run_client(dispatcher, scenario)
+
+def test_refuses_to_start_without_secret():
+    with pytest.raises(RuntimeError):
+        create_webhook_app(Bot("123456:TEST"), FakeDispatcher(), secret="", set_webhook=False,
+                           outbox=FakeOutbox())
+
+def test_metrics_not_served_on_webhook_port():
+    dispatcher = FakeDispatcher()
+
+    async def scenario(client, pool):
+        assert (await client.get("/webhook/metrics")).status in (404, 405)
+        async with TestClient(TestServer(create_metrics_app(client.server.app))) as metrics:
+            body = await (await metrics.get("/metrics")).json()
+        assert body["queue_depth"] == 0
+
+    run_client(dispatcher, scenario)
+
+def test_keeps_order_within_chat():
+    dispatcher = FakeDispatcher()
+
+    async def scenario(client, pool):
+        for update_id in range(1, 21):
+            assert (await post(client, make_update(update_id, 100 + update_id % 3))).status == 200
+        await wait_for(lambda: len(dispatcher.handled) == 20)
+        for chat_id in (100, 101, 102):
+            ids = [update_id for chat, update_id in dispatcher.handled if chat == chat_id]
+            assert ids == sorted(ids)
+
+    run_client(dispatcher, scenario)
+
+def test_slow_chat_does_not_block_other_chats():
+    dispatcher = FakeDispatcher(slow_chats={1})
+
+    async def scenario(client, pool):
+        # Два апдейта медленного чата займут одного воркера, а не весь пул
+        await post(client, make_update(1, 1))
+        await post(client, make_update(2, 1))
+        for update_id in range(3, 13):
+            await post(client, make_update(update_id, 1 + update_id))
+        await wait_for(lambda: len(dispatcher.handled) == 10)
+        assert all(chat != 1 for chat, _ in dispatcher.handled)
+        assert pool.chat_depths() == {1: 1}
+
+        dispatcher.release.set()
+        await wait_for(lambda: len(dispatcher.handled) == 12)
+        assert [update_id for chat, update_id in dispatcher.handled if chat == 1] == [1, 2]
+
+    run_client(dispatcher, scenario, workers=2)
+
+def test_rejects_with_503_when_full():
+    dispatcher = FakeDispatcher(slow_chats={1})
+
+    async def scenario(client, pool):
+        statuses = [(await post(client, make_update(update_id, 1))).status for update_id in range(1, 5)]
+        assert statuses == [200, 200, 200, 503]
+        assert pool.metrics.rejected == 1
+        dispatcher.release.set()
+        await wait_for(lambda: pool.pending() == 0)
+
+    run_client(dispatcher, scenario, workers=2, queue_size=3)
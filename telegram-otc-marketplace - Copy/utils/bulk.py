@@ -0,0 +1,304 @@
+"""
+Пакетные операции админки
+
+Строки выбираются по списку id или по фильтрам и обрабатываются пачками
+по BULK_CHUNK_SIZE: на каждую пачку один set-based UPDATE/DELETE с
+условием id IN (...) и отдельный commit, поэтому блокировки короткие,
+а прогресс можно отдавать клиенту по мере выполнения.
+
+Здесь же общие части импорта и экспорта: чтение CSV/NDJSON из потока
+тела запроса пачками, пул процессов для хэширования паролей и потоковая
+выгрузка строк в CSV/NDJSON без загрузки всей выборки в память.
+"""
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Query, Session
+
+from app.database import SessionLocal
+from config import Config
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def id_list_chunks(ids: Iterable[int], chunk_size: int = Config.BULK_CHUNK_SIZE) -> Iterator[List[int]]:
+    """Пачки из явного списка id"""
+    unique_ids = sorted(set(ids))
+    for start in range(0, len(unique_ids), chunk_size):
+        yield unique_ids[start:start + chunk_size]
+
+def matching_id_chunks(query: Query, model, chunk_size: int = Config.BULK_CHUNK_SIZE) -> Iterator[List[int]]:
+    """Пачки id строк, подходящих под фильтры запроса, по возрастанию id"""
+    last_id = 0
+    while True:
+        ids = [
+            row_id for (row_id,) in query.with_entities(model.id)
+            .filter(model.id > last_id)
+            .order_by(model.id)
+            .limit(chunk_size)
+        ]
+        if not ids:
+            return
+        yield ids
+        if len(ids) < chunk_size:
+            return
+        # Продолжаем после последнего id: изменённые строки не выбираются повторно
+        last_id = ids[-1]
+
+def run_bulk(db: Session, model, id_chunks: Iterable[List[int]], make_statement: Callable,
+             after_chunk: Optional[Callable[[List[int]], None]] = None) -> Iterator[Dict[str, int]]:
+    """
+    Выполняет make_statement(условие по id) для каждой пачки и
+    после каждого commit отдаёт накопленный прогресс.
+    """
+    processed = 0
+    affected = 0
+    for ids in id_chunks:
+        result = db.execute(make_statement(model.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        processed += len(ids)
+        affected += result.rowcount
+        if after_chunk is not None:
+            after_chunk(ids)
+        yield {"processed": processed, "affected": affected}
+
+def consume(progress: Iterator[Dict[str, int]]) -> Dict[str, int]:
+    """Выполняет операцию целиком и возвращает итог"""
+    result = {"processed": 0, "affected": 0}
+    for result in progress:
+        pass
+    return result
+
+def ndjson_progress(progress: Iterator[Dict[str, int]], on_close: Optional[Callable[[], None]] = None) -> Iterator[str]:
+    """Прогресс в формате NDJSON: строка на пачку и итоговая строка с done"""
+    result = {"processed": 0, "affected": 0}
+    try:
+        for result in progress:
+            yield json.dumps(result) + "\n"
+        yield json.dumps({**result, "done": True}) + "\n"
+    finally:
+        if on_close is not None:
+            on_close()
+
+def bulk_response(db: Session, model, make_chunks: Callable[[Session], Iterable[List[int]]],
+                  make_statement: Callable, after_chunk: Optional[Callable[[List[int]], None]] = None,
+                  stream: bool = False):
+    """Итог операции одним ответом или, при stream, прогресс по пачкам в NDJSON"""
+    if not stream:
+        return consume(run_bulk(db, model, make_chunks(db), make_statement, after_chunk))
+
+    # Ответ читается после выхода из обработчика, поэтому у потока своя сессия
+    stream_db = SessionLocal()
+    try:
+        chunks = make_chunks(stream_db)
+    except HTTPException:
+        stream_db.close()
+        raise
+    return StreamingResponse(
+        ndjson_progress(run_bulk(stream_db, model, chunks, make_statement, after_chunk), on_close=stream_db.close),
+        media_type="application/x-ndjson"
+    )
+
+# Импорт
+
+async def iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Строки из потока тела запроса без чтения его целиком"""
+    buffer = b""
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+async def read_record_chunks(body: AsyncIterator[bytes], fmt: str,
+                             chunk_size: int = Config.BULK_CHUNK_SIZE) -> AsyncIterator[List[Tuple[int, object]]]:
+    """
+    Пачки записей (номер строки, запись) из CSV с заголовком или NDJSON.
+    Запись — словарь или строка с текстом ошибки разбора.
+    """
+    header = None
+    chunk = []
+    line_number = 0
+    # Строки CSV-записи, у которой ещё не закрыта кавычка (перевод строки в значении)
+    pending = []
+    record_line = 0
+    async for line in iter_lines(body):
+        line_number += 1
+        if fmt == "csv":
+            if not pending:
+                if not line.strip():
+                    continue
+                record_line = line_number
+            pending.append(line + "\n")
+            # Запись закончена, когда кавычек чётное число ("" внутри значения — это две)
+            if sum(part.count('"') for part in pending) % 2:
+                continue
+            values = next(csv.reader(pending))
+            pending = []
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                record = "Число колонок не совпадает с заголовком"
+            else:
+                # Пустые ячейки считаем отсутствующими значениями
+                record = {name: value for name, value in zip(header, values) if value != ""}
+            chunk.append((record_line, record))
+        else:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = "Некорректный JSON"
+            if not isinstance(record, (dict, str)):
+                record = "Ожидается JSON-объект"
+            chunk.append((line_number, record))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if pending:
+        chunk.append((record_line, "Незакрытая кавычка в конце файла"))
+    if chunk:
+        yield chunk
+
+HASH_WORKERS = Config.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+def new_import_result() -> Dict[str, object]:
+    return {"processed": 0, "created": 0, "skipped": 0, "failed": 0, "errors": []}
+
+def validate_records(records: List[Tuple[int, object]], schema, result: Dict[str, object]) -> List[Tuple[int, BaseModel]]:
+    """
+    Проверяет записи пачки схемой; ошибки считаются в result["failed"],
+    в result["errors"] попадают первые BULK_MAX_ERRORS из них.
+    """
+    valid = []
+    for line, record in records:
+        result["processed"] += 1
+        if isinstance(record, dict):
+            try:
+                valid.append((line, schema.model_validate(record)))
+                continue
+            except ValidationError as exc:
+                record = "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc']) or 'запись'}: {error['msg']}"
+                    for error in exc.errors()
+                )
+        add_import_error(result, line, record)
+        result["failed"] += 1
+    return valid
+
+def add_import_error(result: Dict[str, object], line: int, detail: str) -> None:
+    if len(result["errors"]) < Config.BULK_MAX_ERRORS:
+        result["errors"].append({"line": line, "detail": detail})
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Пул процессов для хэширования паролей, создаётся при первом импорте"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn: fork из многопоточного сервера может унаследовать захваченные блокировки
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _hash_pool
+
+async def hash_in_pool(hash_func: Callable[[str], str], passwords: List[str]) -> List[str]:
+    """Хэширует пароли в пуле процессов, не блокируя цикл событий"""
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return await loop.run_in_executor(None, lambda: list(pool.map(hash_func, passwords, chunksize=chunksize)))
+
+# Экспорт
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def export_lines(rows: Iterable, fields: List[str], fmt: str,
+                 batch_size: int = 500) -> Iterator[str]:
+    """Строки CSV (с заголовком) или NDJSON, отдаются кусками по batch_size записей"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(fields)
+
+    count = 0
+    for row in rows:
+        values = [export_value(getattr(row, field)) for field in fields]
+        if writer is not None:
+            writer.writerow(["" if value is None else value for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values)), ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks: Iterable[str], level: int = Config.COMPRESS_LEVEL) -> Iterator[bytes]:
+    """Сжимает поток кусков в один gzip-файл, не накапливая его в памяти"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(query_factory: Callable[[Session], Query], fields: List[str], fmt: str, filename: str,
+                    compress: bool = False):
+    """
+    Потоковая выгрузка в отдельной сессии. Запрос должен выбирать колонки,
+    а не сущности: строки читаются через yield_per серверным курсором и не
+    попадают в identity map.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            rows = query_factory(db).yield_per(Config.BULK_CHUNK_SIZE)
+            yield from export_lines(rows, fields, fmt)
+        finally:
+            db.close()
+
+    if compress:
+        return StreamingResponse(
+            gzip_chunks(generate()),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}.gz"'}
+        )
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
@@ -0,0 +1,57 @@
+"""
+Пагинация списков админки
+
+paginate() выбирает страницу по ключу (колонка сортировки, id) без OFFSET,
+курсор — тот же непрозрачный формат, что и у ленты Mini App.
+count_total() считает общее количество: точно, приблизительно по
+статистике таблицы или не считает вовсе.
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Query, Session
+
+from database.pagination import decode_cursor, keyset_cursor, after_keyset_cursor
+
+def paginate(query: Query, model, sort_column: str, descending: bool,
+             cursor: Optional[str], per_page: int) -> Tuple[list, Optional[str]]:
+    """Страница по курсору: (строки, next_cursor)"""
+    attribute = getattr(model, sort_column)
+    cursor_values = decode_cursor(cursor) or {}
+    after = after_keyset_cursor(model, sort_column, cursor_values, descending) if cursor_values else None
+    if after is not None:
+        query = query.filter(after)
+
+    if descending:
+        query = query.order_by(attribute.desc(), model.id.desc())
+    else:
+        query = query.order_by(attribute.asc(), model.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    next_cursor = keyset_cursor(rows[per_page - 1], sort_column) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+def approximate_count(db: Session, model) -> int:
+    """Оценка числа строк таблицы без полного сканирования"""
+    if db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": model.__tablename__}
+        ).scalar()
+        # reltuples = -1, пока таблица ни разу не анализировалась
+        if estimate is not None and estimate >= 0:
+            return estimate
+    # Максимальный id берётся из первичного ключа; удалённые строки не вычитаются
+    return db.query(func.max(model.id)).scalar() or 0
+
+def count_total(db: Session, query: Query, model, mode: str, filtered: bool) -> Tuple[Optional[int], bool]:
+    """
+    Общее количество для ответа: (total, приблизительное ли значение).
+    mode: none — не считать, approx — оценка (для отфильтрованного
+    списка всё равно точный COUNT), exact — точный COUNT.
+    """
+    if mode == "none":
+        return None, False
+    if mode == "approx" and not filtered:
+        return approximate_count(db, model), True
+    return query.order_by(None).count(), False
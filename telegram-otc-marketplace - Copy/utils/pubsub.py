@@ -0,0 +1,113 @@
+"""
+Pub/sub для межпроцессной инвалидации кэшей
+
+По умолчанию используется LocalPubSub — заглушка, которая доставляет
+сообщения подписчикам внутри одного процесса. Если задан REDIS_URL и
+установлен пакет redis, сообщения идут через Redis и доходят до всех
+процессов: веб-воркеров, бота и админ API.
+"""
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from config import Config
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+USER_INVALIDATION_CHANNEL = "cache:user-invalidate"
+DATA_VERSION_CHANNEL = "cache:data-version"
+VIEWS_FLUSHED_CHANNEL = "cache:views-flushed"
+LISTING_INVALIDATION_CHANNEL = "cache:listing-invalidate"
+SELLER_LISTINGS_CHANNEL = "cache:seller-listings"
+OUTBOX_CHANNEL = "events:outbox"
+MESSAGE_EVENTS_CHANNEL = "events:message"
+
+class LocalPubSub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Callable]] = defaultdict(list)
+
+    def publish(self, channel: str, message: dict) -> None:
+        with self._lock:
+            callbacks = list(self._subscribers[channel])
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as exc:
+                logger.error(f"Ошибка подписчика {channel}: {exc}")
+
+    def subscribe(self, channel: str, callback: Callable[[dict], None]) -> None:
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+class RedisPubSub:
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url)
+        self._local = LocalPubSub()
+        self._pubsub = None
+
+    def publish(self, channel: str, message: dict) -> None:
+        self._client.publish(channel, json.dumps(message))
+
+    def subscribe(self, channel: str, callback: Callable[[dict], None]) -> None:
+        self._local.subscribe(channel, callback)
+        if self._pubsub is None:
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{channel: self._dispatch})
+            self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+        else:
+            self._pubsub.subscribe(**{channel: self._dispatch})
+
+    def _dispatch(self, raw) -> None:
+        channel = raw["channel"].decode() if isinstance(raw["channel"], bytes) else raw["channel"]
+        self._local.publish(channel, json.loads(raw["data"]))
+
+def create_pubsub():
+    if Config.REDIS_URL and redis is not None:
+        return RedisPubSub(Config.REDIS_URL)
+    return LocalPubSub()
+
+pubsub = create_pubsub()
+
+def publish_user_invalidation(user_id: int) -> None:
+    """Сообщает всем процессам, что запись пользователя изменилась"""
+    pubsub.publish(USER_INVALIDATION_CHANNEL, {"user_id": user_id})
+
+def publish_users_invalidation(user_ids: List[int]) -> None:
+    """Сообщает всем процессам, что изменилась пачка пользователей"""
+    pubsub.publish(USER_INVALIDATION_CHANNEL, {"user_ids": user_ids})
+
+def publish_data_change() -> None:
+    """Сообщает всем процессам, что объявления или категории изменились"""
+    pubsub.publish(DATA_VERSION_CHANNEL, {})
+
+def publish_views_flushed() -> None:
+    """Сообщает всем процессам, что в БД записаны новые просмотры"""
+    pubsub.publish(VIEWS_FLUSHED_CHANNEL, {})
+
+def publish_listing_invalidation(listing_id: int) -> None:
+    """Сообщает всем процессам, что объявление изменилось"""
+    pubsub.publish(LISTING_INVALIDATION_CHANNEL, {"listing_id": listing_id})
+
+def publish_listings_invalidation(listing_ids: List[int]) -> None:
+    """Сообщает всем процессам, что изменилась пачка объявлений"""
+    pubsub.publish(LISTING_INVALIDATION_CHANNEL, {"listing_ids": listing_ids})
+
+def publish_seller_listings_change(seller_id: int) -> None:
+    """Сообщает всем процессам, что у продавца появилось или исчезло объявление"""
+    pubsub.publish(SELLER_LISTINGS_CHANNEL, {"seller_id": seller_id})
+
+def publish_outbox_wakeup() -> None:
+    """Будит отправщика бота: в outbox появились сообщения"""
+    pubsub.publish(OUTBOX_CHANNEL, {})
+
+def publish_message_event(recipient_id: int, message: dict) -> None:
+    """Новое сообщение для открытых дашбордов получателя"""
+    pubsub.publish(MESSAGE_EVENTS_CHANNEL, {"recipient_id": recipient_id, "message": message})
@@ -0,0 +1,14 @@
+"""
+Быстрый класс JSON-ответа для FastAPI
+
+Если установлен orjson, ответы сериализуются через ORJSONResponse,
+иначе используется стандартный JSONResponse.
+"""
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FastJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
@@ -0,0 +1,162 @@
+"""
+Почасовые и дневные ролапы регистраций и объявлений
+
+Периодическая задача пересчитывает последние ROLLUP_LOOKBACK_HOURS часов
+из сырых таблиц (диапазонный предикат по created_at идёт по индексу),
+а дневные значения собирает из почасовых. Если приложение простояло
+дольше, пересчёт начинается с последнего сохранённого часа, чтобы
+пропущенные часы и дни не остались нулями. Графики админки читают только
+таблицу stats_rollups.
+
+Задача запускается в каждом воркере. Если два воркера пересчитывают одни
+и те же интервалы одновременно, проигравший получает IntegrityError на
+uq_stats_rollups_bucket и пропускает проход: данные победителя те же.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import User, Listing, StatsRollup, RollupBucket
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BUCKET_STEPS = {
+    RollupBucket.HOUR: timedelta(hours=1),
+    RollupBucket.DAY: timedelta(days=1),
+}
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _hour_bucket(column, dialect: str):
+    """Выражение начала часа для GROUP BY"""
+    if dialect == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+def _earliest_created(db: Session) -> Optional[datetime]:
+    candidates = [
+        db.query(func.min(User.created_at)).scalar(),
+        db.query(func.min(Listing.created_at)).scalar(),
+    ]
+    candidates = [value for value in candidates if value is not None]
+    return min(candidates) if candidates else None
+
+def refresh_rollups(db: Session, since: Optional[datetime] = None) -> None:
+    """Пересчитывает ролапы начиная с since (по умолчанию — последние часы)"""
+    now = datetime.utcnow()
+
+    if since is None:
+        last_hour = db.query(func.max(StatsRollup.bucket_start)).filter(
+            StatsRollup.bucket == RollupBucket.HOUR
+        ).scalar()
+        if last_hour is not None:
+            # После простоя дольше окна пересчёт идёт с последнего сохранённого часа
+            since = min(_as_datetime(last_hour), now - timedelta(hours=Config.ROLLUP_LOOKBACK_HOURS))
+        else:
+            # Первый запуск — заполняем историю целиком
+            since = _earliest_created(db) or now
+    since = floor_hour(since)
+
+    dialect = db.get_bind().dialect.name
+
+    # Почасовые значения из сырых таблиц
+    hourly = defaultdict(lambda: {"users_created": 0, "listings_created": 0})
+    for model, field in ((User, "users_created"), (Listing, "listings_created")):
+        bucket = _hour_bucket(model.created_at, dialect)
+        rows = db.query(bucket, func.count(model.id)).filter(
+            model.created_at >= since
+        ).group_by(bucket)
+        for bucket_start, count in rows:
+            hourly[_as_datetime(bucket_start)][field] = count
+
+    db.query(StatsRollup).filter(
+        StatsRollup.bucket == RollupBucket.HOUR,
+        StatsRollup.bucket_start >= since
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(StatsRollup, [
+        {"bucket": RollupBucket.HOUR, "bucket_start": bucket_start, "updated_at": now, **counts}
+        for bucket_start, counts in hourly.items()
+    ])
+    db.flush()
+
+    # Дневные значения собираются из почасовых за затронутые дни
+    day_since = floor_day(since)
+    daily = defaultdict(lambda: {"users_created": 0, "listings_created": 0})
+    hourly_rows = db.query(StatsRollup).filter(
+        StatsRollup.bucket == RollupBucket.HOUR,
+        StatsRollup.bucket_start >= day_since
+    )
+    for row in hourly_rows:
+        counts = daily[floor_day(row.bucket_start)]
+        counts["users_created"] += row.users_created
+        counts["listings_created"] += row.listings_created
+
+    db.query(StatsRollup).filter(
+        StatsRollup.bucket == RollupBucket.DAY,
+        StatsRollup.bucket_start >= day_since
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(StatsRollup, [
+        {"bucket": RollupBucket.DAY, "bucket_start": bucket_start, "updated_at": now, **counts}
+        for bucket_start, counts in daily.items()
+    ])
+
+    db.commit()
+
+def get_series(db: Session, bucket: RollupBucket, start: datetime, end: datetime) -> List[dict]:
+    """Ряд значений из ролапов с нулями для пустых интервалов"""
+    rows = db.query(StatsRollup).filter(
+        StatsRollup.bucket == bucket,
+        StatsRollup.bucket_start >= start,
+        StatsRollup.bucket_start < end
+    ).all()
+    by_start = {row.bucket_start: row for row in rows}
+
+    series = []
+    step = BUCKET_STEPS[bucket]
+    current = start
+    while current < end:
+        row = by_start.get(current)
+        series.append({
+            "bucket_start": current,
+            "users": row.users_created if row else 0,
+            "listings": row.listings_created if row else 0,
+        })
+        current += step
+    return series
+
+def _refresh_once() -> None:
+    db = SessionLocal()
+    try:
+        refresh_rollups(db)
+    except IntegrityError:
+        # Те же интервалы только что записал другой воркер
+        db.rollback()
+        logger.info("Ролапы статистики обновлены другим воркером, проход пропущен")
+    finally:
+        db.close()
+
+async def run_rollups_periodically(interval: int = Config.ROLLUP_INTERVAL) -> None:
+    """Фоновая задача обновления ролапов"""
+    while True:
+        try:
+            await asyncio.to_thread(_refresh_once)
+        except Exception as exc:
+            logger.error(f"Ошибка обновления ролапов статистики: {exc}")
+        await asyncio.sleep(interval)
@@ -1,78 +1,101 @@
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
+from flask import Flask, Response, render_template, jsonify, request, session, redirect, url_for
+from markupsafe import escape
 from flask_migrate import Migrate
 import os
-import json
-import hashlib
-import hmac
-import time
-from urllib.parse import unquote
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Импорт моделей
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.models import db, User, Listing, Message, Category
+from config import Config
+from database.models import db, User, Listing, Message, Category, OutboxMessage
+from database.database import engine_options, install_engine_hooks, get_pool_metrics, insert_for
+from database.search import apply_search, ensure_fulltext_index
+from database.pagination import encode_cursor, decode_cursor, keyset_cursor, after_keyset_cursor
+from database.indexes import ensure_listing_indexes
+from web.stats import stats_cache
+from web.view_counter import view_counter
+from web.user_cache import user_cache
+from web.telegram_auth import TelegramAuthVerifier
+from web.login_tracker import login_tracker
+from web.http_cache import cached_json, data_changed, response_cache
+from web.assets import assets, prerendered_pages
+from web.listing_cards import listing_cards
+from web.json_provider import create_json_provider
+from web.message_events import message_hub
+from utils.pubsub import publish_outbox_wakeup, publish_seller_listings_change
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = create_json_provider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-me')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///marketplace.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = Config.DATABASE_URL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(Config.DATABASE_URL)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Инициализация базы данных
+# Инициализация базы данных: общий пул и SQLite-прагмы, как у бота и админ API
 db.init_app(app)
+with app.app_context():
+    install_engine_hooks(db.engine)
 migrate = Migrate(app, db)
+view_counter.init_app(app)
+login_tracker.init_app(app)
+assets.init_app(app)
 
 # Конфигурация
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 ADMIN_IDS = list(map(int, os.getenv('ADMIN_IDS', '').split(','))) if os.getenv('ADMIN_IDS') else []
 
+# Длина текста сообщения в уведомлении бота (лимит Telegram — 4096 символов)
+MESSAGE_PREVIEW_LENGTH = 3500
+
+# Сортировки ленты: значение sort -> (колонка, по убыванию)
+LISTING_SORTS = {
+    'newest': ('created_at', True),
+    'oldest': ('created_at', False),
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'views': ('views', True)
+}
+
+# Секрет HMAC выводится один раз при старте
+telegram_auth = TelegramAuthVerifier(BOT_TOKEN)
+
 def verify_telegram_auth(init_data):
     """Проверка авторизации через Telegram WebApp"""
     try:
-        if not init_data:
-            return None
-            
-        parsed_data = {}
-        for item in init_data.split('&'):
-            if '=' in item:
-                key, value = item.split('=', 1)
-                parsed_data[key] = unquote(value)
-        
-        if 'hash' not in parsed_data or 'auth_date' not in parsed_data:
-            return None
-            
-        received_hash = parsed_data.pop('hash', '')
-        auth_date = int(parsed_data.get('auth_date', '0'))
-        
-        # Проверяем время (24 часа)
-        current_time = int(time.time())
-        if current_time - auth_date > 86400:
-            return None
-            
-        # Создаем строку для проверки
-        data_check_string = '\n'.join([f"{k}={v}" for k, v in sorted(parsed_data.items())])
-        
-        # Проверяем подпись
-        secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
-        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-        
-        if calculated_hash == received_hash:
-            user_data = json.loads(parsed_data.get('user', '{}'))
-            return user_data
-        
-        return None
-        
+        return telegram_auth.verify(init_data)
     except Exception as e:
         print(f"Ошибка авторизации: {e}")
         return None
 
+def listing_views(rows):
+    """Пары (id, просмотры) с учётом ещё не сброшенных в БД просмотров"""
+    return [(row.id, (row.views or 0) + view_counter.pending(row.id)) for row in rows]
+
+def listings_response(rows, **fields):
+    """Ответ ленты: тело собирается из готовых JSON карточек без сериализации ORM"""
+    items = ','.join(listing_cards.json_items(listing_views(rows)))
+    tail = app.json.dumps(fields)[1:]
+    body = '{"listings":[' + items + ']' + (',' + tail if fields else tail)
+    return app.response_class(body, mimetype='application/json')
+
+def int_arg(name):
+    """Целочисленный параметр запроса или None, если он пуст или некорректен"""
+    try:
+        return int(request.args[name])
+    except (KeyError, ValueError):
+        return None
+
 def init_db():
     """Инициализация базы данных с тестовыми данными"""
     with app.app_context():
         db.create_all()
+        ensure_fulltext_index(db.engine)
+        ensure_listing_indexes(db.engine)
+        OutboxMessage.__table__.create(db.engine, checkfirst=True)
         
         # Создаем категории, если их нет
         if Category.query.count() == 0:
@@ -116,7 +139,8 @@ def init_db():
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Страница одинакова для всех: рендер и сжатие один раз на процесс
+    return prerendered_pages.respond('index.html')
 
 @app.route('/auth')
 def auth():
@@ -125,25 +149,49 @@ def auth():
     if init_data:
         user_data = verify_telegram_auth(init_data)
         if user_data:
-            # Ищем или создаем пользователя
-            user = User.query.get(user_data['id'])
-            if not user:
-                user = User(
-                    id=user_data['id'],
-                    username=user_data.get('username'),
-                    first_name=user_data.get('first_name', ''),
-                    last_name=user_data.get('last_name'),
-                    is_admin=user_data['id'] in ADMIN_IDS
+            user_id = user_data['id']
+            profile = (
+                user_data.get('username'),
+                user_data.get('first_name', ''),
+                user_data.get('last_name')
+            )
+            
+            # Пользователь читается из кэша; в БД пишем только новый или изменившийся профиль
+            cached_user = user_cache.get(user_id)
+            if cached_user is None or cached_user.profile != profile:
+                now = datetime.utcnow()
+                users = User.__table__
+                insert = insert_for(db.engine.dialect.name)
+                statement = insert(users).values(
+                    id=user_id,
+                    username=profile[0],
+                    first_name=profile[1],
+                    last_name=profile[2],
+                    is_admin=user_id in ADMIN_IDS,
+                    last_login=now
                 )
-                db.session.add(user)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[users.c.id],
+                    set_={
+                        'username': statement.excluded.username,
+                        'first_name': statement.excluded.first_name,
+                        'last_name': statement.excluded.last_name,
+                        'last_login': statement.excluded.last_login
+                    }
+                )
+                db.session.execute(statement)
+                db.session.commit()
+                
+                # Инвалидация пользователя сбрасывает и карточки его объявлений
+                user_cache.invalidate(user_id)
+                login_tracker.written(user_id, now)
+                if cached_user is None:
+                    stats_cache.user_created()
+                else:
+                    data_changed()
             else:
-                # Обновляем данные при входе
-                user.username = user_data.get('username')
-                user.first_name = user_data.get('first_name', '')
-                user.last_name = user_data.get('last_name')
-                user.last_login = datetime.utcnow()
-            
-            db.session.commit()
+                # Профиль не менялся — last_login запишется пакетно, не чаще раза в интервал
+                login_tracker.touch(user_id)
             
             # Сохраняем в сессии
             session['user'] = user_data
@@ -161,24 +209,26 @@ def create_listing():
     if 'user_id' not in session:
         return redirect(url_for('index'))
     
-    return render_template('create_listing.html', user=session['user'])
+    return prerendered_pages.respond('create_listing.html')
 
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('index'))
     
-    user = User.query.get(session['user_id'])
+    user = user_cache.get(session['user_id'])
     if not user:
         return redirect(url_for('logout'))
     
-    user_listings = Listing.query.filter_by(seller_id=session['user_id']).order_by(Listing.created_at.desc()).all()
-    user_messages = Message.query.filter_by(recipient_id=session['user_id']).order_by(Message.created_at.desc()).limit(10).all()
+    user_listings = db.session.query(Listing.id, Listing.views).filter(
+        Listing.seller_id == session['user_id']
+    ).order_by(Listing.created_at.desc()).all()
     
+    # Сообщения дашборд загружает сам через /api/messages и получает новые по /api/messages/stream
     return render_template('dashboard.html', 
                          user=session['user'],
-                         listings=[l.to_dict() for l in user_listings],
-                         messages=[m.to_dict() for m in user_messages])
+                         listings=listing_cards.dicts(listing_views(user_listings)),
+                         message_poll_interval=Config.MESSAGE_POLL_INTERVAL)
 
 # API эндпоинты
 @app.route('/api/user')
@@ -186,51 +236,67 @@ def api_user():
     if 'user_id' not in session:
         return jsonify({'authenticated': False}), 200
     
-    user = User.query.get(session['user_id'])
+    user = user_cache.get(session['user_id'])
     if not user:
         return jsonify({'authenticated': False}), 200
     
     return jsonify({
         'user': session['user'],
-        'user_data': user.to_dict(),
+        'user_data': user.data,
         'authenticated': True,
         'is_admin': user.is_admin,
         'auth_time': session.get('auth_time', '')
     })
 
 @app.route('/api/stats')
+@cached_json(Config.CACHE_CONTROL_STATS)
 def api_stats():
-    total_listings = Listing.query.filter_by(status='active').count()
-    total_users = User.query.filter_by(is_active=True).count()
+    # Агрегаты берутся из кэша, БД читается только при истечении TTL
+    return jsonify(stats_cache.get())
+
+@app.route('/api/stats/refresh', methods=['POST'])
+def api_refresh_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user = user_cache.get_for_auth(session['user_id'])
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
     
-    # Подсчет статистики
-    total_views = db.session.query(db.func.sum(Listing.views)).scalar() or 0
-    total_favorites = db.session.query(db.func.sum(Listing.favorites)).scalar() or 0
-    avg_price = db.session.query(db.func.avg(Listing.price)).scalar() or 0
+    stats = stats_cache.refresh()
+    data_changed()
+    return jsonify(stats)
+
+@app.route('/api/metrics')
+def api_metrics():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
     
-    # Статистика по категориям
-    categories_stats = {}
-    for category in Category.query.all():
-        count = Listing.query.filter_by(category=category.name, status='active').count()
-        categories_stats[category.name] = count
+    user = user_cache.get_for_auth(session['user_id'])
+    if not user or not user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
     
     return jsonify({
-        'total_listings': total_listings,
-        'total_users': total_users,
-        'active_listings': total_listings,
-        'avg_price': float(avg_price) if avg_price else 0,  # ИСПРАВЛЕНО: без деления на 100
-        'total_views': total_views,
-        'total_favorites': total_favorites,
-        'categories': categories_stats,
-        'last_updated': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        'user_cache': user_cache.stats(),
+        'auth_cache': telegram_auth.stats(),
+        'response_cache': response_cache.stats(),
+        'listing_cards': listing_cards.stats(),
+        'message_stream': message_hub.stats(),
+        'db_pool': get_pool_metrics(db.engine)
     })
 
 @app.route('/api/listings')
+@cached_json(Config.CACHE_CONTROL_LISTINGS)
 def api_listings():
     category = request.args.get('category', '')
     search = request.args.get('search', '').lower()
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = max(1, min(int_arg('per_page') or 20, 100))
+    cursor = request.args.get('cursor', '')
+    include_total = request.args.get('include_total') in ('1', 'true')
+    # Без sort поиск идёт по релевантности, лента — от новых к старым
+    sort = request.args.get('sort', '')
+    if sort not in LISTING_SORTS:
+        sort = '' if search else 'newest'
     
     # Базовый запрос
     query = Listing.query.filter_by(status='active')
@@ -239,27 +305,77 @@ def api_listings():
     if category:
         query = query.filter_by(category=category)
     
+    ranges = (
+        (Listing.price, int_arg('price_min'), int_arg('price_max')),
+        (Listing.subscribers_count, int_arg('subscribers_min'), int_arg('subscribers_max'))
+    )
+    for column, low, high in ranges:
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+    
+    # Поиск: FTS5/tsvector с ранжированием по релевантности, иначе ILIKE
     if search:
-        query = query.filter(
-            db.or_(
-                Listing.title.ilike(f'%{search}%'),
-                Listing.description.ilike(f'%{search}%')
-            )
+        query = apply_search(query, Listing, search, db.engine)
+    
+    if sort:
+        sort_column, descending = LISTING_SORTS[sort]
+        attribute = getattr(Listing, sort_column)
+        # Явная сортировка заменяет порядок по релевантности
+        query = query.order_by(None).order_by(
+            *((attribute.desc(), Listing.id.desc()) if descending else (attribute.asc(), Listing.id.asc()))
         )
+    else:
+        query = query.order_by(Listing.created_at.desc(), Listing.id.desc())
     
-    # Сортировка и пагинация
-    query = query.order_by(Listing.created_at.desc())
-    listings = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Из БД читаются только ключи сортировки и просмотры, карточки берутся из кэша
+    query = query.with_entities(Listing.id, Listing.views, Listing.created_at, Listing.price)
     
-    return jsonify({
-        'listings': [listing.to_dict() for listing in listings.items],
-        'total': listings.total,
-        'pages': listings.pages,
-        'current_page': page,
-        'has_next': listings.has_next,
-        'has_prev': listings.has_prev,
-        'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-    })
+    # Старый постраничный режим для клиентов, которые передают page
+    if 'page' in request.args and not cursor:
+        page = max(int_arg('page') or 1, 1)
+        listings = query.paginate(page=page, per_page=per_page, error_out=False)
+        
+        return listings_response(
+            listings.items,
+            total=listings.total,
+            pages=listings.pages,
+            current_page=page,
+            has_next=listings.has_next,
+            has_prev=listings.has_prev
+        )
+    
+    total = query.order_by(None).count() if include_total else None
+    cursor_values = decode_cursor(cursor) or {}
+    
+    # Курсорная пагинация: лента идёт по индексу (status, колонка сортировки, id)
+    # без OFFSET. Результаты поиска по релевантности не имеют такого ключа,
+    # поэтому их курсор хранит смещение — выдача FTS и так ограничена совпадениями.
+    if not sort:
+        try:
+            offset = max(int(cursor_values.get('o', 0)), 0)
+        except (TypeError, ValueError):
+            # Подделанный или устаревший курсор — начинаем с первой страницы
+            offset = 0
+        rows = query.offset(offset).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor({'o': offset + per_page}) if has_next else None
+    else:
+        after = after_keyset_cursor(Listing, sort_column, cursor_values, descending) if cursor_values else None
+        if after is not None:
+            query = query.filter(after)
+        rows = query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = keyset_cursor(rows[-1], sort_column) if has_next else None
+    
+    fields = {'next_cursor': next_cursor, 'has_next': has_next}
+    if total is not None:
+        fields['total'] = total
+    
+    return listings_response(rows, **fields)
 
 @app.route('/api/listings', methods=['POST'])
 def api_create_listing():
@@ -322,6 +438,9 @@ def api_create_listing():
         
         db.session.add(new_listing)
         db.session.commit()
+        stats_cache.listing_created(new_listing)
+        data_changed()
+        publish_seller_listings_change(new_listing.seller_id)
         
         print(f"✅ Создано объявление: {new_listing.title} (ID: {new_listing.id}) цена: ${new_listing.price} от пользователя {session['first_name']}")
         
@@ -344,12 +463,17 @@ def api_delete_listing(listing_id):
     listing = Listing.query.get_or_404(listing_id)
     
     # Проверяем права доступа
-    user = User.query.get(session['user_id'])
-    if listing.seller_id != session['user_id'] and not user.is_admin:
-        return jsonify({'error': 'Access denied'}), 403
+    if listing.seller_id != session['user_id']:
+        user = user_cache.get_for_auth(session['user_id'])
+        if not (user and user.is_admin):
+            return jsonify({'error': 'Access denied'}), 403
     
     db.session.delete(listing)
     db.session.commit()
+    stats_cache.listing_deleted(listing)
+    listing_cards.invalidate(listing_id)
+    data_changed()
+    publish_seller_listings_change(listing.seller_id)
     
     print(f"🗑️ Удалено объявление: {listing.title} (ID: {listing_id})")
     
@@ -357,11 +481,15 @@ def api_delete_listing(listing_id):
 
 @app.route('/api/listings/<int:listing_id>/view', methods=['POST'])
 def api_view_listing(listing_id):
-    listing = Listing.query.get_or_404(listing_id)
-    listing.views += 1
-    db.session.commit()
+    # Читаем только счётчик, сам просмотр уходит в буфер без записи в БД
+    row = db.session.query(Listing.views).filter(Listing.id == listing_id).first()
+    if row is None:
+        return jsonify({'error': 'Page not found'}), 404
+    
+    view_counter.hit(listing_id)
+    stats_cache.listing_viewed()
     
-    return jsonify({'success': True, 'views': listing.views})
+    return jsonify({'success': True, 'views': (row.views or 0) + view_counter.pending(listing_id)})
 
 @app.route('/api/contact', methods=['POST'])
 def api_contact_seller():
@@ -390,8 +518,21 @@ def api_contact_seller():
         )
         
         db.session.add(new_message)
+        
+        # Уведомление продавцу в боте пишется в outbox той же транзакцией
+        db.session.execute(OutboxMessage.__table__.insert().values(
+            chat_id=listing.seller_id,
+            text=(
+                f"💬 <b>Новое сообщение</b> по объявлению «{escape(listing.title)}»\n"
+                f"От: {escape(session['first_name'])}\n\n"
+                f"{escape(message_text[:MESSAGE_PREVIEW_LENGTH])}"
+            )
+        ))
         db.session.commit()
         
+        message_hub.publish(listing.seller_id, new_message.to_dict())
+        publish_outbox_wakeup()
+        
         print(f"💬 Сообщение от {session['first_name']} к {listing.seller.first_name} по объявлению #{listing_id}")
         
         return jsonify({
@@ -405,7 +546,50 @@ def api_contact_seller():
         print(f"❌ Ошибка отправки сообщения: {e}")
         return jsonify({'error': 'Server error occurred'}), 500
 
+@app.route('/api/messages')
+def api_messages():
+    """Сообщения пользователя, новые первыми; следующая страница — before=<id>"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    limit = max(1, min(int_arg('limit') or 10, 50))
+    query = Message.query.filter_by(recipient_id=session['user_id'])
+    before = int_arg('before')
+    if before:
+        query = query.filter(Message.id < before)
+    messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    
+    return jsonify({
+        'messages': [m.to_dict() for m in messages[:limit]],
+        'next_before': messages[limit - 1].id if len(messages) > limit else None
+    })
+
+@app.route('/api/messages/stream')
+def api_messages_stream():
+    """Новые сообщения для открытого дашборда (Server-Sent Events)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user_id = session['user_id']
+    listener = message_hub.connect(user_id)
+    if listener is None:
+        # Все места для SSE заняты — дашборд переходит на опрос /api/messages
+        response = jsonify({'error': 'Too many open streams', 'poll_interval': Config.MESSAGE_POLL_INTERVAL})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.MESSAGE_POLL_INTERVAL)
+        return response
+    
+    response = Response(
+        message_hub.stream(user_id, listener),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Если клиент ушёл до первого чтения, finally генератора не выполнится
+    response.call_on_close(lambda: message_hub.disconnect(user_id, listener))
+    return response
+
 @app.route('/api/categories')
+@cached_json(Config.CACHE_CONTROL_CATEGORIES)
 def api_categories():
     categories = Category.query.filter_by(is_active=True).all()
     return jsonify({
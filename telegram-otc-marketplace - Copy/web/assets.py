@@ -0,0 +1,196 @@
+"""
+Статика и HTML Mini App: отпечатки, предсжатие, пре-рендер
+
+build_assets() при сборке копирует файлы из web/static в web/static/dist
+под именами с хэшем содержимого и рядом кладёт .gz и .br версии.
+Такие файлы отдаются по /assets/ с кэшированием на год. Шаблоны, которые
+не зависят от пользователя, рендерятся и сжимаются один раз на процесс.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import threading
+
+from flask import request, render_template, url_for, send_file, abort, current_app
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'application/javascript', 'text/javascript',
+                      'application/json', 'image/svg+xml', 'text/plain')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Ссылки на ассеты в HTML меняются с каждым деплоем, поэтому HTML всегда ревалидируется
+PAGE_CACHE_CONTROL = 'public, no-cache'
+
+def is_compressible(mimetype):
+    return (mimetype or '').split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+def compress_variants(body, level=9):
+    """Сжатые варианты тела; варианты, которые не меньше оригинала, отбрасываются"""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11 if level >= 9 else 4)
+    variants['gzip'] = gzip.compress(body, compresslevel=level, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+def choose_encoding(accept_encoding, available):
+    """Выбирает br или gzip по заголовку Accept-Encoding"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Собирает web/static/dist: файлы с хэшем в имени, .gz/.br и manifest.json"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                body = f.read()
+
+            stem, ext = os.path.splitext(logical)
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            hashed = f'{stem}.{digest}{ext}'
+            target = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(body)
+
+            if is_compressible(mimetypes.guess_type(filename)[0]):
+                for encoding, data in compress_variants(body).items():
+                    with open(target + ('.br' if encoding == 'br' else '.gz'), 'wb') as f:
+                        f.write(data)
+
+            manifest[logical] = hashed
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+class AssetRegistry:
+    def __init__(self, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        self.manifest = {}
+
+    def init_app(self, app):
+        manifest_path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            print("⚠️ web/static/dist не собран — статика отдаётся без отпечатков (python build_assets.py)")
+
+        app.jinja_env.globals['asset_url'] = self.url
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.after_request(compress_response)
+
+    def url(self, name):
+        hashed = self.manifest.get(name)
+        if hashed is None:
+            return url_for('static', filename=name)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        path = os.path.realpath(os.path.join(self.dist_dir, filename))
+        if not path.startswith(os.path.realpath(self.dist_dir) + os.sep) or not os.path.isfile(path):
+            abort(404)
+
+        suffixes = {'br': '.br', 'gzip': '.gz'}
+        available = [encoding for encoding, suffix in suffixes.items() if os.path.isfile(path + suffix)]
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), available)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(path + suffixes[encoding] if encoding else path, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+class PrerenderedPages:
+    """HTML страниц, не зависящих от пользователя, с готовыми сжатыми вариантами"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def _get(self, template):
+        page = self._pages.get(template)
+        if page is None:
+            body = render_template(template).encode('utf-8')
+            page = {
+                'identity': body,
+                **compress_variants(body),
+                'etag': hashlib.sha256(body).hexdigest()[:16]
+            }
+            with self._lock:
+                self._pages[template] = page
+        return page
+
+    def respond(self, template):
+        page = self._get(template)
+        if request.if_none_match.contains(page['etag']):
+            response = current_app.response_class(status=304)
+        else:
+            encoding = choose_encoding(
+                request.headers.get('Accept-Encoding'),
+                [name for name in ('br', 'gzip') if name in page]
+            )
+            response = current_app.response_class(page[encoding or 'identity'], mimetype='text/html')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(page['etag'])
+        response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+def compress_response(response):
+    """gzip для динамических HTML/JSON-ответов (дашборд, API)"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if choose_encoding(request.headers.get('Accept-Encoding'), ['gzip']) is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(body, compresslevel=Config.COMPRESS_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+assets = AssetRegistry()
+prerendered_pages = PrerenderedPages()
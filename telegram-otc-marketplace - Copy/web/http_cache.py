@@ -0,0 +1,152 @@
+"""
+HTTP-кэширование публичных эндпоинтов
+
+Версия данных — счётчик, который увеличивается при записи объявлений и
+категорий (в том числе из админ API через pub/sub). Сброс просмотров
+версию не трогает: он происходит каждые несколько секунд и обнулял бы
+весь кэш. Вместо этого у просмотров своя версия, которая сдвигается не
+чаще раза в VIEWS_CACHE_INTERVAL секунд и только если просмотры были
+записаны. Готовые JSON-тела хранятся в LRU по пути, нормализованным
+параметрам и обеим версиям, поэтому ответ и 304 Not Modified для
+закэшированного тела отдаются без обращения к БД.
+
+Слабый ETag — дайджест тела: он одинаков во всех воркерах, и 304
+отдаёт любой процесс, собравший тот же ответ. Без Redis записи других
+процессов (админ API) версию здесь не сдвигают, поэтому тело живёт не
+дольше LOCAL_CACHE_TTL секунд, иначе — RESPONSE_CACHE_TTL.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app
+
+from config import Config
+from utils.pubsub import (
+    pubsub, publish_data_change, publish_views_flushed,
+    DATA_VERSION_CHANNEL, VIEWS_FLUSHED_CHANNEL, LocalPubSub
+)
+
+class DataVersion:
+    def __init__(self, views_interval=Config.VIEWS_CACHE_INTERVAL):
+        self.views_interval = views_interval
+        self._lock = threading.Lock()
+        self.value = 0
+        self.views = 0
+        self._views_dirty = False
+        self._views_bumped_at = time.monotonic()
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            return self.value
+
+    def views_flushed(self):
+        with self._lock:
+            self._views_dirty = True
+
+    def current(self):
+        """(версия данных, версия просмотров)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._views_dirty and now - self._views_bumped_at >= self.views_interval:
+                self.views += 1
+                self._views_dirty = False
+                self._views_bumped_at = now
+            return self.value, self.views
+
+class ResponseCache:
+    def __init__(self, maxsize=Config.RESPONSE_CACHE_SIZE, ttl=None):
+        self.maxsize = maxsize
+        if ttl is None:
+            ttl = Config.LOCAL_CACHE_TTL if isinstance(pubsub, LocalPubSub) else Config.RESPONSE_CACHE_TTL
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        """(тело, etag) или None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] >= self.ttl:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1], item[2]
+
+    def put(self, key, body, etag):
+        with self._lock:
+            self._items[key] = (time.monotonic(), body, etag)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
+
+data_version = DataVersion()
+response_cache = ResponseCache()
+
+def data_changed():
+    """Вызывается после записи объявлений или категорий"""
+    # Сообщение доходит и до подписчика в этом процессе
+    publish_data_change()
+
+def views_flushed():
+    """Вызывается после записи просмотров в БД"""
+    publish_views_flushed()
+
+# Изменения из этого и других процессов (админ API, другие воркеры)
+pubsub.subscribe(DATA_VERSION_CHANNEL, lambda message: data_version.bump())
+pubsub.subscribe(VIEWS_FLUSHED_CHANNEL, lambda message: data_version.views_flushed())
+
+def _normalized_query():
+    """Непустые параметры запроса парами (ключ, значение) в каноническом порядке"""
+    return tuple(sorted(
+        (key, value) for key, value in request.args.items(multi=True) if value != ''
+    ))
+
+def cached_json(cache_control):
+    """Декоратор для публичных JSON-эндпоинтов: ETag, 304 и кэш тела ответа"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, views = data_version.current()
+            key = (request.path, _normalized_query(), version, views)
+
+            response = None
+            cached = response_cache.get(key)
+            if cached is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()[:20]
+                response_cache.put(key, body, etag)
+            else:
+                body, etag = cached
+
+            if request.if_none_match.contains_weak(etag):
+                with response_cache._lock:
+                    response_cache.not_modified += 1
+                response = current_app.response_class(status=304)
+            elif response is None:
+                response = current_app.response_class(body, mimetype='application/json')
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
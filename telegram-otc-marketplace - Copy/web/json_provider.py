@@ -0,0 +1,50 @@
+"""
+JSON-провайдер Flask
+
+Выбирается настройкой JSON_PROVIDER: "orjson", "std" или "auto"
+(orjson, если пакет установлен). OrjsonProvider сериализует ответ сразу
+в байты; даты отдаются в том же формате, что и у стандартного провайдера.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Сортировка ключей стоит времени, а клиентам порядок не важен
+    sort_keys = False
+
+    @property
+    def option(self):
+        # datetime отдаём в default, чтобы формат совпадал со стандартным провайдером
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def create_json_provider(app, name=Config.JSON_PROVIDER):
+    """Создаёт JSON-провайдер приложения по настройке JSON_PROVIDER"""
+    if name == 'orjson' and orjson is None:
+        print("⚠️ JSON_PROVIDER=orjson, но пакет orjson не установлен — используется стандартный json")
+    if name in ('orjson', 'auto') and orjson is not None:
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
@@ -0,0 +1,155 @@
+"""
+Карточки объявлений для ленты (read model)
+
+Для каждого объявления хранится готовый JSON карточки вместе с данными
+продавца. Лента выбирает из БД только id и счётчик просмотров, а тело
+ответа собирается из готовых строк без гидрации ORM и повторной
+сериализации. Недостающие карточки загружаются одним запросом с
+продавцом через JOIN. Карточка сбрасывается при изменении объявления
+или профиля продавца, в том числе из других процессов через pub/sub.
+Без Redis правки из других процессов сюда не доходят, поэтому карточка
+живёт не дольше LOCAL_CACHE_TTL секунд, иначе — LISTING_CARD_CACHE_TTL.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from config import Config
+from database.models import Listing
+from utils.pubsub import (
+    pubsub, publish_listing_invalidation,
+    LISTING_INVALIDATION_CHANNEL, USER_INVALIDATION_CHANNEL, LocalPubSub
+)
+
+def build_card(listing):
+    """Поля карточки без просмотров — они меняются слишком часто"""
+    seller = listing.seller
+    return {
+        'id': listing.id,
+        'title': listing.title,
+        'description': listing.description,
+        'price': listing.price,
+        'currency': listing.currency,
+        'category': listing.category,
+        'subscribers_count': listing.subscribers_count,
+        'status': listing.status,
+        'favorites': listing.favorites,
+        'seller_id': listing.seller_id,
+        'seller_name': seller.first_name if seller else '',
+        'seller_username': seller.username if seller else None,
+        'seller_rating': seller.rating if seller else 0,
+        'created_at': listing.created_at.isoformat() if listing.created_at else None
+    }
+
+class ListingCardCache:
+    def __init__(self, maxsize=Config.LISTING_CARD_CACHE_SIZE, ttl=None):
+        self.maxsize = maxsize
+        if ttl is None:
+            ttl = Config.LOCAL_CACHE_TTL if isinstance(pubsub, LocalPubSub) else Config.LISTING_CARD_CACHE_TTL
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # id -> (JSON карточки без закрывающей скобки, словарь карточки, время загрузки)
+        self._items = OrderedDict()
+        self._by_seller = defaultdict(set)
+        # Растёт при каждой инвалидации: карточку, прочитанную до неё, не сохраняем
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, listing_ids):
+        """Возвращает {id: (json_prefix, card)}; отсутствующие читаются одним запросом"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for listing_id in listing_ids:
+                item = self._items.get(listing_id)
+                if item is None or now - item[2] >= self.ttl:
+                    missing.append(listing_id)
+                else:
+                    self._items.move_to_end(listing_id)
+                    found[listing_id] = item
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self._generation
+
+        if not missing:
+            return found
+
+        listings = Listing.query.options(joinedload(Listing.seller)).filter(Listing.id.in_(missing)).all()
+        loaded = {}
+        for listing in listings:
+            card = build_card(listing)
+            prefix = current_app.json.dumps(card)[:-1]
+            loaded[listing.id] = (prefix, card, now)
+        found.update(loaded)
+
+        with self._lock:
+            if generation == self._generation:
+                for listing_id, item in loaded.items():
+                    self._items[listing_id] = item
+                    self._by_seller[item[1]['seller_id']].add(listing_id)
+                while len(self._items) > self.maxsize:
+                    evicted_id, (_, card, _) = self._items.popitem(last=False)
+                    self._by_seller[card['seller_id']].discard(evicted_id)
+        return found
+
+    def json_items(self, views):
+        """JSON-строки карточек для пар (id, просмотры) в порядке выдачи"""
+        items = self.get_many([listing_id for listing_id, _ in views])
+        return [
+            f'{items[listing_id][0]},"views":{int(count)}}}'
+            for listing_id, count in views if listing_id in items
+        ]
+
+    def dicts(self, views):
+        """Карточки словарями — для шаблонов"""
+        items = self.get_many([listing_id for listing_id, _ in views])
+        return [
+            dict(items[listing_id][1], views=count)
+            for listing_id, count in views if listing_id in items
+        ]
+
+    def invalidate(self, listing_id):
+        """Сбрасывает карточку во всех процессах"""
+        publish_listing_invalidation(listing_id)
+
+    def _evict(self, *listing_ids):
+        with self._lock:
+            self._generation += 1
+            for listing_id in listing_ids:
+                item = self._items.pop(listing_id, None)
+                if item is not None:
+                    self._by_seller[item[1]['seller_id']].discard(listing_id)
+
+    def _evict_seller(self, *seller_ids):
+        with self._lock:
+            self._generation += 1
+            for seller_id in seller_ids:
+                for listing_id in self._by_seller.pop(seller_id, ()):
+                    self._items.pop(listing_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+listing_cards = ListingCardCache()
+
+# Изменения объявлений и профилей продавцов из этого и других процессов
+pubsub.subscribe(
+    LISTING_INVALIDATION_CHANNEL,
+    lambda message: listing_cards._evict(*message.get('listing_ids', [message.get('listing_id')]))
+)
+pubsub.subscribe(
+    USER_INVALIDATION_CHANNEL,
+    lambda message: listing_cards._evict_seller(*message.get('user_ids', [message.get('user_id')]))
+)
@@ -0,0 +1,102 @@
+"""
+Отложенная запись users.last_login
+
+Вход пользователя отмечается в памяти не чаще раза в
+LAST_LOGIN_GRANULARITY секунд; накопленные отметки сбрасываются в БД
+одним пакетным UPDATE раз в LAST_LOGIN_FLUSH_INTERVAL секунд. Повторные
+открытия Mini App больше не превращаются в транзакцию записи.
+"""
+import atexit
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam
+
+from config import Config
+from database.models import db, User
+
+class LoginTracker:
+    def __init__(self, granularity=Config.LAST_LOGIN_GRANULARITY,
+                 flush_interval=Config.LAST_LOGIN_FLUSH_INTERVAL):
+        self.granularity = timedelta(seconds=granularity)
+        self.flush_interval = flush_interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._last_seen = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.stop)
+
+    def touch(self, user_id, now=None):
+        """Отмечает вход; запись попадёт в БД при следующем сбросе"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            last_seen = self._last_seen.get(user_id)
+            if last_seen is not None and now - last_seen < self.granularity:
+                return False
+            self._last_seen[user_id] = now
+            self._pending[user_id] = now
+        self._ensure_thread()
+        return True
+
+    def written(self, user_id, now):
+        """Отметка уже записана вместе с профилем — повторно писать не нужно"""
+        with self._lock:
+            self._last_seen[user_id] = now
+            self._pending.pop(user_id, None)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+                # Забываем тех, чья отметка старше гранулярности — словарь не растёт бесконечно
+                threshold = datetime.utcnow() - self.granularity
+                self._last_seen = {
+                    user_id: seen for user_id, seen in self._last_seen.items() if seen >= threshold
+                }
+            if not batch:
+                return 0
+
+            users = User.__table__
+            statement = users.update().where(
+                users.c.id == bindparam('user_id')
+            ).values(last_login=bindparam('login_at'))
+            params = [{'user_id': user_id, 'login_at': login_at} for user_id, login_at in batch.items()]
+
+            try:
+                with self.app.app_context():
+                    db.session.execute(statement, params)
+                    db.session.commit()
+            except Exception as e:
+                with self._lock:
+                    for user_id, login_at in batch.items():
+                        self._pending.setdefault(user_id, login_at)
+                print(f"❌ Ошибка записи last_login: {e}")
+                return 0
+
+            return len(params)
+
+    def stop(self):
+        self._stop.set()
+        if self.app is not None:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+login_tracker = LoginTracker()
@@ -0,0 +1,108 @@
+"""
+Доставка новых сообщений в открытые дашборды (Server-Sent Events)
+
+Каждая вкладка дашборда держит одно соединение /api/messages/stream и
+получает события из своей очереди. Событие о новом сообщении приходит
+через pub/sub, поэтому доходит до дашбордов, открытых на любом
+веб-воркере. Пока событий нет, раз в MESSAGE_STREAM_KEEPALIVE секунд
+отправляется комментарий, чтобы прокси не закрывали соединение.
+
+Под WSGI каждое открытое соединение занимает поток воркера, поэтому их
+число на процесс ограничено MESSAGE_STREAM_MAX_CONNECTIONS. Сверх лимита
+поток отвечает 503, и дашборд опрашивает /api/messages раз в
+MESSAGE_POLL_INTERVAL секунд, периодически пробуя подключиться снова.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from config import Config
+from utils.pubsub import pubsub, publish_message_event, MESSAGE_EVENTS_CHANNEL
+
+class MessageHub:
+    def __init__(self, keepalive=Config.MESSAGE_STREAM_KEEPALIVE, queue_size=100,
+                 max_connections=Config.MESSAGE_STREAM_MAX_CONNECTIONS):
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._listeners = defaultdict(set)
+        self._connections = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def publish(self, recipient_id, message):
+        """Отправляет событие всем процессам"""
+        publish_message_event(recipient_id, message)
+
+    def _deliver(self, recipient_id, message):
+        with self._lock:
+            listeners = list(self._listeners.get(recipient_id, ()))
+        delivered = 0
+        for listener in listeners:
+            try:
+                listener.put_nowait(message)
+                delivered += 1
+            except queue.Full:
+                # Вкладка не успевает читать — событие увидит после перезагрузки
+                pass
+        with self._lock:
+            self.delivered += delivered
+            self.dropped += len(listeners) - delivered
+
+    def connect(self, user_id):
+        """Очередь нового соединения или None, если все места заняты"""
+        with self._lock:
+            if self._connections >= self.max_connections:
+                self.rejected += 1
+                return None
+            listener = queue.Queue(maxsize=self.queue_size)
+            self._listeners[user_id].add(listener)
+            self._connections += 1
+            return listener
+
+    def disconnect(self, user_id, listener):
+        """Освобождает место соединения; повторный вызов ничего не делает"""
+        with self._lock:
+            listeners = self._listeners.get(user_id)
+            if listeners is None or listener not in listeners:
+                return
+            listeners.discard(listener)
+            self._connections -= 1
+            if not listeners:
+                del self._listeners[user_id]
+
+    def stream(self, user_id, listener):
+        """Генератор SSE-ответа для соединения, открытого connect"""
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = listener.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: message\ndata: {json.dumps(message, ensure_ascii=False)}\n\n'
+        finally:
+            self.disconnect(user_id, listener)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._listeners),
+                'connections': self._connections,
+                'max_connections': self.max_connections,
+                'rejected': self.rejected,
+                'delivered': self.delivered,
+                'dropped': self.dropped
+            }
+
+message_hub = MessageHub()
+
+# Сообщения, созданные этим и другими веб-воркерами
+pubsub.subscribe(
+    MESSAGE_EVENTS_CHANNEL,
+    lambda message: message_hub._deliver(message['recipient_id'], message['message'])
+)
@@ -0,0 +1,347 @@
+// Инициализация Telegram WebApp
+let tg = window.Telegram?.WebApp;
+if (tg) {
+    tg.expand();
+    tg.ready();
+    tg.MainButton.hide();
+}
+
+console.log('📝 Создание объявления - исправленная цена и валидация');
+
+// Переменные состояния
+let currentStep = 1;
+const totalSteps = 3;
+let selectedCategory = '';
+
+// Инициализация
+document.addEventListener('DOMContentLoaded', function() {
+    setupEventListeners();
+    updateStepIndicator();
+    console.log('✅ Форма создания объявления готова');
+});
+
+// Настройка обработчиков событий
+function setupEventListeners() {
+    // Выбор категории
+    document.querySelectorAll('.category-option').forEach(option => {
+        option.addEventListener('click', function() {
+            selectCategory(this.dataset.category);
+        });
+    });
+
+    // Быстрый выбор цены
+    document.querySelectorAll('.price-suggestion').forEach(suggestion => {
+        suggestion.addEventListener('click', function() {
+            const price = parseFloat(this.dataset.price);
+            document.getElementById('price').value = price;
+            console.log('💰 Быстрый выбор цены:', price);
+        });
+    });
+
+    // Навигация по шагам
+    document.getElementById('prevBtn').addEventListener('click', previousStep);
+    document.getElementById('nextBtn').addEventListener('click', nextStep);
+
+    // Отправка формы
+    document.getElementById('createListingForm').addEventListener('submit', submitListing);
+
+    // Счетчики символов
+    setupCharacterCounters();
+
+    // Валидация цены в реальном времени
+    const priceInput = document.getElementById('price');
+    priceInput.addEventListener('input', function() {
+        let value = parseFloat(this.value);
+        
+        if (value > 1000000) {
+            this.value = 1000000;
+        } else if (value < 0) {
+            this.value = '';
+        }
+    });
+}
+
+// Выбор категории
+function selectCategory(category) {
+    selectedCategory = category;
+    
+    // Обновляем визуальное состояние
+    document.querySelectorAll('.category-option').forEach(option => {
+        option.classList.remove('active');
+    });
+    document.querySelector(`[data-category="${category}"]`).classList.add('active');
+    
+    // Устанавливаем значение
+    document.getElementById('category').value = category;
+    
+    // Показываем/скрываем поле подписчиков
+    const subscribersGroup = document.getElementById('subscribersGroup');
+    if (category === 'channel') {
+        subscribersGroup.style.display = 'block';
+        document.getElementById('subscribers_count').required = true;
+    } else {
+        subscribersGroup.style.display = 'none';
+        document.getElementById('subscribers_count').required = false;
+        document.getElementById('subscribers_count').value = '';
+    }
+    
+    console.log('✅ Выбрана категория:', category);
+}
+
+// Настройка счетчиков символов
+function setupCharacterCounters() {
+    const titleInput = document.getElementById('title');
+    const descInput = document.getElementById('description');
+    const titleCounter = document.getElementById('titleCounter');
+    const descCounter = document.getElementById('descCounter');
+
+    titleInput.addEventListener('input', function() {
+        updateCharacterCounter(this, titleCounter, 100);
+    });
+
+    descInput.addEventListener('input', function() {
+        updateCharacterCounter(this, descCounter, 1000);
+    });
+}
+
+// Обновление счетчика символов
+function updateCharacterCounter(input, counter, maxLength) {
+    const length = input.value.length;
+    counter.textContent = length;
+    
+    const counterContainer = counter.parentElement;
+    counterContainer.classList.remove('warning', 'danger');
+    
+    if (length > maxLength * 0.9) {
+        counterContainer.classList.add('danger');
+    } else if (length > maxLength * 0.75) {
+        counterContainer.classList.add('warning');
+    }
+}
+
+// Навигация - следующий шаг
+function nextStep() {
+    if (!validateCurrentStep()) return;
+    
+    if (currentStep < totalSteps) {
+        hideStep(currentStep);
+        currentStep++;
+        showStep(currentStep);
+        updateStepIndicator();
+        updateButtons();
+        
+        console.log('➡️ Переход на шаг:', currentStep);
+    }
+}
+
+// Навигация - предыдущий шаг
+function previousStep() {
+    if (currentStep > 1) {
+        hideStep(currentStep);
+        currentStep--;
+        showStep(currentStep);
+        updateStepIndicator();
+        updateButtons();
+        
+        console.log('⬅️ Возврат на шаг:', currentStep);
+    }
+}
+
+// Показать шаг
+function showStep(step) {
+    document.getElementById(`stepContent${step}`).style.display = 'block';
+}
+
+// Скрыть шаг
+function hideStep(step) {
+    document.getElementById(`stepContent${step}`).style.display = 'none';
+}
+
+// Обновление индикатора шагов
+function updateStepIndicator() {
+    for (let i = 1; i <= totalSteps; i++) {
+        const stepElement = document.getElementById(`step${i}`);
+        const lineElement = document.getElementById(`line${i}`);
+        
+        stepElement.classList.remove('active', 'completed');
+        if (lineElement) {
+            lineElement.classList.remove('completed');
+        }
+        
+        if (i < currentStep) {
+            stepElement.classList.add('completed');
+            if (lineElement) {
+                lineElement.classList.add('completed');
+            }
+        } else if (i === currentStep) {
+            stepElement.classList.add('active');
+        }
+    }
+}
+
+// Обновление кнопок
+function updateButtons() {
+    const prevBtn = document.getElementById('prevBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const submitBtn = document.getElementById('submitBtn');
+
+    prevBtn.style.display = currentStep > 1 ? 'block' : 'none';
+    nextBtn.style.display = currentStep < totalSteps ? 'block' : 'none';
+    submitBtn.style.display = currentStep === totalSteps ? 'block' : 'none';
+}
+
+// ИСПРАВЛЕНО: Новая валидация 5/10 символов
+function validateCurrentStep() {
+    switch (currentStep) {
+        case 1:
+            if (!selectedCategory) {
+                showError('Пожалуйста, выберите категорию товара');
+                return false;
+            }
+            break;
+            
+        case 2:
+            const title = document.getElementById('title').value.trim();
+            const description = document.getElementById('description').value.trim();
+            
+            if (!title) {
+                showError('Введите название объявления');
+                return false;
+            }
+            // ИСПРАВЛЕНО: минимум 5 символов
+            if (title.length < 5) {
+                showError('Название должно содержать минимум 5 символов');
+                return false;
+            }
+            if (!description) {
+                showError('Введите описание товара');
+                return false;
+            }
+            // ИСПРАВЛЕНО: минимум 10 символов
+            if (description.length < 10) {
+                showError('Описание должно содержать минимум 10 символов');
+                return false;
+            }
+            
+            // Проверка подписчиков для каналов
+            if (selectedCategory === 'channel') {
+                const subscribers = parseInt(document.getElementById('subscribers_count').value);
+                if (!subscribers || subscribers < 1) {
+                    showError('Укажите количество подписчиков канала');
+                    return false;
+                }
+            }
+            break;
+            
+        case 3:
+            const price = parseFloat(document.getElementById('price').value);
+            const agreeTerms = document.getElementById('agreeTerms').checked;
+            
+            if (!price || price < 1 || price > 1000000) {
+                showError('Укажите корректную цену от $1.0 до $1,000,000.0');
+                return false;
+            }
+            if (!agreeTerms) {
+                showError('Необходимо согласиться с правилами площадки');
+                return false;
+            }
+            break;
+    }
+    
+    clearMessages();
+    return true;
+}
+
+// ИСПРАВЛЕНО: Отправка формы БЕЗ конвертации в центы
+async function submitListing(e) {
+    e.preventDefault();
+    
+    if (!validateCurrentStep()) return;
+    
+    const submitBtn = document.getElementById('submitBtn');
+    const originalText = submitBtn.innerHTML;
+    
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Создаём объявление...';
+    
+    try {
+        // ИСПРАВЛЕНО: отправляем цену как есть, БЕЗ конвертации в центы
+        const priceValue = parseFloat(document.getElementById('price').value);
+        
+        const formData = {
+            category: selectedCategory,
+            title: document.getElementById('title').value.trim(),
+            description: document.getElementById('description').value.trim(),
+            price: priceValue, // Отправляем как есть: 1.3 остается 1.3
+            subscribers_count: selectedCategory === 'channel' ? 
+                parseInt(document.getElementById('subscribers_count').value) || 0 : 0
+        };
+        
+        console.log('📤 Отправка данных объявления:');
+        console.log('Цена пользователя (без изменений):', priceValue);
+        console.log('Полные данные:', formData);
+        
+        const response = await fetch('/api/listings', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(formData)
+        });
+        
+        if (response.ok) {
+            const result = await response.json();
+            showSuccess('✅ Объявление успешно создано! Перенаправляем в профиль...');
+            
+            console.log('✅ Объявление создано:', result);
+            
+            if (tg) {
+                tg.showAlert('Объявление успешно опубликовано!');
+            }
+            
+            setTimeout(() => {
+                window.location.href = '/dashboard';
+            }, 2000);
+            
+        } else {
+            const errorData = await response.json();
+            throw new Error(errorData.error || 'Ошибка создания объявления');
+        }
+        
+    } catch (error) {
+        console.error('❌ Ошибка создания объявления:', error);
+        showError('Ошибка создания объявления: ' + error.message);
+        
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = originalText;
+    }
+}
+
+// Показать ошибку
+function showError(message) {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `
+        <div class="error-message">
+            <i class="bi bi-exclamation-triangle"></i>
+            ${message}
+        </div>
+    `;
+    messageArea.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+}
+
+// Показать успех
+function showSuccess(message) {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `
+        <div class="success-message">
+            <i class="bi bi-check-circle"></i>
+            ${message}
+        </div>
+    `;
+    messageArea.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+}
+
+// Очистить сообщения
+function clearMessages() {
+    document.getElementById('messageArea').innerHTML = '';
+}
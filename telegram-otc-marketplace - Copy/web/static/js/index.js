@@ -0,0 +1,685 @@
+// Глобальные переменные
+let tg = window.Telegram?.WebApp;
+let currentUser = null;
+let allListings = [];
+let currentListing = null;
+let nextCursor = null;
+let hasMorePages = false;
+let listingsRequestId = 0;
+let userFavorites = new Set();
+
+console.log('⚡ OTC Marketplace - исправленная версия цен');
+
+// Мгновенный запуск
+document.addEventListener('DOMContentLoaded', () => {
+    initializeTelegram();
+    loadDataAndAuth();
+    setupEventListeners();
+    loadFavoritesFromStorage();
+    console.log('🚀 Запуск завершен');
+});
+
+function initializeTelegram() {
+    if (tg) {
+        tg.expand();
+        tg.ready();
+        if (tg.themeParams) {
+            applyTelegramTheme(tg.themeParams);
+        }
+        console.log('✅ Telegram WebApp готов');
+    }
+}
+
+function applyTelegramTheme(themeParams) {
+    const root = document.documentElement;
+    if (themeParams.bg_color) root.style.setProperty('--tg-theme-bg-color', themeParams.bg_color);
+    if (themeParams.text_color) root.style.setProperty('--tg-theme-text-color', themeParams.text_color);
+    if (themeParams.button_color) root.style.setProperty('--tg-theme-button-color', themeParams.button_color);
+}
+
+async function loadDataAndAuth() {
+    const authPromise = quickAuth();
+    const dataPromise = loadInitialData();
+    const [authResult, dataResult] = await Promise.all([authPromise, dataPromise]);
+
+    if (authResult.success) {
+        updateUserInterface();
+    }
+}
+
+async function quickAuth() {
+    try {
+        const promises = [];
+        promises.push(fetch('/api/user'));
+        
+        if (tg && tg.initData) {
+            promises.push(fetch(`/auth?init_data=${encodeURIComponent(tg.initData)}`));
+        }
+
+        const responses = await Promise.all(promises);
+        
+        if (responses[0].ok) {
+            const sessionData = await responses[0].json();
+            if (sessionData.authenticated) {
+                currentUser = sessionData.user;
+                console.log('⚡ Авторизация:', currentUser.first_name);
+                return { success: true };
+            }
+        }
+
+        if (responses[1] && responses[1].ok) {
+            const authResult = await responses[1].json();
+            if (authResult.success) {
+                const userResponse = await fetch('/api/user');
+                if (userResponse.ok) {
+                    const userData = await userResponse.json();
+                    if (userData.authenticated) {
+                        currentUser = userData.user;
+                        console.log('⚡ Авторизация через Telegram:', currentUser.first_name);
+                        return { success: true };
+                    }
+                }
+            }
+        }
+
+        console.log('⚠️ Работаем без авторизации');
+        return { success: false };
+
+    } catch (error) {
+        console.log('⚠️ Ошибка авторизации:', error);
+        return { success: false };
+    }
+}
+
+async function loadInitialData() {
+    try {
+        const [listingsPromise, statsPromise] = [
+            loadListings(true),
+            fetch('/api/stats').then(r => r.json()).catch(() => ({}))
+        ];
+
+        const [listingsData, statsData] = await Promise.all([listingsPromise, statsPromise]);
+
+        if (statsData.total_listings !== undefined) {
+            updateStats(statsData);
+        }
+
+        console.log('⚡ Данные загружены');
+        return { success: true };
+
+    } catch (error) {
+        console.error('❌ Ошибка загрузки данных:', error);
+        showError('Ошибка загрузки данных');
+        return { success: false };
+    }
+}
+
+function loadFavoritesFromStorage() {
+    try {
+        const stored = localStorage.getItem('otc_favorites');
+        if (stored) {
+            const favoritesList = JSON.parse(stored);
+            userFavorites = new Set(favoritesList);
+            console.log('✅ Загружено избранное из localStorage:', userFavorites.size);
+            
+            if (userFavorites.size > 0) {
+                document.querySelector('[data-filter="favorites"]').style.display = 'block';
+            }
+        }
+    } catch (error) {
+        console.log('⚠️ Ошибка загрузки избранного из localStorage:', error);
+        userFavorites = new Set();
+    }
+}
+
+function saveFavoritesToStorage() {
+    try {
+        const favoritesList = Array.from(userFavorites);
+        localStorage.setItem('otc_favorites', JSON.stringify(favoritesList));
+        console.log('✅ Избранное сохранено в localStorage');
+    } catch (error) {
+        console.log('⚠️ Ошибка сохранения избранного:', error);
+    }
+}
+
+function updateUserInterface() {
+    setupNavigation();
+    
+    if (currentUser) {
+        const createBtn = document.getElementById('createBtn');
+        createBtn.style.display = 'flex';
+        createBtn.addEventListener('click', createListing);
+        showUserInfo();
+        console.log('✅ UI обновлен для:', currentUser.first_name);
+    }
+}
+
+function setupNavigation() {
+    const navbarContent = document.getElementById('navbarContent');
+    
+    if (currentUser) {
+        navbarContent.innerHTML = `
+            <div class="d-flex align-items-center gap-3">
+                <span class="text-muted">
+                    <i class="bi bi-person-check"></i> ${escapeHtml(currentUser.first_name)}
+                </span>
+                <a href="/dashboard" class="btn btn-sm btn-outline-primary">
+                    <i class="bi bi-person-circle"></i> Мой профиль
+                </a>
+            </div>
+        `;
+    } else {
+        navbarContent.innerHTML = `
+            <span class="text-muted">
+                <i class="bi bi-eye"></i> Режим просмотра
+            </span>
+        `;
+    }
+}
+
+function showUserInfo() {
+    const headerUserInfo = document.getElementById('headerUserInfo');
+    headerUserInfo.innerHTML = `
+        <div class="user-info">
+            <i class="bi bi-person-check"></i>
+            <span>Добро пожаловать, ${escapeHtml(currentUser.first_name)}!</span>
+        </div>
+    `;
+}
+
+function updateStats(stats) {
+    document.getElementById('totalListings').textContent = stats.total_listings || 0;
+    document.getElementById('totalUsers').textContent = stats.total_users || 0;
+    // ИСПРАВЛЕНО: форматирование средней цены
+    const avgPrice = parseFloat(stats.avg_price) || 0;
+    document.getElementById('avgPrice').textContent = '$' + avgPrice.toFixed(1);
+    document.getElementById('totalViews').textContent = stats.total_views || 0;
+}
+
+// Поиск, сортировка и категория передаются серверу
+function listingQueryParams() {
+    const params = new URLSearchParams({ per_page: 12 });
+    const search = document.getElementById('searchInput').value.trim();
+    const sort = document.getElementById('sortSelect').value;
+    const category = document.querySelector('.filter-pill.active').dataset.category;
+    
+    if (search) params.append('search', search);
+    if (sort) params.append('sort', sort);
+    if (category) params.append('category', category);
+    return params;
+}
+
+// Избранное хранится локально, поэтому фильтруется в браузере
+function visibleListings() {
+    const filter = document.querySelector('.filter-pill.active').dataset.filter;
+    if (filter !== 'favorites') return allListings;
+    return allListings.filter(listing => userFavorites.has(listing.id));
+}
+
+async function loadListings(reset = false) {
+    const requestId = ++listingsRequestId;
+    try {
+        const params = listingQueryParams();
+        if (!reset && nextCursor) params.append('cursor', nextCursor);
+        
+        const response = await fetch(`/api/listings?${params}`);
+        if (!response.ok) throw new Error('Ошибка загрузки объявлений');
+        
+        const data = await response.json();
+        
+        // Пока шёл запрос, фильтры успели измениться — ответ устарел
+        if (requestId !== listingsRequestId) return data;
+        
+        if (reset) {
+            allListings = data.listings || [];
+        } else {
+            allListings = allListings.concat(data.listings || []);
+        }
+        
+        nextCursor = data.next_cursor || null;
+        hasMorePages = data.has_next || false;
+        displayListings(visibleListings());
+        
+        return data;
+    } catch (error) {
+        console.error('❌ Ошибка загрузки объявлений:', error);
+        throw error;
+    }
+}
+
+function displayListings(listings) {
+    const container = document.getElementById('listingsContainer');
+    const loadMoreSection = document.getElementById('loadMoreSection');
+    
+    if (!listings || listings.length === 0) {
+        container.innerHTML = `
+            <div class="col-12">
+                <div class="empty-state">
+                    <i class="bi bi-inbox"></i>
+                    <h4>Пока нет объявлений</h4>
+                    <p>Станьте первым, кто разместит объявление на площадке!</p>
+                    ${currentUser ? '<button class="btn btn-success btn-lg" onclick="createListing()"><i class="bi bi-plus-lg"></i> Создать объявление</button>' : ''}
+                </div>
+            </div>
+        `;
+        loadMoreSection.style.display = 'none';
+        return;
+    }
+
+    const listingsHtml = listings.map(listing => createListingCard(listing)).join('');
+    container.innerHTML = listingsHtml;
+    
+    loadMoreSection.style.display = hasMorePages ? 'block' : 'none';
+}
+
+// ИСПРАВЛЕНО: Корректная обработка цены
+function createListingCard(listing) {
+    const categoryClass = `category-${listing.category}`;
+    const categoryIcon = getCategoryIcon(listing.category);
+    const categoryName = getCategoryName(listing.category);
+    
+    // ИСПРАВЛЕНО: Убрана неправильная логика конвертации
+    const displayPrice = parseFloat(listing.price).toFixed(1);
+    
+    const isInFavorites = userFavorites.has(listing.id);
+    
+    console.log(`💰 Объявление "${listing.title}": цена из API = ${listing.price}, отображается как = $${displayPrice}`);
+    
+    return `
+        <div class="col-md-6 col-xl-4">
+            <div class="listing-card card h-100" onclick="showListingDetails(${listing.id})">
+                <div class="favorite-btn ${isInFavorites ? 'favorited' : ''}" 
+                     onclick="event.stopPropagation(); toggleFavorite(${listing.id}, this)">
+                    <i class="bi ${isInFavorites ? 'bi-heart-fill' : 'bi-heart'}"></i>
+                </div>
+                
+                <div class="card-body">
+                    <div class="d-flex justify-content-between align-items-start mb-3">
+                        <span class="category-badge ${categoryClass}">
+                            ${categoryIcon} ${categoryName}
+                        </span>
+                    </div>
+                    
+                    <h5 class="card-title">${escapeHtml(listing.title)}</h5>
+                    <p class="card-text">${escapeHtml(truncateText(listing.description, 120))}</p>
+                    
+                    <div class="d-flex justify-content-between align-items-center mb-3">
+                        <span class="price">$${displayPrice}</span>
+                        <div class="seller-info">
+                            <i class="bi bi-person"></i>
+                            <span>${escapeHtml(listing.seller_name)}</span>
+                        </div>
+                    </div>
+                    
+                    <div class="stats-row">
+                        ${listing.subscribers_count > 0 ? `
+                            <span>
+                                <i class="bi bi-people"></i> 
+                                ${formatNumber(listing.subscribers_count)}
+                            </span>
+                        ` : ''}
+                        <span>
+                            <i class="bi bi-eye"></i> 
+                            ${listing.views || 0}
+                        </span>
+                    </div>
+                </div>
+                
+                <div class="card-footer bg-transparent">
+                    <button class="btn btn-contact" onclick="event.stopPropagation(); contactSeller(${listing.id})">
+                        <i class="bi bi-chat-dots"></i> Связаться с продавцом
+                    </button>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function toggleFavorite(listingId, buttonElement) {
+    const isCurrentlyFavorited = userFavorites.has(listingId);
+    const heartIcon = buttonElement.querySelector('i');
+
+    try {
+        if (isCurrentlyFavorited) {
+            userFavorites.delete(listingId);
+            buttonElement.classList.remove('favorited');
+            heartIcon.className = 'bi bi-heart';
+            console.log('💔 Удалено из избранного:', listingId);
+            
+            if (tg) {
+                tg.HapticFeedback.notificationOccurred('warning');
+            }
+        } else {
+            userFavorites.add(listingId);
+            buttonElement.classList.add('favorited');
+            heartIcon.className = 'bi bi-heart-fill';
+            console.log('❤️ Добавлено в избранное:', listingId);
+            
+            if (tg) {
+                tg.HapticFeedback.notificationOccurred('success');
+            }
+        }
+
+        saveFavoritesToStorage();
+
+        const favoritesFilter = document.querySelector('[data-filter="favorites"]');
+        if (userFavorites.size > 0) {
+            favoritesFilter.style.display = 'block';
+        } else {
+            favoritesFilter.style.display = 'none';
+            if (favoritesFilter.classList.contains('active')) {
+                document.querySelector('[data-category=""]').click();
+            }
+        }
+
+    } catch (error) {
+        console.error('❌ Ошибка избранного:', error);
+        if (tg) {
+            tg.showAlert('Ошибка при работе с избранным');
+        } else {
+            alert('Ошибка при работе с избранным');
+        }
+    }
+}
+
+function createListing() {
+    console.log('🎯 Создание объявления');
+    
+    if (!currentUser) {
+        console.log('❌ Пользователь не авторизован');
+        if (tg) {
+            tg.showAlert('Для создания объявления необходимо авторизоваться через Telegram');
+        } else {
+            alert('Для создания объявления необходимо авторизоваться через Telegram');
+        }
+        return;
+    }
+    
+    console.log('✅ Переход на страницу создания объявления');
+    window.location.href = '/create';
+}
+
+async function showListingDetails(listingId) {
+    const listing = allListings.find(l => l.id === listingId);
+    if (!listing) return;
+
+    currentListing = listing;
+    
+    try {
+        await fetch(`/api/listings/${listingId}/view`, { method: 'POST' });
+        listing.views = (listing.views || 0) + 1;
+    } catch (error) {
+        console.log('Не удалось обновить счетчик просмотров');
+    }
+    
+    // ИСПРАВЛЕНО: Правильная обработка цены в модальном окне
+    const displayPrice = parseFloat(listing.price).toFixed(1);
+    
+    const categoryIcon = getCategoryIcon(listing.category);
+    const categoryName = getCategoryName(listing.category);
+    
+    document.getElementById('modalTitle').innerHTML = `
+        <i class="bi bi-card-heading"></i> ${escapeHtml(listing.title)}
+    `;
+    
+    document.getElementById('modalBody').innerHTML = `
+        <div class="row">
+            <div class="col-lg-8">
+                <div class="mb-4">
+                    <span class="category-badge category-${listing.category}">
+                        ${categoryIcon} ${categoryName}
+                    </span>
+                    <span class="badge bg-secondary ms-2">ID: #${listing.id}</span>
+                </div>
+                
+                <h6 class="mb-3">
+                    <i class="bi bi-card-text text-primary"></i> Подробное описание
+                </h6>
+                <div class="description-content mb-4" style="font-size: 1.1rem; line-height: 1.6; color: #374151;">
+                    ${escapeHtml(listing.description).replace(/\n/g, '<br>')}
+                </div>
+                
+                <h6 class="mb-3">
+                    <i class="bi bi-currency-dollar text-success"></i> Стоимость
+                </h6>
+                <div class="price-info mb-4">
+                    <span class="price fs-3">$${displayPrice} ${listing.currency || 'USD'}</span>
+                </div>
+                
+                ${listing.subscribers_count > 0 ? `
+                <h6 class="mb-3">
+                    <i class="bi bi-people text-info"></i> Аудитория
+                </h6>
+                <div class="audience-info mb-4">
+                    <span class="fs-5 fw-bold text-info">${formatNumber(listing.subscribers_count)} подписчиков</span>
+                </div>
+                ` : ''}
+            </div>
+            
+            <div class="col-lg-4">
+                <div class="seller-card bg-light rounded-3 p-3 mb-3">
+                    <h6 class="mb-3">
+                        <i class="bi bi-person text-primary"></i> Продавец
+                    </h6>
+                    <div class="d-flex align-items-center mb-2">
+                        <div class="bg-primary rounded-circle d-flex align-items-center justify-content-center me-3" style="width: 40px; height: 40px;">
+                            <i class="bi bi-person text-white"></i>
+                        </div>
+                        <div>
+                            <div class="fw-bold" style="font-size: 1.1rem;">${escapeHtml(listing.seller_name)}</div>
+                            ${listing.seller_username ? `<small class="text-muted">@${escapeHtml(listing.seller_username)}</small>` : ''}
+                        </div>
+                    </div>
+                    <div class="seller-stats">
+                        <small class="text-muted">
+                            <i class="bi bi-star-fill text-warning"></i> 
+                            Рейтинг: 5.0
+                        </small>
+                    </div>
+                </div>
+                
+                <div class="info-card bg-light rounded-3 p-3 mb-3">
+                    <h6 class="mb-3">
+                        <i class="bi bi-info-circle text-info"></i> Информация
+                    </h6>
+                    <div class="info-item">
+                        <small class="text-muted">Статус:</small>
+                        <div>
+                            <span class="badge ${listing.status === 'active' ? 'bg-success' : 'bg-secondary'}">
+                                ${listing.status === 'active' ? '✅ Активно' : '⏸️ Неактивно'}
+                            </span>
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="stats-card bg-light rounded-3 p-3">
+                    <h6 class="mb-3">
+                        <i class="bi bi-graph-up text-success"></i> Статистика
+                    </h6>
+                    <div class="row text-center">
+                        <div class="col-12">
+                            <div class="stat-number text-primary" style="font-size: 2rem;">${listing.views || 0}</div>
+                            <small class="text-muted">Просмотров</small>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+    
+    const contactBtn = document.getElementById('modalContactBtn');
+    if (currentUser && currentUser.id !== listing.seller_id) {
+        contactBtn.style.display = 'block';
+        contactBtn.onclick = () => contactSeller(listing.id);
+    } else if (!currentUser) {
+        contactBtn.style.display = 'block';
+        contactBtn.innerHTML = '<i class="bi bi-telegram"></i> Войти для связи';
+        contactBtn.onclick = () => {
+            bootstrap.Modal.getInstance(document.getElementById('listingModal')).hide();
+            quickAuth();
+        };
+    } else {
+        contactBtn.style.display = 'none';
+    }
+    
+    new bootstrap.Modal(document.getElementById('listingModal')).show();
+}
+
+async function contactSeller(listingId) {
+    const listing = allListings.find(l => l.id === listingId) || currentListing;
+    if (!listing) return;
+
+    if (!currentUser) {
+        alert('Для связи с продавцом необходимо авторизоваться через Telegram');
+        return;
+    }
+
+    if (currentUser.id === listing.seller_id) {
+        alert('Вы не можете связаться с самим собой 😊');
+        return;
+    }
+
+    // ИСПРАВЛЕНО: Правильная цена в сообщении
+    const displayPrice = parseFloat(listing.price).toFixed(1);
+
+    const message = `Привет! Меня интересует ваше объявление "${listing.title}" за $${displayPrice}. Можем обсудить детали?`;
+    
+    try {
+        const response = await fetch('/api/contact', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                listing_id: listingId,
+                message: message
+            })
+        });
+
+        if (response.ok) {
+            if (tg) {
+                tg.showAlert('Сообщение отправлено продавцу! Ответ придет в личные сообщения.');
+            } else {
+                alert('✅ Сообщение отправлено продавцу!');
+            }
+            
+            bootstrap.Modal.getInstance(document.getElementById('listingModal')).hide();
+        } else {
+            throw new Error('Ошибка отправки сообщения');
+        }
+    } catch (error) {
+        console.error('❌ Ошибка отправки сообщения:', error);
+        alert('Ошибка отправки сообщения. Попробуйте позже.');
+    }
+}
+
+function setupEventListeners() {
+    const searchInput = document.getElementById('searchInput');
+    searchInput.addEventListener('input', debounce(filterListings, 300));
+    
+    document.getElementById('sortSelect').addEventListener('change', filterListings);
+    
+    document.querySelectorAll('.filter-pill').forEach(pill => {
+        pill.addEventListener('click', function() {
+            document.querySelectorAll('.filter-pill').forEach(p => p.classList.remove('active'));
+            this.classList.add('active');
+            filterListings();
+        });
+    });
+    
+    document.getElementById('loadMoreBtn').addEventListener('click', loadMore);
+}
+
+async function loadMore() {
+    const btn = document.getElementById('loadMoreBtn');
+    const originalText = btn.innerHTML;
+    
+    btn.disabled = true;
+    btn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Загрузка...';
+    
+    try {
+        const data = await loadListings(false);
+        if (!data.has_next) {
+            document.getElementById('loadMoreSection').style.display = 'none';
+        }
+    } catch (error) {
+        console.error('❌ Ошибка загрузки объявлений:', error);
+        alert('Ошибка загрузки объявлений');
+    } finally {
+        btn.disabled = false;
+        btn.innerHTML = originalText;
+    }
+}
+
+// Фильтры применяются на сервере: выдача начинается заново с первой страницы
+async function filterListings() {
+    try {
+        await loadListings(true);
+    } catch (error) {
+        showError('Ошибка загрузки объявлений');
+    }
+}
+
+function showError(message) {
+    const container = document.getElementById('listingsContainer');
+    container.innerHTML = `
+        <div class="col-12">
+            <div class="empty-state">
+                <i class="bi bi-exclamation-triangle text-warning"></i>
+                <h4>Ошибка загрузки</h4>
+                <p>${message}</p>
+                <button class="btn btn-primary" onclick="location.reload()">
+                    <i class="bi bi-arrow-clockwise"></i> Обновить страницу
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+// Вспомогательные функции
+function getCategoryIcon(category) {
+    const icons = { 'channel': '📢', 'account': '👤', 'other': '🎁' };
+    return icons[category] || '❓';
+}
+
+function getCategoryName(category) {
+    const names = { 'channel': 'Канал', 'account': 'Аккаунт', 'other': 'Другое' };
+    return names[category] || 'Неизвестно';
+}
+
+function formatDate(dateString) {
+    const date = new Date(dateString);
+    return date.toLocaleDateString('ru-RU', {
+        day: 'numeric',
+        month: 'short',
+        year: 'numeric'
+    });
+}
+
+function truncateText(text, maxLength) {
+    if (!text) return '';
+    return text.length > maxLength ? text.substring(0, maxLength) + '...' : text;
+}
+
+function formatNumber(num) {
+    return new Intl.NumberFormat('ru-RU').format(num);
+}
+
+function escapeHtml(text) {
+    if (!text) return '';
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+        const later = () => {
+            clearTimeout(timeout);
+            func(...args);
+        };
+        clearTimeout(timeout);
+        timeout = setTimeout(later, wait);
+    };
+}
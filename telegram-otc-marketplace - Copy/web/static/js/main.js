@@ -36,16 +36,21 @@ function setupSearch() {
     });
     
     categoryFilter.addEventListener('change', performSearch);
+    
+    const sortSelect = document.getElementById('sortSelect');
+    if (sortSelect) sortSelect.addEventListener('change', performSearch);
 }
 
 // Выполнение поиска
 function performSearch() {
     const search = document.getElementById('searchInput').value;
     const category = document.getElementById('categoryFilter').value;
+    const sortSelect = document.getElementById('sortSelect');
     
     const params = new URLSearchParams();
     if (search) params.append('search', search);
     if (category) params.append('category', category);
+    if (sortSelect && sortSelect.value) params.append('sort', sortSelect.value);
     
     fetch(`/api/listings?${params}`)
         .then(response => response.json())
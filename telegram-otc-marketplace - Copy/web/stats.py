@@ -0,0 +1,119 @@
+"""
+Кэш статистики площадки для /api/stats
+
+Агрегаты считаются одним проходом при загрузке и дальше поддерживаются
+инкрементально: создание, удаление и просмотры объявлений меняют
+счётчики в памяти. Через STATS_CACHE_TTL секунд (или по refresh())
+значения пересчитываются из БД, чтобы исправить возможный дрейф.
+"""
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, case
+
+from config import Config
+from database.models import db, User, Listing, Category
+
+class StatsCache:
+    def __init__(self, ttl=Config.STATS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._loaded_at = 0.0
+
+    def get(self):
+        """Возвращает копию статистики, при необходимости пересчитывая её"""
+        with self._lock:
+            if self._data is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._load()
+            return self._snapshot()
+
+    def refresh(self):
+        """Принудительный пересчёт из БД"""
+        with self._lock:
+            self._load()
+            return self._snapshot()
+
+    def listing_created(self, listing):
+        self._apply(listing, 1)
+
+    def listing_deleted(self, listing):
+        self._apply(listing, -1)
+
+    def listing_viewed(self, count=1):
+        with self._lock:
+            if self._data is not None:
+                self._data['total_views'] += count
+                self._touch()
+
+    def user_created(self):
+        with self._lock:
+            if self._data is not None:
+                self._data['total_users'] += 1
+                self._touch()
+
+    def _apply(self, listing, sign):
+        with self._lock:
+            if self._data is None:
+                return
+            data = self._data
+            data['all_listings'] += sign
+            data['price_sum'] += sign * (listing.price or 0)
+            data['total_views'] += sign * (listing.views or 0)
+            data['total_favorites'] += sign * (listing.favorites or 0)
+            if listing.status == 'active':
+                data['total_listings'] += sign
+                if listing.category in data['categories']:
+                    data['categories'][listing.category] += sign
+            self._touch()
+
+    def _touch(self):
+        self._data['last_updated'] = datetime.utcnow()
+
+    def _load(self):
+        # Все агрегаты по объявлениям — одним запросом
+        all_listings, active_listings, total_views, total_favorites, price_sum = db.session.query(
+            func.count(Listing.id),
+            func.coalesce(func.sum(case((Listing.status == 'active', 1), else_=0)), 0),
+            func.coalesce(func.sum(Listing.views), 0),
+            func.coalesce(func.sum(Listing.favorites), 0),
+            func.coalesce(func.sum(Listing.price), 0)
+        ).one()
+
+        # Количество по категориям — одним GROUP BY вместо запроса на категорию
+        categories = {name: 0 for (name,) in db.session.query(Category.name)}
+        active_by_category = db.session.query(
+            Listing.category, func.count(Listing.id)
+        ).filter(Listing.status == 'active').group_by(Listing.category)
+        for name, count in active_by_category:
+            if name in categories:
+                categories[name] = count
+
+        self._data = {
+            'total_users': User.query.filter_by(is_active=True).count(),
+            'total_listings': active_listings,
+            'all_listings': all_listings,
+            'price_sum': float(price_sum),
+            'total_views': int(total_views),
+            'total_favorites': int(total_favorites),
+            'categories': categories,
+            'last_updated': datetime.utcnow()
+        }
+        self._loaded_at = time.monotonic()
+
+    def _snapshot(self):
+        data = self._data
+        avg_price = data['price_sum'] / data['all_listings'] if data['all_listings'] else 0
+        return {
+            'total_listings': data['total_listings'],
+            'total_users': data['total_users'],
+            'active_listings': data['total_listings'],
+            'avg_price': float(avg_price),
+            'total_views': data['total_views'],
+            'total_favorites': data['total_favorites'],
+            'categories': dict(data['categories']),
+            'last_updated': data['last_updated'].strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+stats_cache = StatsCache()
@@ -0,0 +1,99 @@
+"""
+Проверка initData Telegram WebApp
+
+Секретный ключ HMAC выводится из BOT_TOKEN один раз. Успешно проверенные
+строки initData запоминаются в ограниченном LRU до истечения auth_date,
+поэтому повторное открытие Mini App с той же подписью не требует
+повторного разбора и HMAC. Ключ кэша — сама строка: хэш str Python
+считает один раз, а отдельный SHA-256 сделал бы первую проверку дороже
+прежней реализации.
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from config import Config
+
+# Срок действия initData (24 часа)
+AUTH_MAX_AGE = 86400
+
+class TelegramAuthVerifier:
+    def __init__(self, bot_token, max_age=AUTH_MAX_AGE, cache_size=Config.AUTH_CACHE_SIZE):
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self._secret_key = (
+            hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+            if bot_token else None
+        )
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, init_data):
+        """Возвращает данные пользователя или None, если подпись неверна или устарела"""
+        if not init_data or self._secret_key is None:
+            return None
+
+        now = time.time()
+        # Ключ — вся строка: любая правка данных даёт другой ключ
+        with self._lock:
+            cached = self._cache.get(init_data)
+            if cached is not None:
+                expires_at, user_data = cached
+                if expires_at > now:
+                    self._cache.move_to_end(init_data)
+                    self.hits += 1
+                    return user_data
+                del self._cache[init_data]
+            self.misses += 1
+
+        user_data, auth_date = self._check(init_data, now)
+        if user_data is None:
+            return None
+
+        with self._lock:
+            self._cache[init_data] = (auth_date + self.max_age, user_data)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user_data
+
+    def _check(self, init_data, now):
+        # Разбор как у Telegram: пары key=value через &, значения в percent-encoding
+        parsed_data = {}
+        for item in init_data.split('&'):
+            key, separator, value = item.partition('=')
+            if not separator:
+                return None, None
+            parsed_data[key] = unquote(value)
+
+        received_hash = parsed_data.pop('hash', None)
+        if not received_hash or 'auth_date' not in parsed_data:
+            return None, None
+
+        try:
+            auth_date = int(parsed_data['auth_date'])
+        except ValueError:
+            return None, None
+
+        if now - auth_date > self.max_age:
+            return None, None
+
+        data_check_string = '\n'.join(f"{k}={v}" for k, v in sorted(parsed_data.items()))
+        # hmac.digest — однократный вызов OpenSSL без Python-обёртки hmac.HMAC
+        calculated_hash = hmac.digest(self._secret_key, data_check_string.encode(), 'sha256').hex()
+        if not hmac.compare_digest(calculated_hash, received_hash):
+            return None, None
+
+        try:
+            return json.loads(parsed_data.get('user', '{}')), auth_date
+        except ValueError:
+            return None, None
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._cache), 'hits': self.hits, 'misses': self.misses}
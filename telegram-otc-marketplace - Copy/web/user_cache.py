@@ -0,0 +1,101 @@
+"""
+Кэш пользователей для запросов с сессией
+
+LRU с TTL по Telegram id: /dashboard, /api/user и проверки прав не
+читают строку пользователя из БД на каждый запрос. Запись сбрасывается
+при входе через /auth и по сообщению об изменении из админки.
+
+Без Redis сообщения из админ API до веб-процесса не доходят, поэтому
+проверки прав (get_for_auth) доверяют записи не дольше
+USER_AUTH_CACHE_TTL секунд, а затем перечитывают пользователя из БД.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from config import Config
+from database.models import User
+from utils.pubsub import pubsub, publish_user_invalidation, USER_INVALIDATION_CHANNEL, LocalPubSub
+
+CachedUser = namedtuple('CachedUser', ['id', 'is_admin', 'profile', 'data'])
+
+class UserCache:
+    def __init__(self, maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL, auth_ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # С межпроцессной инвалидацией права так же свежи, как и остальная запись
+        if auth_ttl is None:
+            auth_ttl = Config.USER_AUTH_CACHE_TTL if isinstance(pubsub, LocalPubSub) else ttl
+        self.auth_ttl = auth_ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id, max_age=None):
+        """Возвращает CachedUser или None, если пользователя нет в БД"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is not None and item[0] > now and (max_age is None or now - item[2] < max_age):
+                self._items.move_to_end(user_id)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+
+        cached = CachedUser(
+            id=user.id,
+            is_admin=bool(user.is_admin),
+            profile=(user.username, user.first_name, user.last_name),
+            data=user.to_dict()
+        )
+        with self._lock:
+            self._items[user_id] = (now + self.ttl, cached, now)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return cached
+
+    def get_for_auth(self, user_id):
+        """Для проверок прав: запись не старше auth_ttl"""
+        return self.get(user_id, max_age=self.auth_ttl)
+
+    def invalidate(self, user_id):
+        """Сбрасывает запись локально и во всех подписанных процессах"""
+        with self._lock:
+            self.invalidations += 1
+        self._evict(user_id)
+        publish_user_invalidation(user_id)
+
+    def _evict(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+user_cache = UserCache()
+
+# Инвалидация из других процессов (админ API, другие воркеры)
+pubsub.subscribe(
+    USER_INVALIDATION_CHANNEL,
+    lambda message: user_cache._evict(*message.get('user_ids', [message.get('user_id')]))
+)
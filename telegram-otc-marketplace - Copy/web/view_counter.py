@@ -0,0 +1,107 @@
+"""
+Буферизованный счётчик просмотров объявлений
+
+Просмотры копятся в памяти и сбрасываются в БД пачкой раз в
+VIEW_FLUSH_INTERVAL секунд или после VIEW_FLUSH_THRESHOLD просмотров:
+один executemany "UPDATE listings SET views = views + :delta" по всем
+накопленным объявлениям. Инкремент на стороне БД не теряет обновления
+при конкурентных запросах, а эндпоинт просмотра не пишет в БД.
+"""
+import atexit
+import threading
+from collections import defaultdict
+
+from sqlalchemy import bindparam
+
+from config import Config
+from database.models import db, Listing
+from web.http_cache import views_flushed
+
+class ViewCounter:
+    def __init__(self, flush_interval=Config.VIEW_FLUSH_INTERVAL,
+                 flush_threshold=Config.VIEW_FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._hits = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.stop)
+
+    def hit(self, listing_id, count=1):
+        """Учитывает просмотр; при достижении порога сбрасывает буфер"""
+        with self._lock:
+            self._pending[listing_id] += count
+            self._hits += count
+            should_flush = self._hits >= self.flush_threshold
+        self._ensure_thread()
+        if should_flush:
+            self.flush()
+
+    def pending(self, listing_id):
+        """Ещё не записанные в БД просмотры объявления"""
+        with self._lock:
+            return self._pending.get(listing_id, 0)
+
+    def merge(self, listing_dict):
+        """Добавляет несброшенные просмотры к сериализованному объявлению"""
+        listing_dict['views'] = (listing_dict.get('views') or 0) + self.pending(listing_dict['id'])
+        return listing_dict
+
+    def flush(self):
+        """Записывает накопленные просмотры в БД одним пакетным UPDATE"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = defaultdict(int)
+                self._hits = 0
+
+            listings = Listing.__table__
+            statement = listings.update().where(
+                listings.c.id == bindparam('listing_id')
+            ).values(views=listings.c.views + bindparam('delta'))
+            params = [{'listing_id': listing_id, 'delta': delta} for listing_id, delta in batch.items()]
+
+            try:
+                with self.app.app_context():
+                    db.session.execute(statement, params)
+                    db.session.commit()
+            except Exception as e:
+                # Возвращаем просмотры в буфер, чтобы не потерять их
+                with self._lock:
+                    for listing_id, delta in batch.items():
+                        self._pending[listing_id] += delta
+                        self._hits += delta
+                print(f"❌ Ошибка записи просмотров: {e}")
+                return 0
+
+            # Просмотры в кэшированных ответах обновятся не позже VIEWS_CACHE_INTERVAL
+            views_flushed()
+            return len(params)
+
+    def stop(self):
+        self._stop.set()
+        if self.app is not None:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+view_counter = ViewCounter()